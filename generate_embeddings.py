@@ -28,12 +28,10 @@ Usage:
 
 import argparse
 import asyncio
-import base64
 import json
 import os
 import sys
 import time
-import zlib
 from typing import List, Optional, Tuple
 from urllib.parse import urlparse
 
@@ -50,20 +48,14 @@ except ImportError as e:
     print(f"Missing: {e.name}")
     sys.exit(1)
 
+# Page bodies are stored by the crawler's pages DB writer (zstd, or legacy base64 zlib)
+from sqlitecrawler.db import decompress_html
+
 
 # ============================================================================
 # Database Connection & HTML Extraction
 # ============================================================================
 
-def decompress_html(encoded: bytes) -> str:
-    """Decompress HTML from bytes to string."""
-    try:
-        return zlib.decompress(base64.b64decode(encoded)).decode("utf-8")
-    except Exception as e:
-        print(f"Error decompressing HTML: {e}")
-        return ""
-
-
 def extract_text_from_html(html: str) -> str:
     """
     Extract text content from HTML (similar to document.body.innerText).
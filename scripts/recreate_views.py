@@ -48,30 +48,16 @@ async def recreate_views_sqlite(db_path: str):
     
     print(f"Recreating SQLite views in {db_path}...")
     async with create_connection() as conn:
-        # Drop existing views first (SQLite doesn't support CREATE OR REPLACE)
-        view_names = [
-            'view_crawl_overview', 'view_links_internal', 'view_links_external',
-            'view_links_network', 'view_links_subdomain', 'view_sitemap_statistics',
-            'view_schema_analysis', 'view_schema_hierarchy', 'view_crawl_status',
-            'view_utm_links', 'view_hubs', 'view_exact_duplicates',
-            'view_near_duplicates', 'view_content_hash_stats'
-        ]
-        
-        for view_name in view_names:
-            try:
-                await conn.execute(f"DROP VIEW IF EXISTS {view_name}")
-            except Exception:
-                pass  # View might not exist
-        
-        # Create new views
+        # get_sqlite_views() drops each view before creating it (SQLite doesn't support CREATE OR REPLACE)
         view_statements = get_sqlite_views()
         for view_stmt in view_statements:
             if view_stmt:
                 try:
                     await conn.execute(view_stmt)
-                    # Extract view name from statement
-                    view_name = view_stmt.split('VIEW IF NOT EXISTS')[1].split()[0] if 'VIEW IF NOT EXISTS' in view_stmt else 'unknown'
-                    print(f"  ✓ Recreated view: {view_name}")
+                    if 'VIEW IF NOT EXISTS' in view_stmt:
+                        # Extract view name from statement
+                        view_name = view_stmt.split('VIEW IF NOT EXISTS')[1].split()[0]
+                        print(f"  ✓ Recreated view: {view_name}")
                 except Exception as e:
                     print(f"  ✗ Failed to recreate view: {e}")
         await conn.commit()
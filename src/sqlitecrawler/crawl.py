@@ -9,6 +9,7 @@ import uuid
 from urllib.parse import urlsplit, urlparse, urlunparse
 from typing import Iterable, Tuple, List, Optional, Dict, Any
 from concurrent.futures import ThreadPoolExecutor
+from contextlib import AsyncExitStack
 from .config import HttpConfig, CrawlLimits, get_db_paths, get_database_config
 from .database import set_global_config
 from .db_operations import (
@@ -38,6 +39,10 @@ from .db import (
     frontier_enqueue_many,
     batch_write_content,
     extract_content_from_html,
+    FailureBuffer,
+    DBPool,
+    _connection,
+    begin_immediate,
 )
 from .db_operations import batch_write_sitemaps_and_urls, backfill_missing_frontier_entries
 from .fetch import fetch_many, fetch_many_with_redirect_tracking, fetch_with_redirect_tracking
@@ -487,6 +492,18 @@ async def fetch_many_with_delay(urls: List[str], cfg: HttpConfig, delay_tracker:
     
     return results
 
+async def flush_failure_buffer(failure_buffer: FailureBuffer, crawl_db_path: str) -> None:
+    """Write buffered fetch failures to the SQLite failed_urls table in one transaction.
+    
+    On error the failures stay in the buffer and are retried on the next flush.
+    """
+    try:
+        async with _connection(crawl_db_path) as conn:
+            await begin_immediate(conn)
+            await failure_buffer.flush(conn)
+    except Exception as e:
+        print(f"  -> Error recording failed URLs (kept {len(failure_buffer.pending)} for retry): {e}")
+
 def signal_handler(signum, frame):
     """Handle interrupt signals for graceful shutdown."""
     global shutdown_requested, force_quit
@@ -725,576 +742,584 @@ async def crawl(start: str, use_js: bool = False, limits: CrawlLimits | None = N
         if excluded_count > 0:
             print(f"Cleaned {excluded_count} excluded URLs from frontier queue")
 
-    processed = 0
-    next_batch_cache = None  # Initialize prefetched batch storage
+    # While crawling, the SQLite batch writers share one long-lived connection per database
+    async with AsyncExitStack() as db_connections:
+        if db_config.backend == "sqlite":
+            await db_connections.enter_async_context(DBPool(crawl_db_path, pages_db_path))
+        
+        processed = 0
+        next_batch_cache = None  # Initialize prefetched batch storage
+        failure_buffer = FailureBuffer(cfg.retry_delay, cfg.retry_backoff_factor)
     
-    # Main crawl loop - keep going until truly no more URLs
-    while True:
-        # Check for shutdown request
-        if shutdown_requested or force_quit:
-            print("Shutdown requested. Saving progress and exiting gracefully...")
-            break
+        # Main crawl loop - keep going until truly no more URLs
+        while True:
+            # Check for shutdown request
+            if shutdown_requested or force_quit:
+                print("Shutdown requested. Saving progress and exiting gracefully...")
+                break
             
-        # Check for URLs ready for retry first
-        from .db_operations import get_urls_ready_for_retry
-        from .db import frontier_update_priority_scores
-        try:
-            retry_urls = await get_urls_ready_for_retry(http_config.max_retries, db_config)
-            if retry_urls:
-                print(f"Found {len(retry_urls)} URLs ready for retry")
-                # Add retry URLs back to frontier
-                for url_id, url in retry_urls:
-                    await frontier_seed(url, base_domain, reset=False, config=db_config)
-        except Exception as e:
-            print(f"Error checking retry URLs: {e}")
-        
-        # Update priority scores periodically (every 50 processed pages)
-        if processed > 0 and processed % 50 == 0:
+            # Check for URLs ready for retry first
+            from .db_operations import get_urls_ready_for_retry
+            from .db import frontier_update_priority_scores
             try:
-                await frontier_update_priority_scores(db_config)
-                if verbose:
-                    print(f"Updated priority scores after processing {processed} pages")
+                retry_urls = await get_urls_ready_for_retry(http_config.max_retries, db_config)
+                if retry_urls:
+                    print(f"Found {len(retry_urls)} URLs ready for retry")
+                    # Add retry URLs back to frontier
+                    for url_id, url in retry_urls:
+                        await frontier_seed(url, base_domain, reset=False, config=db_config)
             except Exception as e:
-                print(f"Error updating priority scores: {e}")
+                print(f"Error checking retry URLs: {e}")
         
-        # Clear expired cache entries periodically (every 100 processed pages)
-        if processed > 0 and processed % 100 == 0:
-            try:
-                from .robots import robots_cache, sitemap_cache
-                robots_cache.clear_expired()
-                sitemap_cache.clear_expired()
-                if verbose:
-                    print(f"Cleared expired cache entries after processing {processed} pages")
-            except Exception as e:
-                print(f"Error clearing expired cache entries: {e}")
+            # Update priority scores periodically (every 50 processed pages)
+            if processed > 0 and processed % 50 == 0:
+                try:
+                    await frontier_update_priority_scores(db_config)
+                    if verbose:
+                        print(f"Updated priority scores after processing {processed} pages")
+                except Exception as e:
+                    print(f"Error updating priority scores: {e}")
+        
+            # Clear expired cache entries periodically (every 100 processed pages)
+            if processed > 0 and processed % 100 == 0:
+                try:
+                    from .robots import robots_cache, sitemap_cache
+                    robots_cache.clear_expired()
+                    sitemap_cache.clear_expired()
+                    if verbose:
+                        print(f"Cleared expired cache entries after processing {processed} pages")
+                except Exception as e:
+                    print(f"Error clearing expired cache entries: {e}")
             
-        # Determine batch size based on whether there's a limit
-        if limits.max_pages > 0:
-            remaining = limits.max_pages - processed
-            if remaining <= 0:
-                break
-            batch_size = min(cfg.max_concurrency, remaining)
-        else:
-            batch_size = cfg.max_concurrency
+            # Determine batch size based on whether there's a limit
+            if limits.max_pages > 0:
+                remaining = limits.max_pages - processed
+                if remaining <= 0:
+                    break
+                batch_size = min(cfg.max_concurrency, remaining)
+            else:
+                batch_size = cfg.max_concurrency
             
-        # Prefetch next batch while processing current batch (if we have one)
-        next_batch_task = None
-        if next_batch_cache:
-            # We already have a prefetched batch, use it
-            batch = next_batch_cache
-            next_batch_cache = None
-        else:
-            # Fetch the first batch
-            batch = await frontier_next_batch(batch_size, config=db_config)
-            if not batch:
-                    # Check if there are any queued URLs (might have been added during processing)
-                    q, d = await frontier_stats(config=db_config)
-                    if q > 0:
-                        print(f"Frontier has {q} queued URLs - continuing crawl...")
-                        continue
-                    else:
-                        # No queued URLs - check for stuck pending URLs first
-                        from .db_operations import frontier_reset_all_pending_to_queued
-                        pending_reset = await frontier_reset_all_pending_to_queued(db_config, max_reset_attempts=5)
-                        if pending_reset > 0:
-                            print(f"Reset {pending_reset} URLs stuck in pending status - continuing crawl...")
-                            next_batch_cache = None
+            # Prefetch next batch while processing current batch (if we have one)
+            next_batch_task = None
+            if next_batch_cache:
+                # We already have a prefetched batch, use it
+                batch = next_batch_cache
+                next_batch_cache = None
+            else:
+                # Fetch the first batch
+                batch = await frontier_next_batch(batch_size, config=db_config)
+                if not batch:
+                        # Check if there are any queued URLs (might have been added during processing)
+                        q, d = await frontier_stats(config=db_config)
+                        if q > 0:
+                            print(f"Frontier has {q} queued URLs - continuing crawl...")
                             continue
+                        else:
+                            # No queued URLs - check for stuck pending URLs first
+                            from .db_operations import frontier_reset_all_pending_to_queued
+                            pending_reset = await frontier_reset_all_pending_to_queued(db_config, max_reset_attempts=5)
+                            if pending_reset > 0:
+                                print(f"Reset {pending_reset} URLs stuck in pending status - continuing crawl...")
+                                next_batch_cache = None
+                                continue
                         
-                        # No URLs in frontier - check for discovered URLs that weren't enqueued
-                        print("No more URLs in frontier - checking for discovered URLs...")
-                        q_before = q
-                        await backfill_missing_frontier_entries(base_domain, db_config)
+                            # No URLs in frontier - check for discovered URLs that weren't enqueued
+                            print("No more URLs in frontier - checking for discovered URLs...")
+                            q_before = q
+                            await backfill_missing_frontier_entries(base_domain, db_config)
                         
-                        # Check if new URLs were added
-                        q_after, d_after = await frontier_stats(config=db_config)
-                        if q_after > q_before:
-                            new_urls = q_after - q_before
-                            print(f"Found {new_urls} new URLs - continuing crawl to process them...")
-                            # Reset batch cache and continue main loop
-                            next_batch_cache = None
-                            continue
-                        else:
-                            # No new URLs found, we're truly done
-                            print("No new URLs discovered - crawl complete!")
-                            break
+                            # Check if new URLs were added
+                            q_after, d_after = await frontier_stats(config=db_config)
+                            if q_after > q_before:
+                                new_urls = q_after - q_before
+                                print(f"Found {new_urls} new URLs - continuing crawl to process them...")
+                                # Reset batch cache and continue main loop
+                                next_batch_cache = None
+                                continue
+                            else:
+                                # No new URLs found, we're truly done
+                                print("No new URLs discovered - crawl complete!")
+                                break
         
-        # Don't prefetch next batch yet - wait until current batch is marked as done
-        # to avoid fetching the same URLs multiple times
-        next_batch_task = None
+            # Don't prefetch next batch yet - wait until current batch is marked as done
+            # to avoid fetching the same URLs multiple times
+            next_batch_task = None
 
-        # Debug: Check for duplicates in the batch BEFORE deduplication
-        batch_urls = [u for (u, _d, _p) in batch]
-        url_counts_before = {}
-        for url in batch_urls:
-            url_counts_before[url] = url_counts_before.get(url, 0) + 1
-        duplicates_before = {url: count for url, count in url_counts_before.items() if count > 1}
-        if duplicates_before:
-            print(f"  -> ERROR: Found {len(duplicates_before)} duplicate URLs in batch from frontier_next_batch (BEFORE deduplication):")
-            for url, count in list(duplicates_before.items())[:5]:  # Show first 5
-                print(f"      {url}: {count} times")
+            # Debug: Check for duplicates in the batch BEFORE deduplication
+            batch_urls = [u for (u, _d, _p) in batch]
+            url_counts_before = {}
+            for url in batch_urls:
+                url_counts_before[url] = url_counts_before.get(url, 0) + 1
+            duplicates_before = {url: count for url, count in url_counts_before.items() if count > 1}
+            if duplicates_before:
+                print(f"  -> ERROR: Found {len(duplicates_before)} duplicate URLs in batch from frontier_next_batch (BEFORE deduplication):")
+                for url, count in list(duplicates_before.items())[:5]:  # Show first 5
+                    print(f"      {url}: {count} times")
         
-        # Deduplicate URLs in the batch (shouldn't happen due to UNIQUE constraint, but be safe)
-        seen_urls = set()
-        deduplicated_batch = []
-        for (u, d, p) in batch:
-            if u not in seen_urls:
-                seen_urls.add(u)
-                deduplicated_batch.append((u, d, p))
+            # Deduplicate URLs in the batch (shouldn't happen due to UNIQUE constraint, but be safe)
+            seen_urls = set()
+            deduplicated_batch = []
+            for (u, d, p) in batch:
+                if u not in seen_urls:
+                    seen_urls.add(u)
+                    deduplicated_batch.append((u, d, p))
         
-        if len(deduplicated_batch) < len(batch):
-            print(f"  -> Warning: Removed {len(batch) - len(deduplicated_batch)} duplicate URLs from batch")
-            batch = deduplicated_batch
+            if len(deduplicated_batch) < len(batch):
+                print(f"  -> Warning: Removed {len(batch) - len(deduplicated_batch)} duplicate URLs from batch")
+                batch = deduplicated_batch
         
-        urls = [u for (u, _d, _p) in batch]
-        depths = {u: d for (u, d, _p) in batch}
-        parents = {u: p for (u, _d, p) in batch}
+            urls = [u for (u, _d, _p) in batch]
+            depths = {u: d for (u, d, _p) in batch}
+            parents = {u: p for (u, _d, p) in batch}
         
-        # The frontier contains normalized URLs, but we need to fetch them
-        # We'll use the normalized URLs directly since they should work for fetching
-        # Use redirect tracking to capture redirect chains with adaptive delay
+            # The frontier contains normalized URLs, but we need to fetch them
+            # We'll use the normalized URLs directly since they should work for fetching
+            # Use redirect tracking to capture redirect chains with adaptive delay
         
-        # Initialize lists for batch processing (needed early for path/path-exclude filtering)
-        to_mark_done = []
+            # Initialize lists for batch processing (needed early for path/path-exclude filtering)
+            to_mark_done = []
         
-        # Filter URLs based on path restriction/exclusion and circuit breaker state
-        urls_to_fetch = []
-        skipped_urls = []
-        path_restricted_urls = []
-        path_excluded_urls = []
-        domain_filtered_urls = []
+            # Filter URLs based on path restriction/exclusion and circuit breaker state
+            urls_to_fetch = []
+            skipped_urls = []
+            path_restricted_urls = []
+            path_excluded_urls = []
+            domain_filtered_urls = []
         
-        for url in urls:
-            from urllib.parse import urlparse
-            parsed_url = urlparse(url)
-            host = parsed_url.netloc.lower()
-            
-            # Allowed domains filter (host suffix match)
-            if limits.allowed_domains:
+            for url in urls:
+                from urllib.parse import urlparse
+                parsed_url = urlparse(url)
                 host = parsed_url.netloc.lower()
-                if not any(host == d or host.endswith(f".{d}") for d in limits.allowed_domains):
-                    domain_filtered_urls.append(url)
-                    to_mark_done.append(url)
-                    continue
-
-            # Check path restriction FIRST - if URL doesn't match, mark as done and skip
-            if limits.path_restriction and limits.path_restriction not in parsed_url.path:
-                path_restricted_urls.append(url)
-                # Mark as done so it's not retried, but don't crawl it
-                to_mark_done.append(url)
-                continue
+            
+                # Allowed domains filter (host suffix match)
+                if limits.allowed_domains:
+                    host = parsed_url.netloc.lower()
+                    if not any(host == d or host.endswith(f".{d}") for d in limits.allowed_domains):
+                        domain_filtered_urls.append(url)
+                        to_mark_done.append(url)
+                        continue
 
-            # Check path exclusions - skip any URL whose path starts with a blocked prefix
-            if limits.path_exclude_prefixes:
-                path_val = parsed_url.path or "/"
-                excluded = False
-                for prefix in limits.path_exclude_prefixes:
-                    normalized_prefix = prefix if prefix.startswith("/") else f"/{prefix}"
-                    if path_val.startswith(normalized_prefix):
-                        excluded = True
-                        break
-                if excluded:
-                    path_excluded_urls.append(url)
+                # Check path restriction FIRST - if URL doesn't match, mark as done and skip
+                if limits.path_restriction and limits.path_restriction not in parsed_url.path:
+                    path_restricted_urls.append(url)
+                    # Mark as done so it's not retried, but don't crawl it
                     to_mark_done.append(url)
                     continue
+
+                # Check path exclusions - skip any URL whose path starts with a blocked prefix
+                if limits.path_exclude_prefixes:
+                    path_val = parsed_url.path or "/"
+                    excluded = False
+                    for prefix in limits.path_exclude_prefixes:
+                        normalized_prefix = prefix if prefix.startswith("/") else f"/{prefix}"
+                        if path_val.startswith(normalized_prefix):
+                            excluded = True
+                            break
+                    if excluded:
+                        path_excluded_urls.append(url)
+                        to_mark_done.append(url)
+                        continue
             
-            breaker = circuit_breaker_registry.get_breaker(host)
+                breaker = circuit_breaker_registry.get_breaker(host)
             
-            if breaker.allow_request():
-                urls_to_fetch.append(url)
-            else:
-                skipped_urls.append(url)
-                print(f"Skipping {url} - Circuit breaker OPEN for {host}")
-                # We should probably mark these as failed or retry later?
-                # For now, let's just log it. In a real system, we might want to re-queue them with a delay.
+                if breaker.allow_request():
+                    urls_to_fetch.append(url)
+                else:
+                    skipped_urls.append(url)
+                    print(f"Skipping {url} - Circuit breaker OPEN for {host}")
+                    # We should probably mark these as failed or retry later?
+                    # For now, let's just log it. In a real system, we might want to re-queue them with a delay.
         
-        # Log path-restricted/excluded URLs if any
-        if domain_filtered_urls:
-            print(f"  -> Skipped {len(domain_filtered_urls)} URLs outside allowed domains {limits.allowed_domains}")
-        if path_restricted_urls:
-            print(f"  -> Skipped {len(path_restricted_urls)} URLs outside path restriction '{limits.path_restriction}'")
-        if path_excluded_urls:
-            print(f"  -> Skipped {len(path_excluded_urls)} URLs due to excluded path prefixes: {limits.path_exclude_prefixes}")
+            # Log path-restricted/excluded URLs if any
+            if domain_filtered_urls:
+                print(f"  -> Skipped {len(domain_filtered_urls)} URLs outside allowed domains {limits.allowed_domains}")
+            if path_restricted_urls:
+                print(f"  -> Skipped {len(path_restricted_urls)} URLs outside path restriction '{limits.path_restriction}'")
+            if path_excluded_urls:
+                print(f"  -> Skipped {len(path_excluded_urls)} URLs due to excluded path prefixes: {limits.path_exclude_prefixes}")
         
-        # Debug: Log what we're about to fetch
-        print(f"  -> DEBUG: About to fetch {len(urls_to_fetch)} URLs: {urls_to_fetch[:5]}..." if len(urls_to_fetch) > 5 else f"  -> DEBUG: About to fetch {len(urls_to_fetch)} URLs: {urls_to_fetch}")
+            # Debug: Log what we're about to fetch
+            print(f"  -> DEBUG: About to fetch {len(urls_to_fetch)} URLs: {urls_to_fetch[:5]}..." if len(urls_to_fetch) > 5 else f"  -> DEBUG: About to fetch {len(urls_to_fetch)} URLs: {urls_to_fetch}")
         
-        results = await fetch_many_with_delay(urls_to_fetch, cfg, delay_tracker, base_domain, pages_db_path, crawl_db_path)
+            results = await fetch_many_with_delay(urls_to_fetch, cfg, delay_tracker, base_domain, pages_db_path, crawl_db_path)
         
-        # Debug: Log what we got back
-        print(f"  -> DEBUG: fetch_many_with_delay returned {len(results)} results")
+            # Debug: Log what we got back
+            print(f"  -> DEBUG: fetch_many_with_delay returned {len(results)} results")
 
-        # Continue initializing batch processing lists (to_mark_done already initialized above for path restriction)
-        to_enqueue = []
-        pages_to_write = []
-        urls_to_upsert = []
-        children_to_enqueue = []
-        content_to_write = []
-        links_to_write = []
-        redirect_data_to_write = []
+            # Continue initializing batch processing lists (to_mark_done already initialized above for path restriction)
+            to_enqueue = []
+            pages_to_write = []
+            urls_to_upsert = []
+            children_to_enqueue = []
+            content_to_write = []
+            links_to_write = []
+            redirect_data_to_write = []
 
-        for (status, final_url, headers, text, original, redirect_chain_json) in results:
-            # Normalize URLs for storage
-            original_norm = normalize_url_for_storage(original)
-            final_norm = normalize_url_for_storage(final_url or original)
+            for (status, final_url, headers, text, original, redirect_chain_json) in results:
+                # Normalize URLs for storage
+                original_norm = normalize_url_for_storage(original)
+                final_norm = normalize_url_for_storage(final_url or original)
             
-            # Look up depth and parent using the normalized URL (since frontier contains normalized URLs)
-            depth = depths.get(original_norm, 0)
-            parent_norm = parents.get(original_norm)
+                # Look up depth and parent using the normalized URL (since frontier contains normalized URLs)
+                depth = depths.get(original_norm, 0)
+                parent_norm = parents.get(original_norm)
             
-            # Classify content type using original headers (before normalization)
-            # Headers are already lowercase from the HTTP client
-            k = classify(headers.get("content-type"), final_norm)
+                # Classify content type using original headers (before normalization)
+                # Headers are already lowercase from the HTTP client
+                k = classify(headers.get("content-type"), final_norm)
             
-            # Normalize headers to save space
-            headers_norm = normalize_headers(headers)
+                # Normalize headers to save space
+                headers_norm = normalize_headers(headers)
             
-            # Log status code and URL
-            print(f"[{status}] {original_norm} -> {final_norm} (depth: {depth}, type: {k})")
+                # Log status code and URL
+                print(f"[{status}] {original_norm} -> {final_norm} (depth: {depth}, type: {k})")
             
-            # Handle 304 Not Modified - content hasn't changed, skip processing
-            if status == 304:
-                print(f"  -> Content not modified (304), skipping processing")
-                to_mark_done.append(original_norm)
-                continue
+                # Handle 304 Not Modified - content hasn't changed, skip processing
+                if status == 304:
+                    print(f"  -> Content not modified (304), skipping processing")
+                    to_mark_done.append(original_norm)
+                    continue
             
-            # Check if this status code should be retried
-            from .db import should_retry_status_code, record_failed_url
+                # Check if this status code should be retried
+                from .db import should_retry_status_code
             
-            # Update circuit breaker
-            host = urlparse(original_norm).netloc.lower()
-            breaker = circuit_breaker_registry.get_breaker(host)
+                # Update circuit breaker
+                host = urlparse(original_norm).netloc.lower()
+                breaker = circuit_breaker_registry.get_breaker(host)
             
-            if 200 <= status < 500 and status != 429:
-                breaker.record_success()
-            elif status >= 500 or status == 429 or status == 0:
-                breaker.record_failure()
+                if 200 <= status < 500 and status != 429:
+                    breaker.record_success()
+                elif status >= 500 or status == 429 or status == 0:
+                    breaker.record_failure()
                 
-            if should_retry_status_code(status):
-                # Record this URL for retry
-                try:
-                    url_id = await get_or_create_url_id(original_norm, base_domain, db_config)
+                if should_retry_status_code(status):
+                    # Record this URL for retry
+                    try:
+                        url_id = await get_or_create_url_id(original_norm, base_domain, db_config)
                     
-                    # Provide more descriptive failure reasons
-                    if status == 0:
-                        failure_reason = "Connection/timeout error"
-                    elif status == 408:
-                        failure_reason = "Request timeout (server slow)"
-                    elif status == 423:
-                        failure_reason = "Resource temporarily locked"
-                    elif status == 429:
-                        failure_reason = "Rate limited"
-                    elif status == 420:
-                        failure_reason = "Rate limited (Twitter)"
-                    elif status == 451:
-                        failure_reason = "Unavailable for legal reasons (geo-blocking?)"
-                    elif 500 <= status < 600:
-                        failure_reason = f"Server error {status}"
-                    else:
-                        failure_reason = f"HTTP {status}"
+                        # Provide more descriptive failure reasons
+                        if status == 0:
+                            failure_reason = "Connection/timeout error"
+                        elif status == 408:
+                            failure_reason = "Request timeout (server slow)"
+                        elif status == 423:
+                            failure_reason = "Resource temporarily locked"
+                        elif status == 429:
+                            failure_reason = "Rate limited"
+                        elif status == 420:
+                            failure_reason = "Rate limited (Twitter)"
+                        elif status == 451:
+                            failure_reason = "Unavailable for legal reasons (geo-blocking?)"
+                        elif 500 <= status < 600:
+                            failure_reason = f"Server error {status}"
+                        else:
+                            failure_reason = f"HTTP {status}"
                     
-                    # For now, record_failed_url is still SQLite-specific
-                    # TODO: Create PostgreSQL-compatible wrapper
-                    if db_config.backend == "sqlite":
-                        import aiosqlite
-                        async with aiosqlite.connect(crawl_db_path) as conn:
-                            await record_failed_url(url_id, status, failure_reason, 
-                                                  conn, 
-                                                  http_config.retry_delay, 
-                                                  http_config.retry_backoff_factor)
-                    # PostgreSQL retry logic can be added later if needed
-                    print(f"  -> Marked for retry (status: {status})")
-                except Exception as e:
-                    print(f"  -> Error recording failed URL: {e}")
-                
-                # Reset from 'pending' back to 'queued' for retry
-                from .db_operations import frontier_reset_pending_to_queued
-                try:
-                    await frontier_reset_pending_to_queued([original_norm], base_domain, config=db_config)
-                except Exception as e:
-                    print(f"  -> Error resetting pending status: {e}")
-                continue
-            else:
-                # Success or permanent failure - mark as done
-                to_mark_done.append(original_norm)
+                        # For now, failed URL recording is still SQLite-specific
+                        # TODO: Create PostgreSQL-compatible wrapper
+                        if db_config.backend == "sqlite":
+                            # Buffered and written to failed_urls after the batch
+                            failure_buffer.add(url_id, status, failure_reason)
+                        # PostgreSQL retry logic can be added later if needed
+                        print(f"  -> Marked for retry (status: {status})")
+                    except Exception as e:
+                        print(f"  -> Error recording failed URL: {e}")
                 
-                # If successful, remove from failed_urls table
-                if 200 <= status < 300:
+                    # Reset from 'pending' back to 'queued' for retry
+                    from .db_operations import frontier_reset_pending_to_queued
                     try:
-                        from .db_operations import get_or_create_url_id, remove_failed_url
-                        url_id = await get_or_create_url_id(original_norm, base_domain, db_config)
-                        await remove_failed_url(url_id, db_config)
+                        await frontier_reset_pending_to_queued([original_norm], base_domain, config=db_config)
                     except Exception as e:
-                        print(f"  -> Error removing from failed_urls: {e}")
+                        print(f"  -> Error resetting pending status: {e}")
+                    continue
+                else:
+                    # Success or permanent failure - mark as done
+                    to_mark_done.append(original_norm)
+                
+                    # If successful, remove from failed_urls table
+                    if 200 <= status < 300:
+                        try:
+                            from .db_operations import get_or_create_url_id, remove_failed_url
+                            url_id = await get_or_create_url_id(original_norm, base_domain, db_config)
+                            await remove_failed_url(url_id, db_config)
+                        except Exception as e:
+                            print(f"  -> Error removing from failed_urls: {e}")
             
-            # Process redirect data if there was a redirect
-            if redirect_chain_json and redirect_chain_json != "[]":
-                import json
-                try:
-                    redirect_chain = json.loads(redirect_chain_json)
-                    if len(redirect_chain) > 1:  # More than just the original request
-                        chain_length = len(redirect_chain) - 1  # Exclude the original request
-                        redirect_data_to_write.append((
-                            original_norm,  # source_url
-                            final_norm,     # target_url
-                            redirect_chain_json,  # redirect_chain
-                            chain_length,   # chain_length
-                            status          # final_status
-                        ))
-                        print(f"  -> Redirect chain: {chain_length} redirects")
+                # Process redirect data if there was a redirect
+                if redirect_chain_json and redirect_chain_json != "[]":
+                    import json
+                    try:
+                        redirect_chain = json.loads(redirect_chain_json)
+                        if len(redirect_chain) > 1:  # More than just the original request
+                            chain_length = len(redirect_chain) - 1  # Exclude the original request
+                            redirect_data_to_write.append((
+                                original_norm,  # source_url
+                                final_norm,     # target_url
+                                redirect_chain_json,  # redirect_chain
+                                chain_length,   # chain_length
+                                status          # final_status
+                            ))
+                            print(f"  -> Redirect chain: {chain_length} redirects")
                         
-                        # If redirect destination is different from original, ensure it's recorded and enqueued
-                        if original_norm != final_norm:
-                            # Upsert the final URL to ensure it's in the database
-                            urls_to_upsert.append((final_norm, k, base_domain, original_norm))
+                            # If redirect destination is different from original, ensure it's recorded and enqueued
+                            if original_norm != final_norm:
+                                # Upsert the final URL to ensure it's in the database
+                                urls_to_upsert.append((final_norm, k, base_domain, original_norm))
                             
-                            # If the final URL should be crawled and isn't already in frontier, enqueue it
-                            if should_crawl_url(final_norm, base_domain, allow_external, is_from_sitemap=False, user_agent=http_config.user_agent, csv_urls=csv_urls, csv_seed_mode=csv_seed_mode, path_restriction=limits.path_restriction, path_exclude_prefixes=limits.path_exclude_prefixes, allowed_domains=limits.allowed_domains):
-                                # Use same depth as original (redirects don't increase depth)
-                                children_to_enqueue.append((final_norm, depth, original_norm, base_domain))
-                except json.JSONDecodeError:
-                    pass
+                                # If the final URL should be crawled and isn't already in frontier, enqueue it
+                                if should_crawl_url(final_norm, base_domain, allow_external, is_from_sitemap=False, user_agent=http_config.user_agent, csv_urls=csv_urls, csv_seed_mode=csv_seed_mode, path_restriction=limits.path_restriction, path_exclude_prefixes=limits.path_exclude_prefixes, allowed_domains=limits.allowed_domains):
+                                    # Use same depth as original (redirects don't increase depth)
+                                    children_to_enqueue.append((final_norm, depth, original_norm, base_domain))
+                    except json.JSONDecodeError:
+                        pass
 
-            if k in {"sitemap", "sitemap_index"} or final_norm.lower().endswith(".xml"):
-                urls_to_upsert.append((original_norm, k, base_domain, parent_norm or normalize_url_for_storage(start)))
-                real_k, children = extract_from_sitemap(text)
-                if real_k != k:
-                    urls_to_upsert.append((original_norm, real_k, base_domain, parent_norm or normalize_url_for_storage(start)))
-                if depth < limits.max_depth:
-                    for child in children:
-                        child_norm = normalize_url_for_storage(child)
+                if k in {"sitemap", "sitemap_index"} or final_norm.lower().endswith(".xml"):
+                    urls_to_upsert.append((original_norm, k, base_domain, parent_norm or normalize_url_for_storage(start)))
+                    real_k, children = extract_from_sitemap(text)
+                    if real_k != k:
+                        urls_to_upsert.append((original_norm, real_k, base_domain, parent_norm or normalize_url_for_storage(start)))
+                    if depth < limits.max_depth:
+                        for child in children:
+                            child_norm = normalize_url_for_storage(child)
                         
-                        # Check if URL should be crawled based on classification
-                        if should_crawl_url(child_norm, base_domain, allow_external, is_from_sitemap=True, user_agent=http_config.user_agent, csv_urls=csv_urls, csv_seed_mode=csv_seed_mode, path_restriction=limits.path_restriction, path_exclude_prefixes=limits.path_exclude_prefixes, allowed_domains=limits.allowed_domains):
-                            children_to_enqueue.append((child_norm, depth + 1, original_norm, base_domain))
-                            # Don't log here - logging happens after filtering in batch_enqueue_frontier
-                        else:
-                            # Record but don't crawl (outside path restriction or external)
-                            urls_to_upsert.append((child_norm, "other", base_domain, original_norm))
-                            from .db import classify_url
-                            classification = classify_url(child_norm, base_domain, is_from_sitemap=True)
-                            if limits.path_restriction and limits.path_restriction not in child_norm:
-                                print(f"  -> Internal URL outside path restriction recorded: {child_norm}")
+                            # Check if URL should be crawled based on classification
+                            if should_crawl_url(child_norm, base_domain, allow_external, is_from_sitemap=True, user_agent=http_config.user_agent, csv_urls=csv_urls, csv_seed_mode=csv_seed_mode, path_restriction=limits.path_restriction, path_exclude_prefixes=limits.path_exclude_prefixes, allowed_domains=limits.allowed_domains):
+                                children_to_enqueue.append((child_norm, depth + 1, original_norm, base_domain))
+                                # Don't log here - logging happens after filtering in batch_enqueue_frontier
                             else:
-                                print(f"  -> {classification.title()} URL from sitemap recorded: {child_norm}")
-            elif k == "html":
-                urls_to_upsert.append((original_norm, "html", base_domain, parent_norm or normalize_url_for_storage(start)))
-                # Always write page record, even if no text (e.g., for redirects)
-                # This ensures redirects are properly recorded and the original URL is processed
-                pages_to_write.append((original_norm, final_norm, status, headers_norm, text or "", base_domain, redirect_chain_json))
+                                # Record but don't crawl (outside path restriction or external)
+                                urls_to_upsert.append((child_norm, "other", base_domain, original_norm))
+                                from .db import classify_url
+                                classification = classify_url(child_norm, base_domain, is_from_sitemap=True)
+                                if limits.path_restriction and limits.path_restriction not in child_norm:
+                                    print(f"  -> Internal URL outside path restriction recorded: {child_norm}")
+                                else:
+                                    print(f"  -> {classification.title()} URL from sitemap recorded: {child_norm}")
+                elif k == "html":
+                    urls_to_upsert.append((original_norm, "html", base_domain, parent_norm or normalize_url_for_storage(start)))
+                    # Always write page record, even if no text (e.g., for redirects)
+                    # This ensures redirects are properly recorded and the original URL is processed
+                    pages_to_write.append((original_norm, final_norm, status, headers_norm, text or "", base_domain, redirect_chain_json))
                 
-                if text:
-                    # Only extract content and hash for 200 status HTML responses (not redirects)
-                    if status == 200:
-                        # Extract content from HTML
-                        content_data = await extract_content_from_html(text, headers, final_norm)
-                        if content_data['title'] or content_data['meta_description'] or content_data['h1_tags'] or content_data['h2_tags']:
-                            # We'll need the URL ID, so we'll add this to content_to_write with a placeholder
-                            # The actual URL ID will be resolved during batch processing
-                            # Store content hash against the FINAL URL (after redirects), not the original URL
-                            # Include depth from frontier for crawl_depth tracking
-                            content_to_write.append((final_norm, content_data, base_domain, depth))
-                if text:
-                    # Extract links with metadata for internal links tracking
-                    links, detailed_links = await extract_links_with_metadata(text, final_norm)
-                    print(f"  -> Found {len(links)} links in HTML")
+                    if text:
+                        # Only extract content and hash for 200 status HTML responses (not redirects)
+                        if status == 200:
+                            # Extract content from HTML
+                            content_data = await extract_content_from_html(text, headers, final_norm)
+                            if content_data['title'] or content_data['meta_description'] or content_data['h1_tags'] or content_data['h2_tags']:
+                                # We'll need the URL ID, so we'll add this to content_to_write with a placeholder
+                                # The actual URL ID will be resolved during batch processing
+                                # Store content hash against the FINAL URL (after redirects), not the original URL
+                                # Include depth from frontier for crawl_depth tracking
+                                content_to_write.append((final_norm, content_data, base_domain, depth))
+                    if text:
+                        # Extract links with metadata for internal links tracking
+                        links, detailed_links = await extract_links_with_metadata(text, final_norm)
+                        print(f"  -> Found {len(links)} links in HTML")
                     
-                    # Count links with image alt text for verbose logging
-                    if verbose:
-                        img_alt_count = sum(1 for link in detailed_links if link['anchor_text'].startswith('[IMG:'))
-                        title_count = sum(1 for link in detailed_links if link['anchor_text'].startswith('[TITLE:'))
-                        if img_alt_count > 0:
-                            print(f"  -> Found {img_alt_count} links using image alt text as anchor")
-                        if title_count > 0:
-                            print(f"  -> Found {title_count} links using title attribute as anchor")
+                        # Count links with image alt text for verbose logging
+                        if verbose:
+                            img_alt_count = sum(1 for link in detailed_links if link['anchor_text'].startswith('[IMG:'))
+                            title_count = sum(1 for link in detailed_links if link['anchor_text'].startswith('[TITLE:'))
+                            if img_alt_count > 0:
+                                print(f"  -> Found {img_alt_count} links using image alt text as anchor")
+                            if title_count > 0:
+                                print(f"  -> Found {title_count} links using title attribute as anchor")
                     
-                    # Store detailed links data for internal links table
-                    if detailed_links:
-                        links_to_write.append((original_norm, detailed_links, base_domain))
+                        # Store detailed links data for internal links table
+                        if detailed_links:
+                            links_to_write.append((original_norm, detailed_links, base_domain))
                     
-                    # Only follow internal links if not in CSV restricted mode
-                    if depth < limits.max_depth and (not csv_urls or csv_seed_mode):
-                        for child in links:
-                            child_norm = normalize_url_for_storage(child)
+                        # Only follow internal links if not in CSV restricted mode
+                        if depth < limits.max_depth and (not csv_urls or csv_seed_mode):
+                            for child in links:
+                                child_norm = normalize_url_for_storage(child)
                             
-                            # Check if URL should be crawled based on classification
-                            if should_crawl_url(child_norm, base_domain, allow_external, is_from_sitemap=False, user_agent=http_config.user_agent, csv_urls=csv_urls, csv_seed_mode=csv_seed_mode, path_restriction=limits.path_restriction, path_exclude_prefixes=limits.path_exclude_prefixes, allowed_domains=limits.allowed_domains):
-                                children_to_enqueue.append((child_norm, depth + 1, original_norm, base_domain))
-                                # Don't log here - logging happens after filtering in batch_enqueue_frontier
-                            else:
-                                # Record but don't crawl (outside path restriction or external)
+                                # Check if URL should be crawled based on classification
+                                if should_crawl_url(child_norm, base_domain, allow_external, is_from_sitemap=False, user_agent=http_config.user_agent, csv_urls=csv_urls, csv_seed_mode=csv_seed_mode, path_restriction=limits.path_restriction, path_exclude_prefixes=limits.path_exclude_prefixes, allowed_domains=limits.allowed_domains):
+                                    children_to_enqueue.append((child_norm, depth + 1, original_norm, base_domain))
+                                    # Don't log here - logging happens after filtering in batch_enqueue_frontier
+                                else:
+                                    # Record but don't crawl (outside path restriction or external)
+                                    urls_to_upsert.append((child_norm, "other", base_domain, original_norm))
+                                    # Don't log external/social URLs to keep crawl output clean
+                        elif csv_urls and not csv_seed_mode:
+                            # In CSV restricted mode, just record links but don't follow them
+                            for child in links:
+                                child_norm = normalize_url_for_storage(child)
                                 urls_to_upsert.append((child_norm, "other", base_domain, original_norm))
-                                # Don't log external/social URLs to keep crawl output clean
-                    elif csv_urls and not csv_seed_mode:
-                        # In CSV restricted mode, just record links but don't follow them
-                        for child in links:
-                            child_norm = normalize_url_for_storage(child)
-                            urls_to_upsert.append((child_norm, "other", base_domain, original_norm))
-                            from .db import classify_url
-                            classification = classify_url(child_norm, base_domain, is_from_sitemap=False)
-                            print(f"  -> {classification.title()} URL recorded: {child_norm}")
-            else:
-                urls_to_upsert.append((original_norm, k, base_domain, parent_norm or normalize_url_for_storage(start)))
+                                from .db import classify_url
+                                classification = classify_url(child_norm, base_domain, is_from_sitemap=False)
+                                print(f"  -> {classification.title()} URL recorded: {child_norm}")
+                else:
+                    urls_to_upsert.append((original_norm, k, base_domain, parent_norm or normalize_url_for_storage(start)))
         
-        # Mark frontier as done IMMEDIATELY and synchronously to prevent race conditions
-        # This must complete before the next batch is fetched
-        # Do this AFTER processing all results in the batch, not inside the loop
-        if to_mark_done:
-            await frontier_mark_done(to_mark_done, base_domain, config=db_config)
+            # Mark frontier as done IMMEDIATELY and synchronously to prevent race conditions
+            # This must complete before the next batch is fetched
+            # Do this AFTER processing all results in the batch, not inside the loop
+            if to_mark_done:
+                await frontier_mark_done(to_mark_done, base_domain, config=db_config)
+            if failure_buffer.due():
+                await flush_failure_buffer(failure_buffer, crawl_db_path)
 
-        # Execute batch operations with parallelization
+            # Execute batch operations with parallelization
         
-        # Phase 1: Independent operations that can run in parallel
-        phase1_tasks = []
-        enqueue_task_index = -1
+            # Phase 1: Independent operations that can run in parallel
+            phase1_tasks = []
+            enqueue_task_index = -1
         
-        # Write pages (independent of other operations)
-        if pages_to_write:
-            print(f"  -> Writing {len(pages_to_write)} pages to database...")
-            # Use the new database abstraction
-            phase1_tasks.append(batch_write_pages(pages_to_write, pages_db_path, crawl_db_path, db_config))
+            # Write pages (independent of other operations)
+            if pages_to_write:
+                print(f"  -> Writing {len(pages_to_write)} pages to database...")
+                # Use the new database abstraction
+                phase1_tasks.append(batch_write_pages(pages_to_write, pages_db_path, crawl_db_path, db_config))
         
-        # Enqueue children (independent of other operations)
-        if children_to_enqueue:
-            print(f"  -> Checking {len(children_to_enqueue)} discovered URLs...")
-            enqueue_task_index = len(phase1_tasks)
-            phase1_tasks.append(batch_enqueue_frontier(children_to_enqueue, db_config))
+            # Enqueue children (independent of other operations)
+            if children_to_enqueue:
+                print(f"  -> Checking {len(children_to_enqueue)} discovered URLs...")
+                enqueue_task_index = len(phase1_tasks)
+                phase1_tasks.append(batch_enqueue_frontier(children_to_enqueue, db_config))
         
-        # Run Phase 1 operations in parallel
-        actually_enqueued = 0  # Track for batch complete message
-        if phase1_tasks:
-            results_phase1 = await asyncio.gather(*phase1_tasks, return_exceptions=True)
+            # Run Phase 1 operations in parallel
+            actually_enqueued = 0  # Track for batch complete message
+            if phase1_tasks:
+                results_phase1 = await asyncio.gather(*phase1_tasks, return_exceptions=True)
             
-            # Check for exceptions in results
-            for i, result in enumerate(results_phase1):
-                if isinstance(result, Exception):
-                    task_name = "batch_write_pages" if i == 0 else ("batch_enqueue_frontier" if i == enqueue_task_index else f"task_{i}")
-                    print(f"  -> ERROR: Exception in {task_name}: {result}")
-                    import traceback
-                    traceback.print_exception(type(result), result, result.__traceback__)
+                # Check for exceptions in results
+                for i, result in enumerate(results_phase1):
+                    if isinstance(result, Exception):
+                        task_name = "batch_write_pages" if i == 0 else ("batch_enqueue_frontier" if i == enqueue_task_index else f"task_{i}")
+                        print(f"  -> ERROR: Exception in {task_name}: {result}")
+                        import traceback
+                        traceback.print_exception(type(result), result, result.__traceback__)
             
-            # Log actual count of URLs enqueued (after filtering)
-            if enqueue_task_index >= 0 and enqueue_task_index < len(results_phase1):
-                enqueue_result = results_phase1[enqueue_task_index]
-                if not isinstance(enqueue_result, Exception) and enqueue_result is not None:
-                    actually_enqueued = enqueue_result
-                    skipped = len(children_to_enqueue) - actually_enqueued
-                    if actually_enqueued > 0:
-                        if skipped > 0:
-                            print(f"  -> Enqueued {actually_enqueued} new URLs to frontier (skipped {skipped} already in frontier)")
-                        else:
-                            print(f"  -> Enqueued {actually_enqueued} new URLs to frontier")
-                    elif skipped > 0:
-                        print(f"  -> All {skipped} URLs already in frontier (skipped)")
-        else:
-            # No phase1 tasks, so no URLs were enqueued
-            actually_enqueued = 0
+                # Log actual count of URLs enqueued (after filtering)
+                if enqueue_task_index >= 0 and enqueue_task_index < len(results_phase1):
+                    enqueue_result = results_phase1[enqueue_task_index]
+                    if not isinstance(enqueue_result, Exception) and enqueue_result is not None:
+                        actually_enqueued = enqueue_result
+                        skipped = len(children_to_enqueue) - actually_enqueued
+                        if actually_enqueued > 0:
+                            if skipped > 0:
+                                print(f"  -> Enqueued {actually_enqueued} new URLs to frontier (skipped {skipped} already in frontier)")
+                            else:
+                                print(f"  -> Enqueued {actually_enqueued} new URLs to frontier")
+                        elif skipped > 0:
+                            print(f"  -> All {skipped} URLs already in frontier (skipped)")
+            else:
+                # No phase1 tasks, so no URLs were enqueued
+                actually_enqueued = 0
         
-        # Now that current batch is marked as done, prefetch next batch
-        if limits.max_pages == 0 or processed + batch_size < limits.max_pages:
-            next_batch_task = asyncio.create_task(
-                frontier_next_batch(batch_size, config=db_config)
-            )
+            # Now that current batch is marked as done, prefetch next batch
+            if limits.max_pages == 0 or processed + batch_size < limits.max_pages:
+                next_batch_task = asyncio.create_task(
+                    frontier_next_batch(batch_size, config=db_config)
+                )
         
-        # Phase 2: URL operations (must complete before content/links/redirects)
-        if urls_to_upsert:
-            if shutdown_requested or force_quit:
-                break
-            print(f"  -> Upserting {len(urls_to_upsert)} URLs to database...")
-            await batch_upsert_urls(urls_to_upsert, db_config)
+            # Phase 2: URL operations (must complete before content/links/redirects)
+            if urls_to_upsert:
+                if shutdown_requested or force_quit:
+                    break
+                print(f"  -> Upserting {len(urls_to_upsert)} URLs to database...")
+                await batch_upsert_urls(urls_to_upsert, db_config)
         
-        # Phase 3: Content-dependent operations that can run in parallel
-        phase3_tasks = []
+            # Phase 3: Content-dependent operations that can run in parallel
+            phase3_tasks = []
         
-        # Write content (depends on URLs being upserted)
-        if content_to_write:
-            print(f"  -> Writing {len(content_to_write)} content extractions to database...")
-            phase3_tasks.append(batch_write_content_with_url_resolution(content_to_write, crawl_db_path, db_config))
+            # Write content (depends on URLs being upserted)
+            if content_to_write:
+                print(f"  -> Writing {len(content_to_write)} content extractions to database...")
+                phase3_tasks.append(batch_write_content_with_url_resolution(content_to_write, crawl_db_path, db_config))
         
-        # Write internal links (depends on URLs being upserted)
-        if links_to_write:
-            print(f"  -> Writing {len(links_to_write)} internal links to database...")
-            phase3_tasks.append(batch_write_internal_links(links_to_write, crawl_db_path, db_config))
+            # Write internal links (depends on URLs being upserted)
+            if links_to_write:
+                print(f"  -> Writing {len(links_to_write)} internal links to database...")
+                phase3_tasks.append(batch_write_internal_links(links_to_write, crawl_db_path, db_config))
         
-        # Write redirect data (depends on URLs being upserted)
-        if redirect_data_to_write:
-            print(f"  -> Writing {len(redirect_data_to_write)} redirect chains to database...")
-            phase3_tasks.append(batch_write_redirects(redirect_data_to_write, crawl_db_path, db_config))
+            # Write redirect data (depends on URLs being upserted)
+            if redirect_data_to_write:
+                print(f"  -> Writing {len(redirect_data_to_write)} redirect chains to database...")
+                phase3_tasks.append(batch_write_redirects(redirect_data_to_write, crawl_db_path, db_config))
         
-        # Run Phase 3 operations in parallel
-        if phase3_tasks:
-            # Check for shutdown before starting database operations
-            if shutdown_requested or force_quit:
-                print("Shutdown requested. Skipping database operations...")
-                break
+            # Run Phase 3 operations in parallel
+            if phase3_tasks:
+                # Check for shutdown before starting database operations
+                if shutdown_requested or force_quit:
+                    print("Shutdown requested. Skipping database operations...")
+                    break
             
-            # Run operations with timeout and cancellation support
-            try:
-                # Create tasks
-                task_list = [asyncio.create_task(task) for task in phase3_tasks]
+                # Run operations with timeout and cancellation support
+                try:
+                    # Create tasks
+                    task_list = [asyncio.create_task(task) for task in phase3_tasks]
                 
-                # Wait for completion with a timeout
-                done, pending = await asyncio.wait(
-                    task_list,
-                    timeout=60.0,  # 60 second timeout
-                    return_when=asyncio.ALL_COMPLETED
-                )
+                    # Wait for completion with a timeout
+                    done, pending = await asyncio.wait(
+                        task_list,
+                        timeout=60.0,  # 60 second timeout
+                        return_when=asyncio.ALL_COMPLETED
+                    )
                 
-                # Check if shutdown was requested during operations
-                if shutdown_requested or force_quit:
-                    # Cancel any pending tasks
-                    for task in pending:
-                        task.cancel()
-                    # Don't wait for cancellation - break immediately
-                    print("Shutdown detected. Cancelling database operations...")
-                    break
+                    # Check if shutdown was requested during operations
+                    if shutdown_requested or force_quit:
+                        # Cancel any pending tasks
+                        for task in pending:
+                            task.cancel()
+                        # Don't wait for cancellation - break immediately
+                        print("Shutdown detected. Cancelling database operations...")
+                        break
                     
-            except asyncio.CancelledError:
-                if shutdown_requested or force_quit:
-                    print("Database operations cancelled.")
-                    break
-            except Exception as e:
-                if not (shutdown_requested or force_quit):
-                    print(f"Error in database operations: {e}")
+                except asyncio.CancelledError:
+                    if shutdown_requested or force_quit:
+                        print("Database operations cancelled.")
+                        break
+                except Exception as e:
+                    if not (shutdown_requested or force_quit):
+                        print(f"Error in database operations: {e}")
         
-        # Phase 4: Hreflang processing (depends on content being written)
-        if content_to_write:
-            from .db_operations import add_hreflang_urls_to_frontier
-            await add_hreflang_urls_to_frontier(crawl_db_path, base_domain, db_config)
+            # Phase 4: Hreflang processing (depends on content being written)
+            if content_to_write:
+                from .db_operations import add_hreflang_urls_to_frontier
+                await add_hreflang_urls_to_frontier(crawl_db_path, base_domain, db_config)
         
-        # Store the prefetched batch for the next iteration
-        if next_batch_task:
-            try:
-                next_batch = await next_batch_task
-                if next_batch:
-                    next_batch_cache = next_batch
-                else:
-                    # No more URLs available, we'll exit on next iteration
+            # Store the prefetched batch for the next iteration
+            if next_batch_task:
+                try:
+                    next_batch = await next_batch_task
+                    if next_batch:
+                        next_batch_cache = next_batch
+                    else:
+                        # No more URLs available, we'll exit on next iteration
+                        next_batch_cache = None
+                except Exception as e:
+                    print(f"Warning: Failed to prefetch next batch: {e}")
                     next_batch_cache = None
-            except Exception as e:
-                print(f"Warning: Failed to prefetch next batch: {e}")
-                next_batch_cache = None
         
-        processed += len(results)
-        # Count path-filtered URLs towards total (they're marked done but not crawled)
-        processed += len(path_restricted_urls) + len(path_excluded_urls) + len(domain_filtered_urls)
+            processed += len(results)
+            # Count path-filtered URLs towards total (they're marked done but not crawled)
+            processed += len(path_restricted_urls) + len(path_excluded_urls) + len(domain_filtered_urls)
         
-        if path_restricted_urls or path_excluded_urls or domain_filtered_urls:
-            print(
-                f"Batch complete: processed {len(results)} URLs, "
-                f"skipped {len(domain_filtered_urls)} (domain filtered), "
-                f"skipped {len(path_restricted_urls)} (path restricted), "
-                f"skipped {len(path_excluded_urls)} (path excluded), "
-                f"enqueued {actually_enqueued} new URLs"
-            )
-        else:
-            print(f"Batch complete: processed {len(results)} URLs, enqueued {actually_enqueued} new URLs")
-        if limits.max_pages > 0:
-            print(f"Total processed so far: {processed}/{limits.max_pages}")
-        else:
-            print(f"Total processed so far: {processed} (no limit)")
-        print()
+            if path_restricted_urls or path_excluded_urls or domain_filtered_urls:
+                print(
+                    f"Batch complete: processed {len(results)} URLs, "
+                    f"skipped {len(domain_filtered_urls)} (domain filtered), "
+                    f"skipped {len(path_restricted_urls)} (path restricted), "
+                    f"skipped {len(path_excluded_urls)} (path excluded), "
+                    f"enqueued {actually_enqueued} new URLs"
+                )
+            else:
+                print(f"Batch complete: processed {len(results)} URLs, enqueued {actually_enqueued} new URLs")
+            if limits.max_pages > 0:
+                print(f"Total processed so far: {processed}/{limits.max_pages}")
+            else:
+                print(f"Total processed so far: {processed} (no limit)")
+            print()
 
+        # Write any failures still waiting in the buffer
+        if failure_buffer.pending:
+            await flush_failure_buffer(failure_buffer, crawl_db_path)
+    
     # Final frontier stats
     q, d = await frontier_stats(config=db_config)
     print(f"Final frontier status — queued: {q}, done: {d}")
@@ -1364,6 +1389,14 @@ async def crawl(start: str, use_js: bool = False, limits: CrawlLimits | None = N
             except Exception as e:
                 print(f"Error getting frontier scoring stats: {e}")
     
+    # Give the SQLite views fresh statistics for the data this run wrote
+    if db_config.backend == "sqlite":
+        try:
+            from .db import finalize_crawl
+            await finalize_crawl(crawl_db_path)
+        except Exception as e:
+            print(f"Warning: failed to refresh database statistics: {e}")
+    
     if shutdown_requested:
         print("Crawl paused. Run the same command again to resume from where you left off.")
     else:
@@ -113,11 +113,12 @@ class SQLiteConnection(DatabaseConnection):
             await self.conn.close()
     
     async def _optimize_connection(self):
-        """Apply SQLite performance optimizations."""
+        """Apply SQLite performance optimizations (once per connection, on open)."""
         if self.conn:
             await self.conn.execute("PRAGMA journal_mode=WAL")
             await self.conn.execute("PRAGMA synchronous=NORMAL")
-            await self.conn.execute("PRAGMA cache_size=10000")
+            await self.conn.execute("PRAGMA mmap_size=268435456")  # 256 MiB memory-mapped I/O
+            await self.conn.execute("PRAGMA cache_size=-65536")  # 64 MiB page cache
             await self.conn.execute("PRAGMA temp_store=MEMORY")
     
     async def execute(self, query: str, *args) -> aiosqlite.Cursor:
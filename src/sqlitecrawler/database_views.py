@@ -22,7 +22,11 @@ SELECT
                 WHEN i.html_meta_allows = 0 THEN 'blocked by meta robots'
                 WHEN i.http_header_allows = 0 THEN 'blocked by HTTP headers'
                 WHEN pm.initial_status_code != 200 THEN 'not 200 status'
-                WHEN canonical_urls_table.url IS NOT NULL AND canonical_urls_table.url != u.url THEN 'not self canonical'
+                WHEN EXISTS (
+                    SELECT 1 FROM canonical_urls cu
+                    JOIN urls canonical_urls_table ON cu.canonical_url_id = canonical_urls_table.id
+                    WHERE cu.url_id = u.id AND canonical_urls_table.url != u.url
+                ) THEN 'not self canonical'
                 ELSE 'unknown reason'
             END
         ELSE NULL
@@ -99,8 +103,12 @@ SELECT
     COALESCE(i.robots_txt_directives, '') as robots_txt_directives,
     COALESCE(i.html_meta_directives, '') as html_meta_directives,
     COALESCE(i.http_header_directives, '') as http_header_directives,
-    GROUP_CONCAT(DISTINCT canonical_urls_table.url) as canonical_urls,
-    GROUP_CONCAT(DISTINCT cu.source) as canonical_sources,
+    -- Canonicals come from per-page index lookups so the outer query needs no GROUP BY
+    (SELECT GROUP_CONCAT(DISTINCT canonical_urls_table.url)
+     FROM canonical_urls cu
+     JOIN urls canonical_urls_table ON cu.canonical_url_id = canonical_urls_table.id
+     WHERE cu.url_id = u.id) as canonical_urls,
+    (SELECT GROUP_CONCAT(DISTINCT cu.source) FROM canonical_urls cu WHERE cu.url_id = u.id) as canonical_sources,
     CASE 
         WHEN pm.initial_status_code IN (301, 302, 303, 307, 308) THEN redirect_dest.url
         ELSE NULL
@@ -153,120 +161,116 @@ LEFT JOIN meta_descriptions md ON c.meta_description_id = md.id
 LEFT JOIN html_languages hl ON c.html_lang_id = hl.id
 LEFT JOIN page_metadata pm ON u.id = pm.url_id
 LEFT JOIN indexability i ON u.id = i.url_id
-LEFT JOIN canonical_urls cu ON u.id = cu.url_id
-LEFT JOIN urls canonical_urls_table ON cu.canonical_url_id = canonical_urls_table.id
 LEFT JOIN urls redirect_dest ON pm.redirect_destination_url_id = redirect_dest.id
 WHERE u.classification IN ('internal', 'network')
-  AND u.url NOT LIKE '%#%'
-GROUP BY u.id;
+  AND u.url NOT LIKE '%#%';
 
--- Internal links view
-CREATE VIEW IF NOT EXISTS view_links_internal AS
-SELECT DISTINCT
+-- All links from internal pages; the per-classification views below filter it on target_classification
+CREATE VIEW IF NOT EXISTS view_links AS
+SELECT 
     source.url as source_url,
+    il.target_url_id,
     target.url as target_url,
+    target.classification as target_classification,
     at.text as anchor_text,
     x.xpath,
     f.fragment,
     il.url_parameters,
-    MIN(il.discovered_at) as discovered_at,
+    il.discovered_at,
     CASE WHEN at.text IS NULL THEN 1 ELSE 0 END as is_image,
     CASE WHEN f.fragment IS NOT NULL THEN 1 ELSE 0 END as has_fragment,
-    CASE WHEN il.url_parameters IS NOT NULL THEN 1 ELSE 0 END as has_parameters,
+    CASE WHEN il.url_parameters IS NOT NULL THEN 1 ELSE 0 END as has_parameters
+FROM internal_links il
+JOIN urls source ON il.source_url_id = source.id
+LEFT JOIN urls target ON il.target_url_id = target.id
+LEFT JOIN anchor_texts at ON il.anchor_text_id = at.id
+LEFT JOIN xpaths x ON il.xpath_id = x.id
+LEFT JOIN fragments f ON il.fragment_id = f.id
+WHERE source.classification = 'internal';
+
+-- Internal links view
+CREATE VIEW IF NOT EXISTS view_links_internal AS
+SELECT DISTINCT
+    l.source_url,
+    l.target_url,
+    l.anchor_text,
+    l.xpath,
+    l.fragment,
+    l.url_parameters,
+    MIN(l.discovered_at) as discovered_at,
+    l.is_image,
+    l.has_fragment,
+    l.has_parameters,
     COALESCE(
         pm.initial_status_code,
-        (SELECT pm_redirect.initial_status_code FROM page_metadata pm_redirect WHERE pm_redirect.final_url_id = target.id LIMIT 1)
+        (SELECT pm_redirect.initial_status_code FROM page_metadata pm_redirect WHERE pm_redirect.final_url_id = l.target_url_id LIMIT 1)
     ) as target_status_code,
     CASE 
         WHEN EXISTS (
             SELECT 1 FROM canonical_urls cu 
             JOIN urls canonical_target ON cu.canonical_url_id = canonical_target.id 
-            WHERE cu.url_id = target.id AND canonical_target.url = target.url
+            WHERE cu.url_id = l.target_url_id AND canonical_target.url = l.target_url
         ) THEN 1 
         ELSE 0 
     END as target_is_self_canonical,
     CASE 
-        WHEN pm.url_id IS NOT NULL AND (pm.final_url_id IS NULL OR pm.final_url_id = target.id) THEN 1
+        WHEN pm.url_id IS NOT NULL AND (pm.final_url_id IS NULL OR pm.final_url_id = l.target_url_id) THEN 1
         WHEN EXISTS (
             SELECT 1 FROM page_metadata pm_redirect 
-            WHERE pm_redirect.final_url_id = target.id
+            WHERE pm_redirect.final_url_id = l.target_url_id
         ) THEN 1
         ELSE 0
     END as target_resolves
-FROM internal_links il
-JOIN urls source ON il.source_url_id = source.id
-LEFT JOIN urls target ON il.target_url_id = target.id
-LEFT JOIN anchor_texts at ON il.anchor_text_id = at.id
-LEFT JOIN xpaths x ON il.xpath_id = x.id
-LEFT JOIN fragments f ON il.fragment_id = f.id
-LEFT JOIN page_metadata pm ON target.id = pm.url_id
-WHERE source.classification = 'internal' AND (target.classification = 'internal' OR target.classification IS NULL)
-  AND (pm.url_id IS NOT NULL OR EXISTS (SELECT 1 FROM page_metadata pm_check WHERE pm_check.final_url_id = target.id))  -- Only include crawled target URLs
-GROUP BY source.url, target.url, at.text, x.xpath, f.fragment, il.url_parameters, target_status_code, target_resolves;
+FROM view_links l
+LEFT JOIN page_metadata pm ON l.target_url_id = pm.url_id
+WHERE l.target_classification = 'internal'
+  AND (pm.url_id IS NOT NULL OR EXISTS (SELECT 1 FROM page_metadata pm_check WHERE pm_check.final_url_id = l.target_url_id))  -- Only include crawled target URLs
+GROUP BY l.source_url, l.target_url, l.anchor_text, l.xpath, l.fragment, l.url_parameters, target_status_code, target_resolves;
 
 -- Network links view
 CREATE VIEW IF NOT EXISTS view_links_network AS
-SELECT 
-    source.url as source_url,
-    target.url as target_url,
-    at.text as anchor_text,
-    x.xpath,
-    f.fragment,
-    il.url_parameters,
-    il.discovered_at,
-    CASE WHEN at.text IS NULL THEN 1 ELSE 0 END as is_image,
-    CASE WHEN f.fragment IS NOT NULL THEN 1 ELSE 0 END as has_fragment,
-    CASE WHEN il.url_parameters IS NOT NULL THEN 1 ELSE 0 END as has_parameters
-FROM internal_links il
-JOIN urls source ON il.source_url_id = source.id
-LEFT JOIN urls target ON il.target_url_id = target.id
-LEFT JOIN anchor_texts at ON il.anchor_text_id = at.id
-LEFT JOIN xpaths x ON il.xpath_id = x.id
-LEFT JOIN fragments f ON il.fragment_id = f.id
-WHERE source.classification = 'internal' AND target.classification = 'network';
+SELECT source_url, target_url, anchor_text, xpath, fragment, url_parameters, discovered_at,
+       is_image, has_fragment, has_parameters
+FROM view_links
+WHERE target_classification = 'network';
 
 -- External links view
 CREATE VIEW IF NOT EXISTS view_links_external AS
 SELECT DISTINCT
-    source.url as source_url,
-    target.url as target_url,
-    at.text as anchor_text,
-    x.xpath,
-    f.fragment,
-    il.url_parameters,
-    MIN(il.discovered_at) as discovered_at,
-    CASE WHEN at.text IS NULL THEN 1 ELSE 0 END as is_image,
-    CASE WHEN f.fragment IS NOT NULL THEN 1 ELSE 0 END as has_fragment,
-    CASE WHEN il.url_parameters IS NOT NULL THEN 1 ELSE 0 END as has_parameters,
+    l.source_url,
+    l.target_url,
+    l.anchor_text,
+    l.xpath,
+    l.fragment,
+    l.url_parameters,
+    MIN(l.discovered_at) as discovered_at,
+    l.is_image,
+    l.has_fragment,
+    l.has_parameters,
     COALESCE(
         pm.initial_status_code,
-        (SELECT pm_redirect.initial_status_code FROM page_metadata pm_redirect WHERE pm_redirect.final_url_id = target.id LIMIT 1)
+        (SELECT pm_redirect.initial_status_code FROM page_metadata pm_redirect WHERE pm_redirect.final_url_id = l.target_url_id LIMIT 1)
     ) as target_status_code,
     CASE 
         WHEN EXISTS (
             SELECT 1 FROM canonical_urls cu 
             JOIN urls canonical_target ON cu.canonical_url_id = canonical_target.id 
-            WHERE cu.url_id = target.id AND canonical_target.url = target.url
+            WHERE cu.url_id = l.target_url_id AND canonical_target.url = l.target_url
         ) THEN 1 
         ELSE 0 
     END as target_is_self_canonical,
     CASE 
-        WHEN pm.url_id IS NOT NULL AND (pm.final_url_id IS NULL OR pm.final_url_id = target.id) THEN 1
+        WHEN pm.url_id IS NOT NULL AND (pm.final_url_id IS NULL OR pm.final_url_id = l.target_url_id) THEN 1
         WHEN EXISTS (
             SELECT 1 FROM page_metadata pm_redirect 
-            WHERE pm_redirect.final_url_id = target.id
+            WHERE pm_redirect.final_url_id = l.target_url_id
         ) THEN 1
         ELSE 0
     END as target_resolves
-FROM internal_links il
-JOIN urls source ON il.source_url_id = source.id
-LEFT JOIN urls target ON il.target_url_id = target.id
-LEFT JOIN anchor_texts at ON il.anchor_text_id = at.id
-LEFT JOIN xpaths x ON il.xpath_id = x.id
-LEFT JOIN fragments f ON il.fragment_id = f.id
-LEFT JOIN page_metadata pm ON target.id = pm.url_id
-WHERE source.classification = 'internal' AND target.classification = 'external'
-GROUP BY source.url, target.url, at.text, x.xpath, f.fragment, il.url_parameters, target_status_code, target_resolves;
+FROM view_links l
+LEFT JOIN page_metadata pm ON l.target_url_id = pm.url_id
+WHERE l.target_classification = 'external'
+GROUP BY l.source_url, l.target_url, l.anchor_text, l.xpath, l.fragment, l.url_parameters, target_status_code, target_resolves;
 
 -- Invalid content links view (redirects, non-canonical, or non-200 status)
 CREATE VIEW IF NOT EXISTS view_links_invalid_content AS
@@ -324,24 +328,10 @@ WHERE target_status_code IS NOT NULL  -- Only include crawled URLs
 
 -- Subdomain links view
 CREATE VIEW IF NOT EXISTS view_links_subdomain AS
-SELECT 
-    source.url as source_url,
-    target.url as target_url,
-    at.text as anchor_text,
-    x.xpath,
-    f.fragment,
-    il.url_parameters,
-    il.discovered_at,
-    CASE WHEN at.text IS NULL THEN 1 ELSE 0 END as is_image,
-    CASE WHEN f.fragment IS NOT NULL THEN 1 ELSE 0 END as has_fragment,
-    CASE WHEN il.url_parameters IS NOT NULL THEN 1 ELSE 0 END as has_parameters
-FROM internal_links il
-JOIN urls source ON il.source_url_id = source.id
-LEFT JOIN urls target ON il.target_url_id = target.id
-LEFT JOIN anchor_texts at ON il.anchor_text_id = at.id
-LEFT JOIN xpaths x ON il.xpath_id = x.id
-LEFT JOIN fragments f ON il.fragment_id = f.id
-WHERE source.classification = 'internal' AND target.classification = 'subdomain';
+SELECT source_url, target_url, anchor_text, xpath, fragment, url_parameters, discovered_at,
+       is_image, has_fragment, has_parameters
+FROM view_links
+WHERE target_classification = 'subdomain';
 
 -- Sitemap statistics view
 CREATE VIEW IF NOT EXISTS view_sitemap_statistics AS
@@ -410,6 +400,105 @@ SELECT
 FROM frontier f
 GROUP BY f.status;
 
+-- Whole-crawl summary report (one row), read by db.get_crawl_status
+CREATE VIEW IF NOT EXISTS view_crawl_summary AS
+WITH sitemap_stats AS (
+    SELECT 
+        COUNT(DISTINCT s.id) as sitemaps_scraped,
+        COUNT(*) as urls_in_sitemaps
+    FROM sitemaps s
+    JOIN url_sitemaps us ON s.id = us.sitemap_id
+),
+url_classification_stats AS (
+    -- Pivot in one pass so every other CTE stays a single row
+    SELECT 
+        COALESCE(SUM(CASE WHEN classification = 'internal' THEN 1 ELSE 0 END), 0) as internal_urls,
+        COALESCE(SUM(CASE WHEN classification = 'network' THEN 1 ELSE 0 END), 0) as network_urls,
+        COALESCE(SUM(CASE WHEN classification = 'external' THEN 1 ELSE 0 END), 0) as external_urls,
+        COALESCE(SUM(CASE WHEN classification = 'social' THEN 1 ELSE 0 END), 0) as social_urls
+    FROM urls
+),
+crawled_stats AS (
+    SELECT 
+        COUNT(*) as total_crawled,
+        COUNT(*) as status_200,  -- URLs with content are considered successfully crawled
+        0 as non_200  -- We don't track non-200s in this schema
+    FROM content
+),
+canonical_stats AS (
+    SELECT 
+        COUNT(*) as total_with_canonical,
+        SUM(CASE WHEN cu.canonical_url_id IS NOT NULL THEN 1 ELSE 0 END) as has_canonical,
+        SUM(CASE WHEN cu.canonical_url_id IS NULL THEN 1 ELSE 0 END) as no_canonical
+    FROM content c
+    LEFT JOIN canonical_urls cu ON c.url_id = cu.url_id
+),
+indexability_stats AS (
+    SELECT 
+        COUNT(*) as total_indexable_checked,
+        SUM(CASE WHEN overall_indexable = 1 THEN 1 ELSE 0 END) as indexable,
+        SUM(CASE WHEN overall_indexable = 0 THEN 1 ELSE 0 END) as non_indexable
+    FROM indexability
+),
+sitemap_coverage AS (
+    SELECT 
+        COUNT(DISTINCT u.id) as internal_urls_total,
+        COUNT(DISTINCT us.url_id) as internal_urls_in_sitemap,
+        COUNT(DISTINCT u.id) - COUNT(DISTINCT us.url_id) as internal_urls_not_in_sitemap
+    FROM urls u
+    LEFT JOIN url_sitemaps us ON u.id = us.url_id
+    WHERE u.classification IN ('internal', 'network')
+),
+sitemap_orphans AS (
+    SELECT 
+        COUNT(DISTINCT us.url_id) as sitemap_urls_total,
+        COUNT(DISTINCT c.url_id) as sitemap_urls_crawled,
+        COUNT(DISTINCT us.url_id) - COUNT(DISTINCT c.url_id) as sitemap_urls_not_crawled
+    FROM url_sitemaps us
+    LEFT JOIN content c ON us.url_id = c.url_id
+)
+SELECT 
+    -- Sitemap statistics
+    ss.sitemaps_scraped,
+    ss.urls_in_sitemaps,
+    
+    -- URL classification
+    ucs.internal_urls,
+    ucs.network_urls,
+    ucs.external_urls,
+    ucs.social_urls,
+    
+    -- Crawl progress
+    cs.total_crawled,
+    cs.status_200,
+    cs.non_200,
+    
+    -- Canonical URL analysis
+    cans.has_canonical,
+    cans.no_canonical,
+    
+    -- Indexability analysis
+    ins.indexable,
+    ins.non_indexable,
+    
+    -- Sitemap coverage analysis
+    sc.internal_urls_not_in_sitemap,
+    so.sitemap_urls_not_crawled,
+    
+    -- Calculated percentages
+    ROUND((cs.status_200 * 100.0 / NULLIF(cs.total_crawled, 0)), 2) as success_rate_percent,
+    ROUND((cans.has_canonical * 100.0 / NULLIF(cans.total_with_canonical, 0)), 2) as canonical_coverage_percent,
+    ROUND((ins.indexable * 100.0 / NULLIF(ins.total_indexable_checked, 0)), 2) as indexability_rate_percent,
+    ROUND((sc.internal_urls_in_sitemap * 100.0 / NULLIF(sc.internal_urls_total, 0)), 2) as sitemap_coverage_percent
+
+FROM sitemap_stats ss
+CROSS JOIN url_classification_stats ucs
+CROSS JOIN crawled_stats cs
+CROSS JOIN canonical_stats cans
+CROSS JOIN indexability_stats ins
+CROSS JOIN sitemap_coverage sc
+CROSS JOIN sitemap_orphans so;
+
 -- UTM links view
 CREATE VIEW IF NOT EXISTS view_utm_links AS
 SELECT 
@@ -452,24 +541,73 @@ GROUP BY content_hash_sha256
 HAVING COUNT(*) > 1
 ORDER BY duplicate_count DESC;
 
+-- Exact duplicates as one row per hash with the page IDs; expand with db.iter_exact_duplicate_pairs()
+CREATE VIEW IF NOT EXISTS view_exact_duplicate_groups AS
+SELECT 
+    content_hash_sha256,
+    COUNT(*) as duplicate_count,
+    MAX(content_length) as content_length,
+    json_group_array(url_id) as dup_ids
+FROM content
+WHERE content_hash_sha256 IS NOT NULL 
+  AND content_hash_sha256 != ''
+GROUP BY content_hash_sha256
+HAVING COUNT(*) > 1;
+
 -- Near duplicates view (using simhash)
+-- Pairs sharing any SimHash band are candidates (pigeonhole: distance <= 3 shares a band);
+-- candidates are verified with a 16-bit popcount of each band XOR, (a | b) - (a & b)
 CREATE VIEW IF NOT EXISTS view_near_duplicates AS
+WITH candidates AS (
+    SELECT c1.url_id as url1_id, c2.url_id as url2_id
+    FROM content c1 JOIN content c2 ON c2.simhash_b0 = c1.simhash_b0 AND c1.url_id < c2.url_id
+    UNION
+    SELECT c1.url_id, c2.url_id
+    FROM content c1 JOIN content c2 ON c2.simhash_b1 = c1.simhash_b1 AND c1.url_id < c2.url_id
+    UNION
+    SELECT c1.url_id, c2.url_id
+    FROM content c1 JOIN content c2 ON c2.simhash_b2 = c1.simhash_b2 AND c1.url_id < c2.url_id
+    UNION
+    SELECT c1.url_id, c2.url_id
+    FROM content c1 JOIN content c2 ON c2.simhash_b3 = c1.simhash_b3 AND c1.url_id < c2.url_id
+),
+band_xor AS (
+    SELECT cand.url1_id, cand.url2_id, (c1.simhash_b0 | c2.simhash_b0) - (c1.simhash_b0 & c2.simhash_b0) as x
+    FROM candidates cand JOIN content c1 ON c1.url_id = cand.url1_id JOIN content c2 ON c2.url_id = cand.url2_id
+    UNION ALL
+    SELECT cand.url1_id, cand.url2_id, (c1.simhash_b1 | c2.simhash_b1) - (c1.simhash_b1 & c2.simhash_b1)
+    FROM candidates cand JOIN content c1 ON c1.url_id = cand.url1_id JOIN content c2 ON c2.url_id = cand.url2_id
+    UNION ALL
+    SELECT cand.url1_id, cand.url2_id, (c1.simhash_b2 | c2.simhash_b2) - (c1.simhash_b2 & c2.simhash_b2)
+    FROM candidates cand JOIN content c1 ON c1.url_id = cand.url1_id JOIN content c2 ON c2.url_id = cand.url2_id
+    UNION ALL
+    SELECT cand.url1_id, cand.url2_id, (c1.simhash_b3 | c2.simhash_b3) - (c1.simhash_b3 & c2.simhash_b3)
+    FROM candidates cand JOIN content c1 ON c1.url_id = cand.url1_id JOIN content c2 ON c2.url_id = cand.url2_id
+),
+distances AS (
+    SELECT url1_id, url2_id, SUM((c + (c >> 8)) & 31) as hamming_distance
+    FROM (SELECT url1_id, url2_id, (b + (b >> 4)) & 3855 as c
+          FROM (SELECT url1_id, url2_id, (a & 13107) + ((a >> 2) & 13107) as b
+                FROM (SELECT url1_id, url2_id, x - ((x >> 1) & 21845) as a FROM band_xor)))
+    GROUP BY url1_id, url2_id
+)
 SELECT 
-    c1.url_id as url1_id,
+    d.url1_id,
     u1.url as url1,
-    c2.url_id as url2_id,
+    d.url2_id,
     u2.url as url2,
     c1.content_hash_simhash,
     c2.content_hash_simhash,
     c1.word_count as word_count1,
-    c2.word_count as word_count2
-FROM content c1
+    c2.word_count as word_count2,
+    d.hamming_distance
+FROM distances d
+JOIN content c1 ON c1.url_id = d.url1_id
+JOIN content c2 ON c2.url_id = d.url2_id
 JOIN urls u1 ON c1.url_id = u1.id
-JOIN content c2 ON c1.content_hash_simhash = c2.content_hash_simhash
 JOIN urls u2 ON c2.url_id = u2.id
-WHERE c1.url_id < c2.url_id
-  AND c1.content_hash_simhash IS NOT NULL
-  AND c2.content_hash_simhash IS NOT NULL;
+WHERE d.hamming_distance <= 3
+  AND c1.content_hash_sha256 != c2.content_hash_sha256;  -- Exclude exact duplicates
 
 -- Content hash statistics view
 CREATE VIEW IF NOT EXISTS view_content_hash_stats AS
@@ -935,7 +1073,11 @@ FULL OUTER JOIN latest_spa s ON s.base_domain = h.base_domain;
 
 
 def get_sqlite_views():
-    """Get SQLite database views as a list of statements."""
+    """Get SQLite database views as a list of statements.
+    
+    Each view is dropped before it is created (SQLite has no CREATE OR REPLACE VIEW),
+    so existing databases pick up changed definitions.
+    """
     import re
     # Split by CREATE VIEW statements
     views = re.split(r'CREATE VIEW IF NOT EXISTS', SQLITE_DATABASE_VIEWS)
@@ -944,6 +1086,7 @@ def get_sqlite_views():
         statement = "CREATE VIEW IF NOT EXISTS " + view.strip()
         if not statement.endswith(';'):
             statement += ';'
+        statements.append(f"DROP VIEW IF EXISTS {view.split()[0]};")
         statements.append(statement)
     return statements
 
@@ -1,24 +1,106 @@
 from __future__ import annotations
-import aiosqlite, json, zlib, base64, time, asyncio
+import aiosqlite, json, zlib, base64, time, asyncio, os, re, sqlite3
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from functools import lru_cache
+from urllib.parse import urlparse, urljoin, parse_qs, urlunparse
+from urllib.request import pathname2url
 from typing import Optional, Iterable, Tuple, List, Dict, Any
+from lxml import etree, html as lxml_html
+from bs4 import BeautifulSoup
 from .config import PAGES_DB_PATH, CRAWL_DB_PATH
+from .hashing import simhash_bands, generate_content_hashes
+from .schema import extract_schema_data, create_schema_content_hash, identify_schema_relationships
+from .robots import robots_decision
+from .database_views import get_sqlite_views
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers keep catching the latter
+_json_loads = orjson.loads if ORJSON_AVAILABLE else json.loads
+
+def _json_dumps(obj) -> str:
+    """Serialise obj for a JSON TEXT column, keeping non-ASCII characters as-is."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False)
+
+# INSERT ... RETURNING needs SQLite 3.35 (UPDATE ... FROM, also used here, needs 3.33)
+SQLITE_MIN_VERSION = (3, 35, 0)
+
+def check_sqlite_version():
+    """Fail early with a clear message when the linked SQLite library is too old."""
+    if sqlite3.sqlite_version_info < SQLITE_MIN_VERSION:
+        required = ".".join(map(str, SQLITE_MIN_VERSION))
+        raise RuntimeError(f"SQLite {required} or newer is required (found {sqlite3.sqlite_version})")
 
 # ------------------ compression helpers ------------------
 
-async def optimize_connection(conn):
-    """Apply performance optimizations to a database connection."""
-    await conn.execute("PRAGMA journal_mode=WAL")
-    await conn.execute("PRAGMA synchronous=NORMAL")
-    await conn.execute("PRAGMA cache_size=10000")
+# zstd frames start with this magic; legacy base64(zlib) bodies never can
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+ZSTD_LEVEL = 3
+
+# Truncate the WAL back to this size after checkpoints instead of leaving it at its high-water mark
+WAL_JOURNAL_SIZE_LIMIT = 64 * 1024 * 1024
+# Batch writers run a PASSIVE checkpoint after this many committed batches per database
+CHECKPOINT_EVERY_BATCHES = 50
+
+async def optimize_connection(conn, unsafe_bulk_load: bool = False):
+    """Apply performance optimizations to a database connection.
+    
+    unsafe_bulk_load turns fsync off entirely (synchronous=OFF); only use it for
+    one-off imports where a crash can be answered by re-running the import.
+    """
+    # In-memory databases have no WAL or file to map; only the cache pragmas apply
+    cursor = await conn.execute("PRAGMA database_list")
+    in_memory = not any(file_path for _, name, file_path in await cursor.fetchall() if name == "main")
+    if not in_memory:
+        cursor = await conn.execute("PRAGMA journal_mode=WAL")
+        row = await cursor.fetchone()
+        if row and str(row[0]).lower() not in ("wal", "memory"):
+            print(f"Warning: could not enable WAL mode (journal_mode={row[0]})")
+        await conn.execute("PRAGMA wal_autocheckpoint=1000")  # pages
+        await conn.execute(f"PRAGMA journal_size_limit={WAL_JOURNAL_SIZE_LIMIT}")
+        await conn.execute("PRAGMA mmap_size=268435456")  # 256 MiB memory-mapped I/O
+    await conn.execute("PRAGMA synchronous=OFF" if unsafe_bulk_load else "PRAGMA synchronous=NORMAL")
+    await conn.execute("PRAGMA cache_size=-65536")  # 64 MiB page cache
     await conn.execute("PRAGMA temp_store=MEMORY")
+    await conn.execute("PRAGMA busy_timeout=30000")  # Wait on concurrent writers instead of failing
 
 def compress_html(html: str) -> bytes:
-    """Compress HTML using zlib with maximum compression level for smaller file sizes."""
+    """Compress HTML with zstd when available, otherwise base64-encoded zlib at maximum level."""
+    if ZSTD_AVAILABLE:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(html.encode("utf-8"))
     return base64.b64encode(zlib.compress(html.encode("utf-8"), level=9))
 
+def compress_html_many(htmls: List[str]) -> List[bytes]:
+    """Compress a batch of HTML bodies in order (meant to run off the event loop)."""
+    return [compress_html(html) for html in htmls]
+
 def decompress_html(encoded: bytes) -> str:
-    """Decompress HTML from bytes to string."""
+    """Decompress HTML from bytes to string (zstd or legacy base64 zlib)."""
     try:
+        if encoded[:4] == ZSTD_MAGIC:
+            if not ZSTD_AVAILABLE:
+                print("Error decompressing HTML: zstandard is not installed")
+                return ""
+            return zstandard.ZstdDecompressor().decompress(encoded).decode("utf-8")
         return zlib.decompress(base64.b64decode(encoded)).decode("utf-8")
     except Exception:
         try:
@@ -37,153 +119,403 @@ def decompress_headers(encoded: bytes) -> dict:
     except Exception:
         return {}
 
-async def extract_content_from_html(html: str, headers: dict = None, base_url: str = None) -> dict:
-    """Extract title, meta description, robots, canonical, h1, h2 tags, word count, and schema data from HTML."""
-    import asyncio
-    import concurrent.futures
-    
-    def _parse_html_sync(html_content: str, headers_dict: dict = None, base_url_str: str = None) -> dict:
-        """Synchronous HTML parsing function to run in thread pool."""
+# ------------------ content extraction ------------------
+
+_XP_TITLE = etree.XPath("//title")
+_XP_META_DESCRIPTION = etree.XPath("//meta[@name='description']")
+_XP_META_ROBOTS = etree.XPath("//meta[@name='robots']")
+_XP_CANONICAL = etree.XPath("//link[contains(concat(' ', normalize-space(@rel), ' '), ' canonical ')]")
+_XP_HREFLANG = etree.XPath("//link[contains(concat(' ', normalize-space(@rel), ' '), ' alternate ')][@hreflang]")
+_XP_HEAD = etree.XPath("//head")
+_XP_H1 = etree.XPath("//h1")
+_XP_H2 = etree.XPath("//h2")
+_XP_SCRIPT_STYLE = etree.XPath("//script | //style")
+
+def _empty_content() -> dict:
+    """Content dict returned when a page cannot be parsed at all."""
+    return {
+        'title': None,
+        'meta_description': None,
+        'h1_tags': [],
+        'h2_tags': [],
+        'word_count': 0,
+        'html_meta_directives': [],
+        'http_header_directives': [],
+        'canonical_url': None,
+        'html_lang': None,
+        'hreflang_urls': [],
+        'schema_data': [],
+        'content_hash_sha256': '',
+        'content_hash_simhash': '',
+        'content_length': 0
+    }
+
+def _complete_content(fields: dict, html_content: str, headers_dict: dict = None, base_url_str: str = None,
+                      soup: BeautifulSoup = None) -> dict:
+    """Add robots directives, schema data and content hashes to parsed page fields.
+    
+    soup, if given, is an unmodified 'html.parser' soup of html_content; it is stripped in place.
+    """
+    meta_robots = fields.pop('meta_robots', None)
+    
+    # Parse robots directives from HTML meta
+    html_meta_directives = []
+    if meta_robots:
+        html_meta_directives = [d.strip().lower() for d in meta_robots.split(',')]
+    
+    # Parse robots directives from HTTP headers
+    http_header_directives = []
+    if headers_dict:
+        robots_header = headers_dict.get('x-robots-tag', '')
+        if robots_header:
+            http_header_directives = [d.strip().lower() for d in robots_header.split(',')]
+    
+    # One BeautifulSoup parse shared by schema extraction (read-only) and
+    # hashing (which strips the tree in place, so it must run last)
+    if soup is None and html_content:
         try:
-            from bs4 import BeautifulSoup
             soup = BeautifulSoup(html_content, 'html.parser')
-            
-            # Extract title
-            title_tag = soup.find('title')
-            title = title_tag.get_text().strip() if title_tag else None
-            
-            # Extract meta description
-            meta_desc_tag = soup.find('meta', attrs={'name': 'description'})
-            meta_description = meta_desc_tag.get('content', '').strip() if meta_desc_tag else None
-            
-            # Extract meta robots
-            meta_robots_tag = soup.find('meta', attrs={'name': 'robots'})
-            meta_robots = meta_robots_tag.get('content', '').strip() if meta_robots_tag else None
-            
-            # Extract canonical URL from HTML head
-            canonical_tag = soup.find('link', attrs={'rel': 'canonical'})
-            canonical_url = canonical_tag.get('href', '').strip() if canonical_tag else None
-            
-            # Extract hreflang URLs from HTML head
-            hreflang_urls = []
-            hreflang_links = soup.find_all('link', attrs={'rel': 'alternate', 'hreflang': True})
-            for link in hreflang_links:
-                href = link.get('href', '').strip()
-                hreflang = link.get('hreflang', '').strip()
-                if href and hreflang:
-                    hreflang_urls.append({'url': href, 'hreflang': hreflang})
-            
-            # Extract HTML lang declaration (check both html and head tags)
-            html_tag = soup.find('html')
-            html_lang = None
-            
-            if html_tag:
-                html_lang = html_tag.get('lang', '').strip()
-            
-            # If no lang on html tag, check head tag
-            if not html_lang:
-                head_tag = soup.find('head')
-                if head_tag:
-                    html_lang = head_tag.get('lang', '').strip()
-            
-            # If still no lang, check for xml:lang attribute
-            if not html_lang and html_tag:
-                html_lang = html_tag.get('xml:lang', '').strip()
-            
-            # Extract h1 tags
-            h1_tags = [h1.get_text().strip() for h1 in soup.find_all('h1') if h1.get_text().strip()]
-            
-            # Extract h2 tags
-            h2_tags = [h2.get_text().strip() for h2 in soup.find_all('h2') if h2.get_text().strip()]
-            
-            # Count words in visible text
-            for script in soup(["script", "style"]):
-                script.decompose()
-            text = soup.get_text()
-            words = text.split()
-            word_count = len(words)
-            
-            # Parse robots directives from HTML meta
-            html_meta_directives = []
-            if meta_robots:
-                directives = [d.strip().lower() for d in meta_robots.split(',')]
-                html_meta_directives = directives
-            
-            # Parse robots directives from HTTP headers
-            http_header_directives = []
-            if headers_dict:
-                robots_header = headers_dict.get('x-robots-tag', '')
-                if robots_header:
-                    directives = [d.strip().lower() for d in robots_header.split(',')]
-                    http_header_directives = directives
-            
-            # Extract schema data if base_url is provided
-            schema_data = []
-            if base_url_str:
-                try:
-                    from .schema import extract_schema_data
-                    schema_data = extract_schema_data(html_content, base_url_str)
-                except Exception as e:
-                    print(f"Error extracting schema data: {e}")
-                    schema_data = []
-            
-            # Generate content hashes for duplicate detection
-            content_hashes = {}
-            try:
-                from .hashing import generate_content_hashes
-                content_hashes = generate_content_hashes(html_content)
-            except Exception as e:
-                print(f"Error generating content hashes: {e}")
-                content_hashes = {
-                    'content_hash_sha256': '',
-                    'content_hash_simhash': '',
-                    'content_length': 0
-                }
-            
-            return {
-                'title': title,
-                'meta_description': meta_description,
-                'h1_tags': h1_tags,
-                'h2_tags': h2_tags,
-                'word_count': word_count,
-                'html_meta_directives': html_meta_directives,
-                'http_header_directives': http_header_directives,
-                'canonical_url': canonical_url,
-                'html_lang': html_lang,
-                'hreflang_urls': hreflang_urls,
-                'schema_data': schema_data,
-                'content_hash_sha256': content_hashes.get('content_hash_sha256', ''),
-                'content_hash_simhash': content_hashes.get('content_hash_simhash', ''),
-                'content_length': content_hashes.get('content_length', 0)
-            }
+        except Exception:
+            soup = None
+    
+    # Extract schema data if base_url is provided
+    schema_data = []
+    if base_url_str:
+        try:
+            schema_data = extract_schema_data(html_content, base_url_str, soup)
         except Exception as e:
-            print(f"Error extracting content from HTML: {e}")
-            return {
-                'title': None,
-                'meta_description': None,
-                'h1_tags': [],
-                'h2_tags': [],
-                'word_count': 0,
-                'html_meta_directives': [],
-                'http_header_directives': [],
-                'canonical_url': None,
-                'html_lang': None,
-                'hreflang_urls': [],
-                'schema_data': [],
-                'content_hash_sha256': '',
-                'content_hash_simhash': '',
-                'content_length': 0
-            }
+            print(f"Error extracting schema data: {e}")
+            schema_data = []
     
-    # Run the synchronous parsing in a thread pool to avoid blocking the event loop
-    loop = asyncio.get_event_loop()
-    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
-        result = await loop.run_in_executor(executor, _parse_html_sync, html, headers, base_url)
-    return result
+    # Generate content hashes for duplicate detection
+    content_hashes = {}
+    try:
+        content_hashes = generate_content_hashes(html_content, soup)
+    except Exception as e:
+        print(f"Error generating content hashes: {e}")
+        content_hashes = {
+            'content_hash_sha256': '',
+            'content_hash_simhash': '',
+            'content_length': 0
+        }
+    
+    fields.update({
+        'html_meta_directives': html_meta_directives,
+        'http_header_directives': http_header_directives,
+        'schema_data': schema_data,
+        'content_hash_sha256': content_hashes.get('content_hash_sha256', ''),
+        'content_hash_simhash': content_hashes.get('content_hash_simhash', ''),
+        'content_length': content_hashes.get('content_length', 0)
+    })
+    return fields
+
+def _parse_html_lxml(html_content: str, headers_dict: dict = None, base_url_str: str = None) -> dict:
+    """Parse page fields with lxml and precompiled XPaths (raises on markup lxml refuses)."""
+    root = lxml_html.fromstring(html_content)
+    
+    title_tags = _XP_TITLE(root)
+    title = title_tags[0].text_content().strip() if title_tags else None
+    
+    meta_desc_tags = _XP_META_DESCRIPTION(root)
+    meta_description = meta_desc_tags[0].get('content', '').strip() if meta_desc_tags else None
+    
+    meta_robots_tags = _XP_META_ROBOTS(root)
+    meta_robots = meta_robots_tags[0].get('content', '').strip() if meta_robots_tags else None
+    
+    canonical_tags = _XP_CANONICAL(root)
+    canonical_url = canonical_tags[0].get('href', '').strip() if canonical_tags else None
+    
+    hreflang_urls = []
+    for link in _XP_HREFLANG(root):
+        href = link.get('href', '').strip()
+        hreflang = link.get('hreflang', '').strip()
+        if href and hreflang:
+            hreflang_urls.append({'url': href, 'hreflang': hreflang})
+    
+    # HTML lang declaration: html tag, then head tag, then xml:lang
+    html_tag = root.getroottree().getroot()
+    html_lang = html_tag.get('lang', '').strip()
+    if not html_lang:
+        head_tags = _XP_HEAD(root)
+        if head_tags:
+            html_lang = head_tags[0].get('lang', '').strip()
+    if not html_lang:
+        html_lang = html_tag.get('xml:lang', '').strip()
+    
+    h1_tags = [text for text in (h1.text_content().strip() for h1 in _XP_H1(root)) if text]
+    h2_tags = [text for text in (h2.text_content().strip() for h2 in _XP_H2(root)) if text]
+    
+    # Count words in visible text
+    for element in _XP_SCRIPT_STYLE(root):
+        element.drop_tree()
+    word_count = len(html_tag.text_content().split())
+    
+    return _complete_content({
+        'title': title,
+        'meta_description': meta_description,
+        'meta_robots': meta_robots,
+        'h1_tags': h1_tags,
+        'h2_tags': h2_tags,
+        'word_count': word_count,
+        'canonical_url': canonical_url,
+        'html_lang': html_lang,
+        'hreflang_urls': hreflang_urls,
+    }, html_content, headers_dict, base_url_str)
+
+def _parse_html_bs4(html_content: str, headers_dict: dict = None, base_url_str: str = None) -> dict:
+    """Parse page fields with BeautifulSoup; fallback for markup lxml refuses."""
+    soup = BeautifulSoup(html_content, 'html.parser')
+    
+    # Extract title
+    title_tag = soup.find('title')
+    title = title_tag.get_text().strip() if title_tag else None
+    
+    # Extract meta description
+    meta_desc_tag = soup.find('meta', attrs={'name': 'description'})
+    meta_description = meta_desc_tag.get('content', '').strip() if meta_desc_tag else None
+    
+    # Extract meta robots
+    meta_robots_tag = soup.find('meta', attrs={'name': 'robots'})
+    meta_robots = meta_robots_tag.get('content', '').strip() if meta_robots_tag else None
+    
+    # Extract canonical URL from HTML head
+    canonical_tag = soup.find('link', attrs={'rel': 'canonical'})
+    canonical_url = canonical_tag.get('href', '').strip() if canonical_tag else None
+    
+    # Extract hreflang URLs from HTML head
+    hreflang_urls = []
+    hreflang_links = soup.find_all('link', attrs={'rel': 'alternate', 'hreflang': True})
+    for link in hreflang_links:
+        href = link.get('href', '').strip()
+        hreflang = link.get('hreflang', '').strip()
+        if href and hreflang:
+            hreflang_urls.append({'url': href, 'hreflang': hreflang})
+    
+    # Extract HTML lang declaration (check both html and head tags)
+    html_tag = soup.find('html')
+    html_lang = None
+    
+    if html_tag:
+        html_lang = html_tag.get('lang', '').strip()
+    
+    # If no lang on html tag, check head tag
+    if not html_lang:
+        head_tag = soup.find('head')
+        if head_tag:
+            html_lang = head_tag.get('lang', '').strip()
+    
+    # If still no lang, check for xml:lang attribute
+    if not html_lang and html_tag:
+        html_lang = html_tag.get('xml:lang', '').strip()
+    
+    # Extract h1 tags
+    h1_tags = [h1.get_text().strip() for h1 in soup.find_all('h1') if h1.get_text().strip()]
+    
+    # Extract h2 tags
+    h2_tags = [h2.get_text().strip() for h2 in soup.find_all('h2') if h2.get_text().strip()]
+    
+    # Count words in visible text (get_text() already skips script and style strings,
+    # so the tree stays intact for _complete_content)
+    text = soup.get_text()
+    words = text.split()
+    word_count = len(words)
+    
+    return _complete_content({
+        'title': title,
+        'meta_description': meta_description,
+        'meta_robots': meta_robots,
+        'h1_tags': h1_tags,
+        'h2_tags': h2_tags,
+        'word_count': word_count,
+        'canonical_url': canonical_url,
+        'html_lang': html_lang,
+        'hreflang_urls': hreflang_urls,
+    }, html_content, headers_dict, base_url_str, soup)
+
+def _parse_html_sync(html_content: str, headers_dict: dict = None, base_url_str: str = None) -> dict:
+    """Synchronous HTML parsing: lxml first, BeautifulSoup for markup lxml refuses."""
+    try:
+        return _parse_html_lxml(html_content, headers_dict, base_url_str)
+    except Exception:
+        pass
+    try:
+        return _parse_html_bs4(html_content, headers_dict, base_url_str)
+    except Exception as e:
+        print(f"Error extracting content from HTML: {e}")
+        return _empty_content()
+
+async def extract_content_from_html(html: str, headers: dict = None, base_url: str = None) -> dict:
+    """Extract title, meta description, robots, canonical, h1, h2 tags, word count, and schema data from HTML."""
+    # Run the synchronous parsing in the loop's shared thread pool to avoid blocking the event loop
+    return await asyncio.get_running_loop().run_in_executor(None, _parse_html_sync, html, headers, base_url)
 
 # ------------------ database connection pool ------------------
-# Note: Connection pooling was tested but found to cause issues with SQLite
-# Direct aiosqlite.connect() calls are more reliable and performant
+# Note: A global always-on connection pool was tested but found to cause issues with SQLite
+# (shared transactions across concurrent batch writers). DBPool is therefore opt-in, and every
+# helper that goes through _connection() holds the per-database lock for its whole transaction
+# (rolling back on error), so writers sharing a pooled connection never interleave.
+
+class DBPool:
+    """Long-lived crawl/pages connections reused by the db helpers while open.
+    
+    Use as ``async with DBPool(crawl_db_path, pages_db_path):`` around a crawl loop.
+    Each database has one read-write connection with its own lock, so a helper holds
+    it for its whole transaction, plus up to `readers` read-only connections that
+    WAL lets run alongside the writer; connections are closed when the block exits.
+    crawl() opens one around its crawl loop when the backend is SQLite.
+    """
+    active: Optional["DBPool"] = None
+    
+    def __init__(self, crawl_db_path: str = CRAWL_DB_PATH, pages_db_path: str = PAGES_DB_PATH, readers: int = 2):
+        self.paths = {crawl_db_path: "crawl", pages_db_path: "pages"}
+        self.crawl_db_path = crawl_db_path
+        self.pages_db_path = pages_db_path
+        self.readers = readers
+        self._conns: Dict[str, aiosqlite.Connection] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._idle_readers: Dict[str, List[aiosqlite.Connection]] = {}
+        self._reader_slots: Dict[str, asyncio.Semaphore] = {}
+        self._all_readers: List[aiosqlite.Connection] = []
+    
+    async def __aenter__(self) -> "DBPool":
+        DBPool.active = self
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        if DBPool.active is self:
+            DBPool.active = None
+        await self.close()
+    
+    async def get(self, db_path: str) -> aiosqlite.Connection:
+        """Return the shared connection for db_path, connecting lazily."""
+        conn = self._conns.get(db_path)
+        if conn is None:
+            conn = await aiosqlite.connect(db_path, cached_statements=SQLITE_CACHED_STATEMENTS)
+            await optimize_connection(conn)
+            if db_path == self.crawl_db_path:
+                await attach_pages_db(conn, self.pages_db_path)
+            self._conns[db_path] = conn
+        return conn
+    
+    async def get_crawl(self) -> aiosqlite.Connection:
+        return await self.get(self.crawl_db_path)
+    
+    async def get_pages(self) -> aiosqlite.Connection:
+        return await self.get(self.pages_db_path)
+    
+    def lock(self, db_path: str) -> asyncio.Lock:
+        if db_path not in self._locks:
+            self._locks[db_path] = asyncio.Lock()
+        return self._locks[db_path]
+    
+    @asynccontextmanager
+    async def reader(self, db_path: str):
+        """Borrow a read-only connection for db_path, opening up to `readers` of them lazily."""
+        if db_path not in self._reader_slots:
+            self._reader_slots[db_path] = asyncio.Semaphore(self.readers)
+            self._idle_readers[db_path] = []
+        async with self._reader_slots[db_path]:
+            idle = self._idle_readers[db_path]
+            conn = idle.pop() if idle else await self._open_reader(db_path)
+            try:
+                yield conn
+            finally:
+                idle.append(conn)
+    
+    async def _open_reader(self, db_path: str) -> aiosqlite.Connection:
+        uri = f"file:{pathname2url(os.path.abspath(db_path))}?mode=ro"
+        conn = await aiosqlite.connect(uri, uri=True, cached_statements=SQLITE_CACHED_STATEMENTS)
+        # The writer owns journal mode and checkpoints; readers only need the cache and wait settings
+        await conn.execute("PRAGMA mmap_size=268435456")
+        await conn.execute("PRAGMA cache_size=-65536")
+        await conn.execute("PRAGMA temp_store=MEMORY")
+        await conn.execute("PRAGMA busy_timeout=30000")
+        self._all_readers.append(conn)
+        return conn
+    
+    async def close(self):
+        conns, self._conns = self._conns, {}
+        for conn in conns.values():
+            # Long-lived connections refresh stale statistics on the way out
+            await conn.execute("PRAGMA optimize")
+            await conn.close()
+        readers, self._all_readers = self._all_readers, []
+        self._idle_readers, self._reader_slots = {}, {}
+        for conn in readers:
+            await conn.close()
+
+async def attach_pages_db(conn: aiosqlite.Connection, pages_db_path: str = PAGES_DB_PATH):
+    """Attach the pages database to a crawl connection as schema 'pagesdb' (no-op if attached)."""
+    cursor = await conn.execute("PRAGMA database_list")
+    for _, name, file_path in await cursor.fetchall():
+        if name == "pagesdb":
+            if file_path and os.path.realpath(file_path) == os.path.realpath(pages_db_path):
+                return
+            await conn.execute("DETACH DATABASE pagesdb")
+    await conn.execute("ATTACH DATABASE ? AS pagesdb", (pages_db_path,))
+    await conn.execute("PRAGMA pagesdb.journal_mode=WAL")
+    await conn.execute("PRAGMA pagesdb.synchronous=NORMAL")
+    await conn.execute(f"PRAGMA pagesdb.journal_size_limit={WAL_JOURNAL_SIZE_LIMIT}")
+
+@asynccontextmanager
+async def _connection(db_path: str):
+    """Yield the pooled connection for db_path if a DBPool is open, else a fresh one."""
+    pool = DBPool.active
+    if pool is not None and db_path in pool.paths:
+        async with pool.lock(db_path):
+            conn = await pool.get(db_path)
+            try:
+                yield conn
+            except BaseException:
+                # Never hand a half-written transaction to the next borrower
+                await conn.rollback()
+                raise
+            if conn.in_transaction:
+                # Uncommitted work is discarded, as closing a fresh connection would
+                await conn.rollback()
+    else:
+        async with aiosqlite.connect(db_path, cached_statements=SQLITE_CACHED_STATEMENTS) as conn:
+            await optimize_connection(conn)
+            yield conn
+
+@asynccontextmanager
+async def _read_connection(db_path: str):
+    """Yield a pooled read-only connection for db_path if a DBPool with readers is open, else _connection(db_path)."""
+    pool = DBPool.active
+    if pool is not None and pool.readers and db_path in pool.paths and os.path.exists(db_path):
+        async with pool.reader(db_path) as conn:
+            yield conn
+    else:
+        async with _connection(db_path) as conn:
+            yield conn
+
+_batches_since_checkpoint: Dict[str, int] = {}
+
+async def checkpoint_every(conn: aiosqlite.Connection, db_path: str):
+    """Count a committed batch for db_path and run a PASSIVE WAL checkpoint every CHECKPOINT_EVERY_BATCHES.
+    
+    PASSIVE never waits on readers or writers, so this only trims the WAL when it can.
+    Call it after the batch's commit.
+    """
+    count = _batches_since_checkpoint.get(db_path, 0) + 1
+    if count >= CHECKPOINT_EVERY_BATCHES:
+        await conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+        count = 0
+    _batches_since_checkpoint[db_path] = count
+
+async def begin_immediate(conn: aiosqlite.Connection, attempts: int = 3):
+    """Take the write lock before any work is done, backing off if it stays busy past busy_timeout."""
+    if conn.in_transaction:
+        return
+    for attempt in range(attempts):
+        try:
+            await conn.execute("BEGIN IMMEDIATE")
+            return
+        except aiosqlite.OperationalError as e:
+            if "database is locked" in str(e) and attempt < attempts - 1:
+                await asyncio.sleep(0.1 * (2 ** attempt))  # Exponential backoff
+                continue
+            raise
 
 # ------------------ schema init ------------------
 
@@ -235,6 +567,10 @@ CREATE TABLE IF NOT EXISTS content (
   content_hash_sha256 TEXT,  -- SHA256 hash for exact duplicate detection
   content_hash_simhash TEXT,  -- SimHash for near-duplicate detection
   content_length INTEGER,  -- Length of cleaned content
+  simhash_b0 INTEGER,  -- SimHash split into 16-bit bands for near-duplicate bucketing
+  simhash_b1 INTEGER,
+  simhash_b2 INTEGER,
+  simhash_b3 INTEGER,
   FOREIGN KEY (url_id) REFERENCES urls (id),
   FOREIGN KEY (meta_description_id) REFERENCES meta_descriptions (id),
   FOREIGN KEY (html_lang_id) REFERENCES html_languages (id)
@@ -242,6 +578,10 @@ CREATE TABLE IF NOT EXISTS content (
 CREATE INDEX IF NOT EXISTS idx_content_url_id ON content(url_id);
 CREATE INDEX IF NOT EXISTS idx_content_hash_sha256 ON content(content_hash_sha256);
 CREATE INDEX IF NOT EXISTS idx_content_hash_simhash ON content(content_hash_simhash);
+CREATE INDEX IF NOT EXISTS idx_content_simhash_b0 ON content(simhash_b0);
+CREATE INDEX IF NOT EXISTS idx_content_simhash_b1 ON content(simhash_b1);
+CREATE INDEX IF NOT EXISTS idx_content_simhash_b2 ON content(simhash_b2);
+CREATE INDEX IF NOT EXISTS idx_content_simhash_b3 ON content(simhash_b3);
 
 -- Normalized anchor text table
 CREATE TABLE IF NOT EXISTS anchor_texts (
@@ -298,6 +638,9 @@ CREATE TABLE IF NOT EXISTS internal_links (
   UNIQUE(source_url_id, target_url_id, anchor_text_id, xpath_id, fragment_id, url_parameters)  -- Prevent duplicate links
 );
 CREATE INDEX IF NOT EXISTS idx_internal_links_source ON internal_links(source_url_id);
+-- view_links also reads url_parameters and discovered_at, so a wider "covering" target index
+-- never covered it and only made every link insert write a bigger index entry
+DROP INDEX IF EXISTS idx_internal_links_target_cover;
 CREATE INDEX IF NOT EXISTS idx_internal_links_target ON internal_links(target_url_id);
 CREATE INDEX IF NOT EXISTS idx_internal_links_anchor ON internal_links(anchor_text_id);
 CREATE INDEX IF NOT EXISTS idx_internal_links_xpath ON internal_links(xpath_id);
@@ -454,8 +797,14 @@ CREATE TABLE IF NOT EXISTS frontier (
   UNIQUE(url_id)
 );
 CREATE INDEX IF NOT EXISTS idx_frontier_status ON frontier(status);
-CREATE INDEX IF NOT EXISTS idx_frontier_url_id ON frontier(url_id);
-CREATE INDEX IF NOT EXISTS idx_frontier_priority ON frontier(priority_score DESC, enqueued_at ASC);
+-- url_id lookups are served by the UNIQUE(url_id) index; this one also answers their status
+-- check from the index, and replaces the single-column idx_frontier_url_id
+DROP INDEX IF EXISTS idx_frontier_url_id;
+CREATE INDEX IF NOT EXISTS idx_frontier_url_status ON frontier(url_id, status);
+-- Partial index in frontier_next_batch's ORDER BY order, so the next batch is an
+-- index range scan over queued rows instead of a sort; it replaces the full-table idx_frontier_priority
+DROP INDEX IF EXISTS idx_frontier_priority;
+CREATE INDEX IF NOT EXISTS idx_frontier_queue ON frontier(priority_score DESC, enqueued_at ASC) WHERE status = 'queued';
 
 -- Sitemaps table - tracks discovered sitemap files
 CREATE TABLE IF NOT EXISTS sitemaps (
@@ -464,6 +813,7 @@ CREATE TABLE IF NOT EXISTS sitemaps (
   discovered_at INTEGER NOT NULL,
   last_crawled_at INTEGER,
   total_urls_found INTEGER DEFAULT 0,
+  is_sitemap_index BOOLEAN DEFAULT FALSE,
   status TEXT DEFAULT 'active'  -- 'active', 'error', 'not_found'
 );
 CREATE INDEX IF NOT EXISTS idx_sitemaps_url ON sitemaps(sitemap_url);
@@ -495,9 +845,10 @@ CREATE TABLE IF NOT EXISTS failed_urls (
   created_at INTEGER NOT NULL,  -- When this failure was first recorded
   FOREIGN KEY (url_id) REFERENCES urls (id)
 );
-CREATE INDEX IF NOT EXISTS idx_failed_urls_url_id ON failed_urls(url_id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_failed_urls_url_id_unique ON failed_urls(url_id);
 CREATE INDEX IF NOT EXISTS idx_failed_urls_status ON failed_urls(status_code);
-CREATE INDEX IF NOT EXISTS idx_failed_urls_next_retry ON failed_urls(next_retry_at);
+-- Covers get_urls_ready_for_retry: range scan on next_retry_at, retry_count/url_id read from the index
+CREATE INDEX IF NOT EXISTS idx_failed_urls_retry ON failed_urls(next_retry_at, retry_count, url_id);
 CREATE INDEX IF NOT EXISTS idx_failed_urls_retry_count ON failed_urls(retry_count);
 
 -- Schema.org structured data tables
@@ -572,537 +923,236 @@ CREATE INDEX IF NOT EXISTS idx_schema_data_type ON schema_data(schema_type_id);
 CREATE INDEX IF NOT EXISTS idx_schema_data_format ON schema_data(format);
 CREATE INDEX IF NOT EXISTS idx_schema_data_valid ON schema_data(is_valid);
 
--- View for comprehensive page analysis
-CREATE VIEW IF NOT EXISTS view_crawl_overview AS
-SELECT 
-    u.url,
-    COALESCE(f.status, 'unknown') as crawl_status,
-    pm.initial_status_code as status_code,
-    i.overall_indexable as indexable,
-    -- Add indexability reason when not indexable
-    CASE 
-        WHEN i.overall_indexable = 0 THEN
-            CASE 
-                WHEN i.robots_txt_allows = 0 THEN 'blocked by robots.txt'
-                WHEN i.html_meta_allows = 0 THEN 'blocked by meta robots'
-                WHEN i.http_header_allows = 0 THEN 'blocked by HTTP headers'
-                WHEN pm.initial_status_code != 200 THEN 'not 200 status'
-                WHEN canonical_urls_table.url IS NOT NULL AND canonical_urls_table.url != u.url THEN 'not self canonical'
-                ELSE 'unknown reason'
-            END
-        ELSE NULL
-    END as indexability_reason,
-    u.kind as type,
-    u.classification,
-    c.title,
-    md.description as meta_description,
-    -- Split h1_tags into h1-1 and h1-2, drop others, add count
-    (SELECT h1_text FROM (
-        SELECT h1_text, ROW_NUMBER() OVER (ORDER BY h1_text) as rn
-        FROM (
-            SELECT TRIM(value) as h1_text 
-            FROM json_each(CASE 
-                WHEN c.h1_tags IS NULL OR c.h1_tags = '' THEN '[]'
-                WHEN c.h1_tags LIKE '[%' THEN c.h1_tags
-                ELSE '["' || REPLACE(REPLACE(c.h1_tags, '"', '\"'), ',', '","') || '"]'
-            END)
-            WHERE TRIM(value) != ''
-        )
-    ) WHERE rn = 1) as h1_1,
-    (SELECT h1_text FROM (
-        SELECT h1_text, ROW_NUMBER() OVER (ORDER BY h1_text) as rn
-        FROM (
-            SELECT TRIM(value) as h1_text 
-            FROM json_each(CASE 
-                WHEN c.h1_tags IS NULL OR c.h1_tags = '' THEN '[]'
-                WHEN c.h1_tags LIKE '[%' THEN c.h1_tags
-                ELSE '["' || REPLACE(REPLACE(c.h1_tags, '"', '\"'), ',', '","') || '"]'
-            END)
-            WHERE TRIM(value) != ''
-        )
-    ) WHERE rn = 2) as h1_2,
-    (SELECT COUNT(*) FROM (
-        SELECT TRIM(value) as h1_text 
-        FROM json_each(CASE 
-            WHEN c.h1_tags IS NULL OR c.h1_tags = '' THEN '[]'
-            WHEN c.h1_tags LIKE '[%' THEN c.h1_tags
-            ELSE '["' || REPLACE(REPLACE(c.h1_tags, '"', '\"'), ',', '","') || '"]'
-        END)
-        WHERE TRIM(value) != ''
-    )) as h1_count,
-    -- Convert h2_tags to CSV string and add count
-    (SELECT GROUP_CONCAT(TRIM(value), ', ') FROM (
-        SELECT TRIM(value) as value
-        FROM json_each(CASE 
-            WHEN c.h2_tags IS NULL OR c.h2_tags = '' THEN '[]'
-            WHEN c.h2_tags LIKE '[%' THEN c.h2_tags
-            ELSE '["' || REPLACE(REPLACE(c.h2_tags, '"', '\"'), ',', '","') || '"]'
-        END)
-        WHERE TRIM(value) != ''
-    )) as h2_tags,
-    (SELECT COUNT(*) FROM (
-        SELECT TRIM(value) as h2_text 
-        FROM json_each(CASE 
-            WHEN c.h2_tags IS NULL OR c.h2_tags = '' THEN '[]'
-            WHEN c.h2_tags LIKE '[%' THEN c.h2_tags
-            ELSE '["' || REPLACE(REPLACE(c.h2_tags, '"', '\"'), ',', '","') || '"]'
-        END)
-        WHERE TRIM(value) != ''
-    )) as h2_count,
-    c.word_count,
-    hl.language_code as html_lang,
-    c.internal_links_count,
-    c.external_links_count,
-    c.internal_links_unique_count,
-    c.external_links_unique_count,
-    c.crawl_depth,
-    c.inlinks_count,
-    c.inlinks_unique_count,
-    i.robots_txt_allows,
-    i.html_meta_allows,
-    i.http_header_allows,
-    COALESCE(i.robots_txt_directives, '') as robots_txt_directives,
-    COALESCE(i.html_meta_directives, '') as html_meta_directives,
-    COALESCE(i.http_header_directives, '') as http_header_directives,
-    GROUP_CONCAT(DISTINCT canonical_urls_table.url) as canonical_urls,
-    GROUP_CONCAT(DISTINCT cu.source) as canonical_sources,
-    redirect_dest.url as redirect_destination_url,
-    -- Find the hreflang language that points to this page itself (excluding x-default)
-    (SELECT hl_self.language_code 
-     FROM hreflang_sitemap hs_self 
-     JOIN hreflang_languages hl_self ON hs_self.hreflang_id = hl_self.id 
-     JOIN urls href_self ON hs_self.href_url_id = href_self.id 
-     WHERE hs_self.url_id = u.id 
-     AND (href_self.url = u.url OR href_self.url = u.url || '/' OR u.url = href_self.url || '/')
-     AND hl_self.language_code != 'x-default' 
-     LIMIT 1) as self_hreflang
-FROM urls u
-LEFT JOIN content c ON u.id = c.url_id
-LEFT JOIN page_metadata pm ON u.id = pm.url_id
-LEFT JOIN urls redirect_dest ON pm.redirect_destination_url_id = redirect_dest.id
-LEFT JOIN frontier f ON u.id = f.url_id
-LEFT JOIN meta_descriptions md ON c.meta_description_id = md.id
-LEFT JOIN html_languages hl ON c.html_lang_id = hl.id
-LEFT JOIN indexability i ON u.id = i.url_id
-LEFT JOIN canonical_urls cu ON u.id = cu.url_id
-LEFT JOIN urls canonical_urls_table ON cu.canonical_url_id = canonical_urls_table.id
-WHERE u.classification IN ('internal', 'network')  -- Only show internal and network URLs
-GROUP BY u.id;
-
--- View for internal-to-internal links only
--- Only shows links from URLs that were actually crawled (have frontier status)
-CREATE VIEW IF NOT EXISTS view_links_internal AS
-SELECT 
-    u1.url as source_url,
-    u2.url as target_url,
-    u2.classification as target_classification,
-    at.text as anchor_text,
-    CASE WHEN at.text LIKE '[IMG:%' THEN 1 ELSE 0 END as is_image,
-    x.xpath,
-    href_urls.url as href,
-    href_urls.classification as href_classification,
-    f.fragment as url_fragment,
-    il.url_parameters,
-    il.discovered_at
-FROM internal_links il
-JOIN urls u1 ON il.source_url_id = u1.id
-JOIN frontier f1 ON u1.id = f1.url_id  -- Only show links from URLs that were actually crawled
-LEFT JOIN urls u2 ON il.target_url_id = u2.id
-LEFT JOIN anchor_texts at ON il.anchor_text_id = at.id
-LEFT JOIN xpaths x ON il.xpath_id = x.id
-LEFT JOIN urls href_urls ON il.href_url_id = href_urls.id
-LEFT JOIN fragments f ON il.fragment_id = f.id
-WHERE u2.classification = 'internal';  -- Only internal-to-internal links
-
--- View for internal-to-network links only
--- Only shows links from URLs that were actually crawled (have frontier status)
-CREATE VIEW IF NOT EXISTS view_links_network AS
-SELECT 
-    u1.url as source_url,
-    u2.url as target_url,
-    u2.classification as target_classification,
-    at.text as anchor_text,
-    CASE WHEN at.text LIKE '[IMG:%' THEN 1 ELSE 0 END as is_image,
-    x.xpath,
-    href_urls.url as href,
-    href_urls.classification as href_classification,
-    f.fragment as url_fragment,
-    il.url_parameters,
-    il.discovered_at
-FROM internal_links il
-JOIN urls u1 ON il.source_url_id = u1.id
-JOIN frontier f1 ON u1.id = f1.url_id  -- Only show links from URLs that were actually crawled
-LEFT JOIN urls u2 ON il.target_url_id = u2.id
-LEFT JOIN anchor_texts at ON il.anchor_text_id = at.id
-LEFT JOIN xpaths x ON il.xpath_id = x.id
-LEFT JOIN urls href_urls ON il.href_url_id = href_urls.id
-LEFT JOIN fragments f ON il.fragment_id = f.id
-WHERE u2.classification = 'network';  -- Only internal-to-network links
-
--- View for internal-to-external links only
--- Only shows links from URLs that were actually crawled (have frontier status)
-CREATE VIEW IF NOT EXISTS view_links_external AS
-SELECT 
-    u1.url as source_url,
-    u2.url as target_url,
-    u2.classification as target_classification,
-    at.text as anchor_text,
-    CASE WHEN at.text LIKE '[IMG:%' THEN 1 ELSE 0 END as is_image,
-    x.xpath,
-    href_urls.url as href,
-    href_urls.classification as href_classification,
-    f.fragment as url_fragment,
-    il.url_parameters,
-    il.discovered_at
-FROM internal_links il
-JOIN urls u1 ON il.source_url_id = u1.id
-JOIN frontier f1 ON u1.id = f1.url_id  -- Only show links from URLs that were actually crawled
-LEFT JOIN urls u2 ON il.target_url_id = u2.id
-LEFT JOIN anchor_texts at ON il.anchor_text_id = at.id
-LEFT JOIN xpaths x ON il.xpath_id = x.id
-LEFT JOIN urls href_urls ON il.href_url_id = href_urls.id
-LEFT JOIN fragments f ON il.fragment_id = f.id
-WHERE u2.classification = 'external';  -- Only internal-to-external links
-
--- View for internal-to-subdomain links only
--- Only shows links from URLs that were actually crawled (have frontier status)
-CREATE VIEW IF NOT EXISTS view_links_subdomain AS
-SELECT 
-    u1.url as source_url,
-    u2.url as target_url,
-    u2.classification as target_classification,
-    at.text as anchor_text,
-    CASE WHEN at.text LIKE '[IMG:%' THEN 1 ELSE 0 END as is_image,
-    x.xpath,
-    f.fragment as url_fragment,
-    il.url_parameters,
-    il.discovered_at
-FROM internal_links il
-JOIN urls u1 ON il.source_url_id = u1.id
-JOIN frontier f1 ON u1.id = f1.url_id  -- Only show links from URLs that were actually crawled
-LEFT JOIN urls u2 ON il.target_url_id = u2.id
-LEFT JOIN anchor_texts at ON il.anchor_text_id = at.id
-LEFT JOIN xpaths x ON il.xpath_id = x.id
-LEFT JOIN urls href_urls ON il.href_url_id = href_urls.id
-LEFT JOIN fragments f ON il.fragment_id = f.id
-WHERE u2.classification = 'subdomain';  -- Only internal-to-subdomain links
-
--- View for sitemap statistics
-CREATE VIEW IF NOT EXISTS view_sitemap_statistics AS
-SELECT 
-    s.sitemap_url,
-    COUNT(*) as total_urls,
-    COUNT(DISTINCT us.url_id) as unique_urls,
-    MIN(us.discovered_at) as first_discovered,
-    MAX(us.discovered_at) as last_discovered,
-    -- Count URLs by status
-    COUNT(CASE WHEN f.status = 'done' THEN 1 END) as crawled_urls,
-    COUNT(CASE WHEN f.status = 'queued' THEN 1 END) as queued_urls,
-    COUNT(CASE WHEN f.status IS NULL THEN 1 END) as not_in_frontier
-FROM sitemaps s
-LEFT JOIN url_sitemaps us ON s.id = us.sitemap_id
-LEFT JOIN frontier f ON us.url_id = f.url_id
-GROUP BY s.sitemap_url
-ORDER BY total_urls DESC;
-
--- View for comprehensive schema analysis (normalized structure)
-CREATE VIEW IF NOT EXISTS view_schema_analysis AS
-SELECT 
-    u.url,
-    st.type_name as main_entity_type,
-    si.raw_data as main_entity_data,
-    si.is_valid as main_entity_valid,
-    si.validation_errors as main_entity_errors,
-    si.severity as main_entity_severity,
-    psr.position as main_entity_position,
-    psr.discovered_at as main_entity_discovered_at,
-    
-    -- Count of all schema instances on this page
-    (SELECT COUNT(psr2.schema_instance_id) 
-     FROM page_schema_references psr2 
-     WHERE psr2.url_id = u.id) as total_schema_count,
-    
-    -- Count of main entities
-    (SELECT COUNT(*) 
-     FROM page_schema_references psr3 
-     WHERE psr3.url_id = u.id AND psr3.is_main_entity = 1) as main_entity_count,
-    
-    -- Count of related entities (properties)
-    (SELECT COUNT(*) 
-     FROM page_schema_references psr4 
-     WHERE psr4.url_id = u.id AND psr4.is_main_entity = 0) as related_entity_count,
-    
-    -- List of all schema types on this page
-    (SELECT GROUP_CONCAT(st2.type_name, ', ') 
-     FROM page_schema_references psr5
-     JOIN schema_instances si2 ON psr5.schema_instance_id = si2.id
-     JOIN schema_types st2 ON si2.schema_type_id = st2.id
-     WHERE psr5.url_id = u.id) as all_schema_types,
-    
-    -- List of property names
-    (SELECT GROUP_CONCAT(psr6.property_name, ', ') 
-     FROM page_schema_references psr6
-     WHERE psr6.url_id = u.id AND psr6.property_name IS NOT NULL) as property_names
-
-FROM urls u
-LEFT JOIN page_schema_references psr ON u.id = psr.url_id AND psr.is_main_entity = 1
-LEFT JOIN schema_instances si ON psr.schema_instance_id = si.id
-LEFT JOIN schema_types st ON si.schema_type_id = st.id
-WHERE u.id IN (SELECT url_id FROM page_schema_references)
-ORDER BY u.url, psr.position;
-
--- View for hierarchical schema relationships
-CREATE VIEW IF NOT EXISTS view_schema_hierarchy AS
-SELECT 
-    u.url,
-    st.type_name as schema_type,
-    si.raw_data as schema_data,
-    si.is_valid,
-    si.validation_errors,
-    si.severity,
-    psr.position,
-    psr.is_main_entity,
-    psr.property_name,
-    psr.parent_entity_id,
-    
-    -- Parent entity info
-    parent_st.type_name as parent_entity_type,
-    parent_si.raw_data as parent_entity_data,
-    
-    -- Child entities count
-    (SELECT COUNT(*) 
-     FROM page_schema_references child_psr
-     WHERE child_psr.parent_entity_id = psr.schema_instance_id) as child_count,
-    
-    -- Sibling entities count (same parent)
-    (SELECT COUNT(*) 
-     FROM page_schema_references sibling_psr
-     WHERE sibling_psr.parent_entity_id = psr.parent_entity_id 
-     AND sibling_psr.schema_instance_id != psr.schema_instance_id) as sibling_count
-
-FROM urls u
-JOIN page_schema_references psr ON u.id = psr.url_id
-JOIN schema_instances si ON psr.schema_instance_id = si.id
-JOIN schema_types st ON si.schema_type_id = st.id
-LEFT JOIN schema_instances parent_si ON psr.parent_entity_id = parent_si.id
-LEFT JOIN schema_types parent_st ON parent_si.schema_type_id = parent_st.id
-ORDER BY u.url, psr.is_main_entity DESC, psr.position;
-
--- Comprehensive crawl status view
-CREATE VIEW IF NOT EXISTS view_crawl_status AS
-WITH sitemap_stats AS (
-    SELECT 
-        COUNT(DISTINCT s.id) as sitemaps_scraped,
-        COUNT(*) as urls_in_sitemaps
-    FROM sitemaps s
-    JOIN url_sitemaps us ON s.id = us.sitemap_id
-),
-url_classification_stats AS (
-    SELECT 
-        classification,
-        COUNT(*) as count
-    FROM urls
-    GROUP BY classification
-),
-crawled_stats AS (
-    SELECT 
-        COUNT(*) as total_crawled,
-        COUNT(*) as status_200,  -- URLs with content are considered successfully crawled
-        0 as non_200  -- We don't track non-200s in this schema
-    FROM content
-),
-canonical_stats AS (
-    SELECT 
-        COUNT(*) as total_with_canonical,
-        SUM(CASE WHEN cu.canonical_url_id IS NOT NULL THEN 1 ELSE 0 END) as has_canonical,
-        SUM(CASE WHEN cu.canonical_url_id IS NULL THEN 1 ELSE 0 END) as no_canonical
-    FROM content c
-    LEFT JOIN canonical_urls cu ON c.url_id = cu.url_id
-),
-indexability_stats AS (
-    SELECT 
-        COUNT(*) as total_indexable_checked,
-        SUM(CASE WHEN overall_indexable = 1 THEN 1 ELSE 0 END) as indexable,
-        SUM(CASE WHEN overall_indexable = 0 THEN 1 ELSE 0 END) as non_indexable
-    FROM indexability
-),
-sitemap_coverage AS (
-    SELECT 
-        COUNT(DISTINCT u.id) as internal_urls_total,
-        COUNT(DISTINCT us.url_id) as internal_urls_in_sitemap,
-        COUNT(DISTINCT u.id) - COUNT(DISTINCT us.url_id) as internal_urls_not_in_sitemap
-    FROM urls u
-    LEFT JOIN url_sitemaps us ON u.id = us.url_id
-    WHERE u.classification IN ('internal', 'network')
-),
-sitemap_orphans AS (
-    SELECT 
-        COUNT(DISTINCT us.url_id) as sitemap_urls_total,
-        COUNT(DISTINCT c.url_id) as sitemap_urls_crawled,
-        COUNT(DISTINCT us.url_id) - COUNT(DISTINCT c.url_id) as sitemap_urls_not_crawled
-    FROM url_sitemaps us
-    LEFT JOIN content c ON us.url_id = c.url_id
+-- Site-level HSTS preload and SPA checks
+CREATE TABLE IF NOT EXISTS hsts_preload_checks (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  base_domain TEXT NOT NULL,
+  checked_at INTEGER NOT NULL,
+  https_url TEXT,
+  https_status INTEGER,
+  hsts_header TEXT,
+  hsts_max_age INTEGER,
+  hsts_include_subdomains BOOLEAN,
+  hsts_preload BOOLEAN,
+  hsts_max_age_ok BOOLEAN,
+  http_url TEXT,
+  http_status INTEGER,
+  http_redirects_to_https BOOLEAN,
+  http_redirect_target TEXT,
+  eligible BOOLEAN,
+  notes TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_hsts_preload_checks_domain ON hsts_preload_checks(base_domain);
+
+CREATE TABLE IF NOT EXISTS spa_checks (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  base_domain TEXT NOT NULL,
+  checked_at INTEGER NOT NULL,
+  random_404_url TEXT,
+  random_404_status INTEGER,
+  random_404_final_url TEXT,
+  random_404_ok BOOLEAN,
+  case_url TEXT,
+  case_status INTEGER,
+  case_final_url TEXT,
+  case_redirects BOOLEAN,
+  case_canonical_url TEXT,
+  case_expected_url TEXT,
+  case_ok BOOLEAN,
+  notes TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_spa_checks_domain ON spa_checks(base_domain);
+"""
+
+# ------------------ prepared statements ------------------
+# Hot statements shared by the writers so sqlite3's per-connection statement
+# cache (keyed by SQL text) reuses one compiled plan for each of them.
+
+SQLITE_CACHED_STATEMENTS = 512
+
+SQL_LOOKUP_URL_ID = "SELECT id FROM urls WHERE url = ?"
+
+# Insert-if-missing for URLs not found by SQL_LOOKUP_URL_ID; returns no row when a
+# concurrent writer stored the URL first, so callers fall back to the lookup
+SQL_GET_OR_CREATE_URL = """
+INSERT INTO urls (url, classification, first_seen, last_seen) VALUES (?, ?, ?, ?)
+ON CONFLICT(url) DO NOTHING
+RETURNING id
+"""
+
+SQL_UPSERT_URL = """
+INSERT INTO urls(url, kind, classification, discovered_from_id, first_seen, last_seen)
+VALUES (?,?,?,?,?,?)
+ON CONFLICT(url) DO UPDATE SET
+  kind=excluded.kind,
+  classification=excluded.classification,
+  discovered_from_id=COALESCE(urls.discovered_from_id, excluded.discovered_from_id),
+  last_seen=excluded.last_seen
+"""
+
+SQL_INSERT_INTERNAL_LINK = """
+INSERT OR IGNORE INTO internal_links(
+    source_url_id, target_url_id, anchor_text_id, xpath_id, href_url_id,
+    fragment_id, url_parameters, discovered_at
+)
+VALUES (?,?,?,?,?,?,?,?)
+"""
+
+SQL_INSERT_FRONTIER = """
+INSERT OR IGNORE INTO frontier(url_id, depth, parent_id, status, enqueued_at, updated_at)
+VALUES (?,?,?,?,?,?)
+"""
+
+SQL_INSERT_FRONTIER_SCORED = """
+INSERT OR IGNORE INTO frontier(url_id, depth, parent_id, status, enqueued_at, updated_at,
+                              priority_score, sitemap_priority, content_type_score)
+VALUES (?,?,?,?,?,?,?,?,?)
+"""
+
+SQL_FRONTIER_STATUS_COUNTS = "SELECT status, COUNT(*) FROM frontier WHERE status IN ('queued', 'done') GROUP BY status"
+
+SQL_MARK_FRONTIER_DONE = "UPDATE frontier SET status='done', updated_at=? WHERE url_id=?"
+
+# Rescores every queued URL in place; priority_score() is registered per connection
+# by frontier_update_priority_scores and wraps calculate_priority_score
+SQL_UPDATE_FRONTIER_PRIORITY = """
+UPDATE frontier SET
+  inlinks_count = s.inlinks_count,
+  priority_score = priority_score(s.url, frontier.depth, frontier.sitemap_priority, s.inlinks_count)
+FROM (
+  SELECT f.url_id, u.url, COUNT(il.target_url_id) AS inlinks_count
+  FROM frontier f
+  JOIN urls u ON f.url_id = u.id
+  LEFT JOIN internal_links il ON f.url_id = il.target_url_id
+  WHERE f.status = 'queued'
+  GROUP BY f.url_id
+) AS s
+WHERE frontier.url_id = s.url_id
+"""
+
+SQL_LOOKUP_SCHEMA_INSTANCE = "SELECT id FROM schema_instances WHERE content_hash = ?"
+
+# Returns the id whether this call inserted the row or a concurrent writer already had
+SQL_UPSERT_SCHEMA_INSTANCE = """
+INSERT INTO schema_instances
+(content_hash, schema_type_id, format, raw_data, parsed_data, is_valid, validation_errors, severity, created_at)
+VALUES (?,?,?,?,?,?,?,?,?)
+ON CONFLICT(content_hash) DO UPDATE SET content_hash=excluded.content_hash
+RETURNING id
+"""
+
+SQL_INSERT_PAGE_SCHEMA_REFERENCE = """
+INSERT INTO page_schema_references(url_id, schema_instance_id, position, is_main_entity, discovered_at)
+VALUES (?,?,?,?,?)
+"""
+
+# The main entity's id becomes its properties' parent_entity_id; RETURNING hands it back
+# without a separate SELECT last_insert_rowid() round trip
+SQL_INSERT_PAGE_SCHEMA_MAIN_REFERENCE = """
+INSERT INTO page_schema_references(url_id, schema_instance_id, position, is_main_entity, discovered_at)
+VALUES (?,?,?,?,?)
+RETURNING id
+"""
+
+SQL_INSERT_PAGE_SCHEMA_PROPERTY_REFERENCE = """
+INSERT INTO page_schema_references(url_id, schema_instance_id, position, property_name, is_main_entity, parent_entity_id, discovered_at)
+VALUES (?,?,?,?,?,?,?)
+"""
+
+# Re-crawls of unchanged pages skip the row rewrite, so the compressed body
+# is not copied through the pager and WAL again
+SQL_UPSERT_PAGE = """
+INSERT INTO pages(url_id, headers_json, html_compressed)
+VALUES (?,?,?)
+ON CONFLICT(url_id) DO UPDATE SET
+  headers_json=excluded.headers_json,
+  html_compressed=excluded.html_compressed
+WHERE pages.html_compressed IS NOT excluded.html_compressed
+   OR pages.headers_json IS NOT excluded.headers_json
+"""
+
+# Same upsert against the pages database attached to a crawl connection
+SQL_UPSERT_ATTACHED_PAGE = SQL_UPSERT_PAGE.replace("INTO pages(", "INTO pagesdb.pages(")
+
+# Per-connection staging table for batch_write_internal_links
+SQL_CREATE_STAGE_LINKS = """
+CREATE TEMP TABLE IF NOT EXISTS stage_links(
+    source_url_id INTEGER, target_url TEXT, anchor TEXT, xpath TEXT,
+    href_url_id INTEGER, fragment TEXT, url_parameters TEXT, discovered_at INTEGER
+)
+"""
+
+SQL_STAGE_LINK = "INSERT INTO stage_links VALUES (?,?,?,?,?,?,?,?)"
+
+# Lookup rows are created in first-seen order, and links are de-duplicated on their
+# resolved IDs (GROUP BY treats NULLs as equal, unlike the UNIQUE constraint)
+SQL_RESOLVE_STAGED_LINKS = (
+    """
+    INSERT OR IGNORE INTO anchor_texts(text)
+    SELECT anchor FROM stage_links WHERE anchor IS NOT NULL GROUP BY anchor ORDER BY MIN(rowid)
+    """,
+    """
+    INSERT OR IGNORE INTO xpaths(xpath)
+    SELECT xpath FROM stage_links WHERE xpath IS NOT NULL GROUP BY xpath ORDER BY MIN(rowid)
+    """,
+    """
+    INSERT OR IGNORE INTO fragments(fragment)
+    SELECT fragment FROM stage_links WHERE fragment IS NOT NULL GROUP BY fragment ORDER BY MIN(rowid)
+    """,
+    """
+    INSERT OR IGNORE INTO internal_links(
+        source_url_id, target_url_id, anchor_text_id, xpath_id, href_url_id,
+        fragment_id, url_parameters, discovered_at
+    )
+    SELECT s.source_url_id, t.id, a.id, x.id, s.href_url_id, f.id, s.url_parameters, MIN(s.discovered_at)
+    FROM stage_links s
+    LEFT JOIN urls t ON t.url = s.target_url
+    LEFT JOIN anchor_texts a ON a.text = s.anchor
+    LEFT JOIN xpaths x ON x.xpath = s.xpath
+    LEFT JOIN fragments f ON f.fragment = s.fragment
+    GROUP BY s.source_url_id, t.id, a.id, x.id, s.href_url_id, f.id, s.url_parameters
+    ORDER BY MIN(s.rowid)
+    """,
 )
-SELECT 
-    -- Sitemap statistics
-    ss.sitemaps_scraped,
-    ss.urls_in_sitemaps,
-    
-    -- URL classification
-    COALESCE(SUM(CASE WHEN ucs.classification = 'internal' THEN ucs.count ELSE 0 END), 0) as internal_urls,
-    COALESCE(SUM(CASE WHEN ucs.classification = 'network' THEN ucs.count ELSE 0 END), 0) as network_urls,
-    COALESCE(SUM(CASE WHEN ucs.classification = 'external' THEN ucs.count ELSE 0 END), 0) as external_urls,
-    COALESCE(SUM(CASE WHEN ucs.classification = 'social' THEN ucs.count ELSE 0 END), 0) as social_urls,
-    
-    -- Crawl progress
-    cs.total_crawled,
-    cs.status_200,
-    cs.non_200,
-    
-    -- Canonical URL analysis
-    cans.has_canonical,
-    cans.no_canonical,
-    
-    -- Indexability analysis
-    ins.indexable,
-    ins.non_indexable,
-    
-    -- Sitemap coverage analysis
-    sc.internal_urls_not_in_sitemap,
-    so.sitemap_urls_not_crawled,
-    
-    -- Calculated percentages
-    ROUND((cs.status_200 * 100.0 / NULLIF(cs.total_crawled, 0)), 2) as success_rate_percent,
-    ROUND((cans.has_canonical * 100.0 / NULLIF(cans.total_with_canonical, 0)), 2) as canonical_coverage_percent,
-    ROUND((ins.indexable * 100.0 / NULLIF(ins.total_indexable_checked, 0)), 2) as indexability_rate_percent,
-    ROUND((sc.internal_urls_in_sitemap * 100.0 / NULLIF(sc.internal_urls_total, 0)), 2) as sitemap_coverage_percent
-
-FROM sitemap_stats ss
-CROSS JOIN url_classification_stats ucs
-CROSS JOIN crawled_stats cs
-CROSS JOIN canonical_stats cans
-CROSS JOIN indexability_stats ins
-CROSS JOIN sitemap_coverage sc
-CROSS JOIN sitemap_orphans so
-GROUP BY 
-    ss.sitemaps_scraped, ss.urls_in_sitemaps,
-    cs.total_crawled, cs.status_200, cs.non_200,
-    cans.has_canonical, cans.no_canonical,
-    ins.indexable, ins.non_indexable,
-    sc.internal_urls_not_in_sitemap, so.sitemap_urls_not_crawled;
-
---- Enhanced views for comprehensive link analysis with both original and normalized URLs
-
-
--- View for UTM parameter analysis
-CREATE VIEW IF NOT EXISTS view_utm_links AS
-SELECT 
-    u1.url as source_url,
-    href_urls.url as target_url_original,
-    at.text as anchor_text,
-    il.url_parameters,
-    il.discovered_at
-FROM internal_links il
-JOIN urls u1 ON il.source_url_id = u1.id
-JOIN frontier f1 ON u1.id = f1.url_id
-LEFT JOIN urls href_urls ON il.href_url_id = href_urls.id
-LEFT JOIN anchor_texts at ON il.anchor_text_id = at.id
-LEFT JOIN fragments f ON il.fragment_id = f.id
-WHERE il.url_parameters LIKE '%utm_%';
-
--- View for identifying hub pages (pages with multiple children)
--- Shows pages with >1 child, ordered by child count (descending)
-CREATE VIEW IF NOT EXISTS view_hubs AS
-SELECT 
-    u.url as hub_url,
-    u.classification as hub_classification,
-    COUNT(il.target_url_id) as child_count,
-    GROUP_CONCAT(DISTINCT u2.classification) as child_classifications,
-    GROUP_CONCAT(DISTINCT u2.url) as child_urls
-FROM urls u
-JOIN internal_links il ON u.id = il.source_url_id
-LEFT JOIN urls u2 ON il.target_url_id = u2.id
-WHERE u2.id IS NOT NULL  -- Only pages that actually have children
-GROUP BY u.id, u.url, u.classification
-HAVING COUNT(il.target_url_id) > 1  -- Only pages with more than 1 child
-ORDER BY child_count DESC, u.url;
-
---- View for exact duplicate content detection
-CREATE VIEW IF NOT EXISTS view_exact_duplicates AS
-SELECT 
-    c1.url_id as url1_id,
-    c2.url_id as url2_id,
-    u1.url as url1,
-    u2.url as url2,
-    c1.content_hash_sha256,
-    c1.content_length,
-    'Exact duplicate' as duplicate_type
-FROM content c1
-JOIN content c2 ON c1.content_hash_sha256 = c2.content_hash_sha256
-JOIN urls u1 ON c1.url_id = u1.id
-JOIN urls u2 ON c2.url_id = u2.id
-WHERE c1.url_id < c2.url_id  -- Avoid self-comparison and duplicates
-  AND c1.content_hash_sha256 IS NOT NULL 
-  AND c1.content_hash_sha256 != '';
-
---- View for near-duplicate content detection
-CREATE VIEW IF NOT EXISTS view_near_duplicates AS
-SELECT 
-    c1.url_id as url1_id,
-    c2.url_id as url2_id,
-    u1.url as url1,
-    u2.url as url2,
-    c1.content_hash_simhash,
-    c2.content_hash_simhash,
-    c1.content_length as url1_length,
-    c2.content_length as url2_length,
-    'Near duplicate' as duplicate_type
-FROM content c1
-JOIN content c2 ON c1.content_hash_simhash = c2.content_hash_simhash
-JOIN urls u1 ON c1.url_id = u1.id
-JOIN urls u2 ON c2.url_id = u2.id
-WHERE c1.url_id < c2.url_id  -- Avoid self-comparison and duplicates
-  AND c1.content_hash_simhash IS NOT NULL 
-  AND c1.content_hash_simhash != ''
-  AND c1.content_hash_sha256 != c2.content_hash_sha256;  -- Exclude exact duplicates
-
---- View for content hash statistics
-CREATE VIEW IF NOT EXISTS view_content_hash_stats AS
-SELECT 
-    COUNT(*) as total_pages,
-    COUNT(CASE WHEN content_hash_sha256 IS NOT NULL AND content_hash_sha256 != '' THEN 1 END) as pages_with_sha256,
-    COUNT(CASE WHEN content_hash_simhash IS NOT NULL AND content_hash_simhash != '' THEN 1 END) as pages_with_simhash,
-    COUNT(DISTINCT content_hash_sha256) as unique_sha256_hashes,
-    COUNT(DISTINCT content_hash_simhash) as unique_simhash_hashes,
-    AVG(content_length) as avg_content_length,
-    MIN(content_length) as min_content_length,
-    MAX(content_length) as max_content_length
-FROM content;
+
+SQL_UPSERT_PAGE_METADATA = """
+INSERT INTO page_metadata(url_id, initial_status_code, final_status_code, final_url_id, redirect_destination_url_id, fetched_at, etag, last_modified)
+VALUES (?,?,?,?,?,?,?,?)
+ON CONFLICT(url_id) DO UPDATE SET
+  initial_status_code=excluded.initial_status_code,
+  final_status_code=excluded.final_status_code,
+  final_url_id=excluded.final_url_id,
+  redirect_destination_url_id=excluded.redirect_destination_url_id,
+  fetched_at=excluded.fetched_at,
+  etag=excluded.etag,
+  last_modified=excluded.last_modified
 """
 
+async def bulk_insert(conn: aiosqlite.Connection, sql: str, rows: Iterable[tuple], batch: int = 5000):
+    """Insert rows with one executemany per batch of rows (caller owns the transaction and commits)."""
+    rows = list(rows)
+    for i in range(0, len(rows), batch):
+        await conn.executemany(sql, rows[i:i + batch])
+
 async def init_pages_db(db_path: str = PAGES_DB_PATH):
+    check_sqlite_version()
     async with aiosqlite.connect(db_path) as db:
         await optimize_connection(db)
-        # Execute each statement separately
-        for stmt in PAGES_SCHEMA.split(";\n"):
-            if stmt.strip():
-                await db.execute(stmt)
+        await db.executescript(PAGES_SCHEMA)
         await db.commit()
 
 async def init_crawl_db(db_path: str = CRAWL_DB_PATH):
+    check_sqlite_version()
+    # A new database at this path must not see IDs cached from an older one
+    clear_url_id_cache(db_path)
+    
     async with aiosqlite.connect(db_path) as db:
         await optimize_connection(db)
-        # Use a more robust approach to split SQL statements
-        import re
-        
-        # Remove comments and split by semicolon
-        schema_clean = re.sub(r'--.*$', '', CRAWL_SCHEMA, flags=re.MULTILINE)
-        statements = [stmt.strip() for stmt in schema_clean.split(';') if stmt.strip()]
-        
-        # Execute each statement
-        for stmt in statements:
-            if stmt:
-                await db.execute(stmt)
+        # Columns the schema's indexes rely on must exist before the DDL bundle runs
+        await migrate_simhash_bands(db)
+        await migrate_failed_urls_unique(db)
+        # Let SQLite split and run the whole DDL bundle and the views in one call (it commits the migrations first)
+        await db.executescript(CRAWL_SCHEMA + "\n".join(get_sqlite_views()))
         await db.commit()
         
         # Run migrations for fragment table
@@ -1110,15 +1160,33 @@ async def init_crawl_db(db_path: str = CRAWL_DB_PATH):
         
         # Run migrations for subdomain classification
         await migrate_subdomain_classification(db)
+        
+        # Planner statistics are refreshed by finalize_crawl; only a database that has never
+        # been analysed (an interrupted crawl being resumed) gets a sampled ANALYZE here
+        cursor = await db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+        if await cursor.fetchone() is None:
+            await db.execute("PRAGMA analysis_limit=1000")
+            await db.execute("ANALYZE")
+            await db.commit()
+
+async def finalize_crawl(crawl_db_path: str = CRAWL_DB_PATH):
+    """Refresh planner statistics after a crawl so the views get good join orders."""
+    async with aiosqlite.connect(crawl_db_path) as db:
+        await db.execute("ANALYZE")
+        await db.execute("PRAGMA optimize")
+        await db.commit()
+
+# Rows of internal_links updated per transaction by the fragment migration
+FRAGMENT_MIGRATION_CHUNK_SIZE = 50000
 
 async def migrate_fragment_table(db):
     """Migrate existing databases to use fragment table."""
     try:
-        # Check if fragments table exists
-        cursor = await db.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='fragments'")
-        fragments_exists = await cursor.fetchone()
+        # Check which migration tables exist in one query
+        cursor = await db.execute("SELECT name FROM sqlite_master WHERE type='table' AND name IN ('fragments', 'internal_links')")
+        existing_tables = {row[0] for row in await cursor.fetchall()}
         
-        if not fragments_exists:
+        if 'fragments' not in existing_tables:
             # Create fragments table
             await db.execute("""
                 CREATE TABLE IF NOT EXISTS fragments (
@@ -1129,30 +1197,35 @@ async def migrate_fragment_table(db):
             await db.execute("CREATE INDEX IF NOT EXISTS idx_fragments_fragment ON fragments(fragment)")
         
         # Check if internal_links has fragment_id column
-        cursor = await db.execute("PRAGMA table_info(internal_links)")
-        columns = await cursor.fetchall()
-        column_names = [col[1] for col in columns]
+        column_names = []
+        if 'internal_links' in existing_tables:
+            cursor = await db.execute("PRAGMA table_info(internal_links)")
+            columns = await cursor.fetchall()
+            column_names = [col[1] for col in columns]
         
-        if 'fragment_id' not in column_names:
+        if 'internal_links' in existing_tables and 'fragment_id' not in column_names:
             # Add fragment_id column
             await db.execute("ALTER TABLE internal_links ADD COLUMN fragment_id INTEGER")
             await db.execute("CREATE INDEX IF NOT EXISTS idx_internal_links_fragment ON internal_links(fragment_id)")
             
-            # Migrate existing url_fragment data to fragments table
-            cursor = await db.execute("SELECT DISTINCT url_fragment FROM internal_links WHERE url_fragment IS NOT NULL AND url_fragment != ''")
-            fragments = await cursor.fetchall()
+            # Migrate existing url_fragment data to fragments table in set-based statements
+            await db.execute("""
+                INSERT OR IGNORE INTO fragments (fragment)
+                SELECT DISTINCT url_fragment FROM internal_links
+                WHERE url_fragment IS NOT NULL AND url_fragment != ''
+            """)
             
-            for (fragment,) in fragments:
-                # Insert fragment into fragments table
-                cursor = await db.execute("INSERT OR IGNORE INTO fragments (fragment) VALUES (?)", (fragment,))
-                fragment_id = cursor.lastrowid
-                
-                # Update internal_links to use fragment_id
+            # Point internal_links at the fragment rows, one rowid range at a time to keep the WAL small
+            cursor = await db.execute("SELECT COALESCE(MAX(rowid), 0) FROM internal_links")
+            max_rowid = (await cursor.fetchone())[0]
+            for start in range(0, max_rowid, FRAGMENT_MIGRATION_CHUNK_SIZE):
                 await db.execute("""
                     UPDATE internal_links 
-                    SET fragment_id = (SELECT id FROM fragments WHERE fragment = ?)
-                    WHERE url_fragment = ?
-                """, (fragment, fragment))
+                    SET fragment_id = (SELECT id FROM fragments WHERE fragment = internal_links.url_fragment)
+                    WHERE url_fragment IS NOT NULL AND url_fragment != ''
+                      AND rowid > ? AND rowid <= ?
+                """, (start, start + FRAGMENT_MIGRATION_CHUNK_SIZE))
+                await db.commit()
             
             # Drop the old url_fragment column (SQLite doesn't support DROP COLUMN, so we'll leave it)
             # The views will use the new fragment_id approach
@@ -1165,6 +1238,59 @@ async def migrate_fragment_table(db):
         await db.rollback()
         raise
 
+async def migrate_simhash_bands(db):
+    """Add and backfill the SimHash band columns on existing content tables.
+    
+    Runs in the caller's transaction (caller commits), and only until the band columns exist.
+    """
+    try:
+        cursor = await db.execute("PRAGMA table_info(content)")
+        column_names = [col[1] for col in await cursor.fetchall()]
+        if not column_names or 'simhash_b0' in column_names:
+            return  # New database, or already migrated
+        
+        print("Adding SimHash band columns to content table...")
+        for band in range(4):
+            await db.execute(f"ALTER TABLE content ADD COLUMN simhash_b{band} INTEGER")
+        
+        cursor = await db.execute("SELECT url_id, content_hash_simhash FROM content WHERE content_hash_simhash IS NOT NULL AND content_hash_simhash != ''")
+        await db.executemany(
+            "UPDATE content SET simhash_b0 = ?, simhash_b1 = ?, simhash_b2 = ?, simhash_b3 = ? WHERE url_id = ?",
+            [(*simhash_bands(simhash), url_id) for url_id, simhash in await cursor.fetchall()]
+        )
+        print("SimHash band migration completed successfully")
+        
+    except Exception as e:
+        print(f"Error during SimHash band migration: {e}")
+        raise
+
+async def migrate_failed_urls_unique(db):
+    """Keep one failed_urls row per URL (the newest) so failures can be upserted on url_id.
+    
+    Also adds last_retry_at to tables created without it. Runs in the caller's transaction
+    (caller commits), and only until the UNIQUE index exists.
+    """
+    try:
+        cursor = await db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'failed_urls'")
+        if await cursor.fetchone() is None:
+            return  # New database, the schema creates the table and index
+        
+        cursor = await db.execute("PRAGMA table_info(failed_urls)")
+        if 'last_retry_at' not in {row[1] for row in await cursor.fetchall()}:
+            await db.execute("ALTER TABLE failed_urls ADD COLUMN last_retry_at INTEGER")
+        
+        cursor = await db.execute("PRAGMA index_list(failed_urls)")
+        if 'idx_failed_urls_url_id_unique' in {row[1] for row in await cursor.fetchall()}:
+            return  # Already migrated
+        
+        await db.execute("DELETE FROM failed_urls WHERE id NOT IN (SELECT MAX(id) FROM failed_urls GROUP BY url_id)")
+        await db.execute("DROP INDEX IF EXISTS idx_failed_urls_url_id")
+        await db.execute("CREATE UNIQUE INDEX idx_failed_urls_url_id_unique ON failed_urls(url_id)")
+        
+    except Exception as e:
+        print(f"Error during failed_urls migration: {e}")
+        raise
+
 async def migrate_subdomain_classification(db):
     """Migrate existing databases to support subdomain classification."""
     try:
@@ -1181,31 +1307,34 @@ async def migrate_subdomain_classification(db):
 
 # ------------------ URL classification ------------------
 
+# Social media domains
+SOCIAL_DOMAINS = frozenset({
+    'facebook.com', 'fb.com', 'twitter.com', 'x.com', 'instagram.com', 
+    'linkedin.com', 'youtube.com', 'tiktok.com', 'snapchat.com', 
+    'pinterest.com', 'reddit.com', 'discord.com', 'telegram.org',
+    'whatsapp.com', 'messenger.com', 'skype.com', 'zoom.us'
+})
+SOCIAL_SUFFIXES = tuple('.' + domain for domain in SOCIAL_DOMAINS)
+
+@lru_cache(maxsize=100_000)
+def _url_host(url: str) -> str:
+    """Lowercased host of a URL without a leading www. (cached, crawlers re-see URLs)."""
+    url_domain = urlparse(url).netloc.lower()
+    if url_domain.startswith('www.'):
+        url_domain = url_domain[4:]
+    return url_domain
+
 def classify_url(url: str, base_domain: str, is_from_sitemap: bool = False, is_from_hreflang: bool = False) -> str:
     """Classify URL as internal, subdomain, network, external, or social."""
-    from urllib.parse import urlparse
-    
-    parsed = urlparse(url)
-    url_domain = parsed.netloc.lower()
+    url_domain = _url_host(url)
     
     # Remove www. prefix for comparison
-    if url_domain.startswith('www.'):
-        url_domain = url_domain[4:]
     if base_domain.startswith('www.'):
         base_domain = base_domain[4:]
     
-    # Social media domains
-    social_domains = {
-        'facebook.com', 'fb.com', 'twitter.com', 'x.com', 'instagram.com', 
-        'linkedin.com', 'youtube.com', 'tiktok.com', 'snapchat.com', 
-        'pinterest.com', 'reddit.com', 'discord.com', 'telegram.org',
-        'whatsapp.com', 'messenger.com', 'skype.com', 'zoom.us'
-    }
-    
     # Check if it's a social media domain
-    for social_domain in social_domains:
-        if url_domain == social_domain or url_domain.endswith('.' + social_domain):
-            return 'social'
+    if url_domain in SOCIAL_DOMAINS or url_domain.endswith(SOCIAL_SUFFIXES):
+        return 'social'
     
     # Check if it's internal (same domain)
     if url_domain == base_domain:
@@ -1222,49 +1351,228 @@ def classify_url(url: str, base_domain: str, is_from_sitemap: bool = False, is_f
     # Everything else is external
     return 'external'
 
+def classify_urls_bulk(urls: Iterable[str], base_domain: str, is_from_sitemap: bool = False, is_from_hreflang: bool = False) -> List[str]:
+    """Classify many URLs against one base domain, in input order.
+    
+    Same rules as classify_url, but the base domain is prepared once and each distinct
+    host is classified once, since a batch's URLs mostly share a handful of hosts.
+    """
+    if base_domain.startswith('www.'):
+        base_domain = base_domain[4:]
+    subdomain_suffix = '.' + base_domain
+    fallback = 'network' if is_from_hreflang else 'external'
+    
+    by_host: Dict[str, str] = {}
+    classifications = []
+    for url in urls:
+        url_domain = _url_host(url)
+        classification = by_host.get(url_domain)
+        if classification is None:
+            if url_domain in SOCIAL_DOMAINS or url_domain.endswith(SOCIAL_SUFFIXES):
+                classification = 'social'
+            elif url_domain == base_domain:
+                classification = 'internal'
+            elif url_domain.endswith(subdomain_suffix):
+                classification = 'subdomain'
+            else:
+                classification = fallback
+            by_host[url_domain] = classification
+        classifications.append(classification)
+    return classifications
+
+def _fix_protocol_relative(url: str) -> str:
+    """Give protocol-relative URLs (//host/path) an https scheme."""
+    return f"https:{url}" if url.startswith('//') else url
+
 # ------------------ URL ID management ------------------
+# The writers here and in the frontier and schema sections take an optional ``now``: a
+# batch resolves it once and passes it down so every row it writes shares one timestamp;
+# left as None, each helper stamps its own.
+
+async def _get_or_create_url_row(conn: aiosqlite.Connection, url: str, base_domain: str, is_from_hreflang: bool = False, now: Optional[int] = None) -> int:
+    """Look a URL up, inserting it only if missing, so stored URLs never take the write lock."""
+    cursor = await conn.execute(SQL_LOOKUP_URL_ID, (url,))
+    row = await cursor.fetchone()
+    if row:
+        return row[0]
+    
+    if now is None:
+        now = int(time.time())
+    cursor = await conn.execute(
+        SQL_GET_OR_CREATE_URL,
+        (url, classify_url(url, base_domain, is_from_hreflang=is_from_hreflang), now, now)
+    )
+    row = await cursor.fetchone()
+    if row is None:
+        cursor = await conn.execute(SQL_LOOKUP_URL_ID, (url,))
+        row = await cursor.fetchone()
+    return row[0]
 
-async def get_or_create_url_id(url: str, base_domain: str, db_path: str = CRAWL_DB_PATH, conn: aiosqlite.Connection = None, is_from_hreflang: bool = False) -> int:
+async def get_or_create_url_id(url: str, base_domain: str, db_path: str = CRAWL_DB_PATH, conn: aiosqlite.Connection = None, is_from_hreflang: bool = False, now: Optional[int] = None) -> int:
     """Get URL ID, creating the URL record if it doesn't exist."""
     if conn:
         # Use existing connection
-        cursor = await conn.execute("SELECT id FROM urls WHERE url = ?", (url,))
-        row = await cursor.fetchone()
-        if row:
-            return row[0]
-        
-        # Classify the URL
-        classification = classify_url(url, base_domain, is_from_hreflang=is_from_hreflang)
-        
-        # Create new URL record
-        cursor = await conn.execute(
-            "INSERT INTO urls (url, classification, first_seen, last_seen) VALUES (?, ?, ?, ?)",
-            (url, classification, int(time.time()), int(time.time()))
-        )
-        return cursor.lastrowid
+        return await _get_or_create_url_row(conn, url, base_domain, is_from_hreflang, now)
     else:
-        # Create new connection
-        async with aiosqlite.connect(db_path) as db:
-            # Try to get existing URL ID
-            cursor = await db.execute("SELECT id FROM urls WHERE url = ?", (url,))
-            row = await cursor.fetchone()
-            if row:
-                return row[0]
-            
-            # Classify the URL
-            classification = classify_url(url, base_domain, is_from_hreflang=is_from_hreflang)
-            
-            # Create new URL record
-            cursor = await db.execute(
-                "INSERT INTO urls (url, classification, first_seen, last_seen) VALUES (?, ?, ?, ?)",
-                (url, classification, int(time.time()), int(time.time()))
-            )
+        # Use the pooled connection when available, otherwise a new one
+        async with _connection(db_path) as db:
+            url_id = await _get_or_create_url_row(db, url, base_domain, is_from_hreflang, now)
             await db.commit()
-            return cursor.lastrowid
+            return url_id
+
+# Multi-row statements come in power-of-two sizes so the statement cache holds a
+# handful of compiled variants instead of one per batch length; the largest sizes stay
+# under SQLite's historical 999 host parameter limit
+URL_BATCH_SIZES = (256, 128, 64, 32, 16, 8, 4, 2, 1)
+SQL_LOOKUP_URL_IDS = {
+    n: f"SELECT id, url FROM urls WHERE url IN ({','.join('?' * n)})" for n in URL_BATCH_SIZES
+}
+SQL_INSERT_URLS = {
+    n: "INSERT OR IGNORE INTO urls (url, classification, first_seen, last_seen) VALUES "
+       + ",".join(["(?, ?, ?, ?)"] * n)
+    for n in URL_BATCH_SIZES if n <= 128
+}
+
+def _power_of_two_chunks(items: list, max_size: int):
+    """Split items into chunks whose sizes are the largest power of two <= max_size that fits."""
+    i = 0
+    while i < len(items):
+        size = max_size
+        while size > len(items) - i:
+            size //= 2
+        yield items[i:i + size]
+        i += size
+
+@lru_cache(maxsize=None)
+def _multi_insert_sql(sql: str, n: int) -> str:
+    """Expand a single-row ``INSERT ... VALUES (...)`` statement to n VALUES groups."""
+    head, values, row = sql.rpartition("VALUES")
+    return f"{head}{values} " + ",".join([row.strip()] * n)
+
+async def multi_insert(conn: aiosqlite.Connection, sql: str, rows: List[tuple], max_rows: int = 64):
+    """Insert rows with multi-row VALUES statements of power-of-two sizes (caller commits).
+    
+    max_rows keeps rows * columns under SQLite's historical 999 host parameter limit.
+    """
+    for chunk in _power_of_two_chunks(rows, max_rows):
+        await conn.execute(_multi_insert_sql(sql, len(chunk)), [value for row in chunk for value in row])
+
+async def get_or_create_url_ids(urls: Iterable[str], base_domain: str, conn: aiosqlite.Connection, is_from_hreflang: bool = False, now: Optional[int] = None) -> Dict[str, int]:
+    """Get URL IDs for many URLs at once, creating missing URL records (caller commits)."""
+    unique_urls = list(dict.fromkeys(url for url in urls if url is not None))
+    if not unique_urls:
+        return {}
+    
+    url_ids = await _lookup_url_ids(unique_urls, conn)
+    
+    # Only URLs we have never stored need classifying and inserting
+    missing = [url for url in unique_urls if url not in url_ids]
+    if missing:
+        if now is None:
+            now = int(time.time())
+        classifications = classify_urls_bulk(missing, base_domain, is_from_hreflang=is_from_hreflang)
+        offset = 0
+        for chunk in _power_of_two_chunks(missing, 128):
+            params = []
+            for url, classification in zip(chunk, classifications[offset:offset + len(chunk)]):
+                params.extend((url, classification, now, now))
+            offset += len(chunk)
+            await conn.execute(SQL_INSERT_URLS[len(chunk)], params)
+        url_ids.update(await _lookup_url_ids(missing, conn))
+    return url_ids
+
+async def _lookup_url_ids(urls: List[str], conn: aiosqlite.Connection) -> Dict[str, int]:
+    """Map already-stored URLs to their IDs using power-of-two IN (...) lookups."""
+    url_ids = {}
+    for chunk in _power_of_two_chunks(urls, 256):
+        cursor = await conn.execute(SQL_LOOKUP_URL_IDS[len(chunk)], chunk)
+        for url_id, url in await cursor.fetchall():
+            url_ids[url] = url_id
+    return url_ids
+
+# Process-wide (db_path, url) -> url_id LRU; urls rows are never deleted, so entries stay valid
+URL_ID_CACHE_MAX_ENTRIES = 100_000
+_url_id_cache: Dict[Tuple[str, str], int] = {}
+
+def clear_url_id_cache(db_path: str):
+    """Drop cached url_ids for db_path; every crawl DB init calls this, as the file may be new."""
+    for key in [key for key in _url_id_cache if key[0] == db_path]:
+        del _url_id_cache[key]
+
+async def _cached_url_ids(urls: List[str], conn: aiosqlite.Connection, db_path: str) -> Dict[str, int]:
+    """Map already-stored URLs to their IDs, consulting _url_id_cache before the database."""
+    url_ids = {}
+    missing = []
+    for url in urls:
+        key = (db_path, url)
+        if key in _url_id_cache:
+            # Move to the most recently used end
+            url_ids[url] = _url_id_cache[key] = _url_id_cache.pop(key)
+        else:
+            missing.append(url)
+    if missing:
+        for url, url_id in (await _lookup_url_ids(missing, conn)).items():
+            if len(_url_id_cache) >= URL_ID_CACHE_MAX_ENTRIES:
+                del _url_id_cache[next(iter(_url_id_cache))]
+            _url_id_cache[(db_path, url)] = url_ids[url] = url_id
+    return url_ids
+
+# Normalised lookup tables (table -> UNIQUE value column) that bulk_get_or_create_ids may touch
+LOOKUP_TABLES = {
+    'anchor_texts': 'text',
+    'fragments': 'fragment',
+    'xpaths': 'xpath',
+    'robots_directive_strings': 'directive',
+    'meta_descriptions': 'description',
+    'html_languages': 'language_code',
+    'hreflang_languages': 'language_code',
+    'schema_types': 'type_name',
+}
+
+# Single-statement get-or-create per lookup table: the no-op DO UPDATE lets RETURNING report existing rows too
+SQL_GET_OR_CREATE_LOOKUP = {
+    table: f"INSERT INTO {table} ({column}) VALUES (?) ON CONFLICT({column}) DO UPDATE SET {column}=excluded.{column} RETURNING id"
+    for table, column in LOOKUP_TABLES.items()
+}
+
+@lru_cache(maxsize=None)
+def _lookup_table_sql(table: str, column: str, n: int) -> Tuple[str, str]:
+    """SELECT and multi-row INSERT OR IGNORE statements for n values of a lookup table."""
+    placeholders = ','.join('?' * n)
+    return (
+        f"SELECT id, {column} FROM {table} WHERE {column} IN ({placeholders})",
+        f"INSERT OR IGNORE INTO {table} ({column}) VALUES " + ",".join(["(?)"] * n),
+    )
+
+async def bulk_get_or_create_ids(table: str, column: str, values: Iterable[str], conn: aiosqlite.Connection) -> Dict[str, int]:
+    """Map values of a lookup table to their IDs, inserting the missing ones (caller commits).
+    
+    Replaces per-value get_or_create_*_id calls with an IN (...) lookup, one multi-row
+    insert for the values not yet stored, and a lookup of just those.
+    """
+    if LOOKUP_TABLES.get(table) != column:
+        raise ValueError(f"Not a lookup table column: {table}.{column}")
+    
+    unique_values = list(dict.fromkeys(value for value in values if value is not None))
+    ids: Dict[str, int] = {}
+    
+    async def lookup(chunk_values: List[str]):
+        for chunk in _power_of_two_chunks(chunk_values, 256):
+            cursor = await conn.execute(_lookup_table_sql(table, column, len(chunk))[0], chunk)
+            for value_id, value in await cursor.fetchall():
+                ids[value] = value_id
+    
+    await lookup(unique_values)
+    missing = [value for value in unique_values if value not in ids]
+    if missing:
+        for chunk in _power_of_two_chunks(missing, 256):
+            await conn.execute(_lookup_table_sql(table, column, len(chunk))[1], chunk)
+        await lookup(missing)
+    return ids
 
 async def get_url_by_id(url_id: int, db_path: str = CRAWL_DB_PATH) -> str | None:
     """Get URL string by ID."""
-    async with aiosqlite.connect(db_path) as db:
+    async with _connection(db_path) as db:
         cursor = await db.execute("SELECT url FROM urls WHERE id = ?", (url_id,))
         row = await cursor.fetchone()
         return row[0] if row else None
@@ -1290,20 +1598,14 @@ async def get_conditional_headers(url: str, base_domain: str, pages_db_path: str
 
 # ------------------ writers ------------------
 
-async def write_page(url: str, final_url: str, status: int, headers: dict, html: str, base_domain: str, pages_db_path: str = PAGES_DB_PATH, crawl_db_path: str = CRAWL_DB_PATH, redirect_chain_json: str = None):
-    now = int(time.time())
-    
-    # Get URL IDs
-    url_id = await get_or_create_url_id(url, base_domain, crawl_db_path)
-    final_url_id = await get_or_create_url_id(final_url, base_domain, crawl_db_path) if final_url != url else url_id
-    
-    # Extract initial status code and redirect destination from redirect chain
+def _parse_redirect_chain(url: str, status: int, redirect_chain_json: str = None) -> Tuple[int, Optional[str]]:
+    """Return (initial_status_code, redirect_destination) from a JSON redirect chain."""
     initial_status_code = status  # Default to final status if no redirect chain
-    redirect_destination_url_id = None
+    redirect_destination = None
     
     if redirect_chain_json:
         try:
-            redirect_chain = json.loads(redirect_chain_json)
+            redirect_chain = _json_loads(redirect_chain_json)
             if redirect_chain:
                 # First step in chain is the initial request
                 initial_status_code = redirect_chain[0].get('status', status)
@@ -1315,74 +1617,61 @@ async def write_page(url: str, final_url: str, status: int, headers: dict, html:
                     location = first_response_headers.get('location')
                     if location:
                         # Normalize the redirect destination URL
-                        from urllib.parse import urljoin
                         redirect_destination = urljoin(url, location)
-                        redirect_destination_url_id = await get_or_create_url_id(redirect_destination, base_domain, crawl_db_path)
         except (json.JSONDecodeError, KeyError, IndexError):
             # If parsing fails, use defaults
             pass
+    return initial_status_code, redirect_destination
+
+async def write_page(url: str, final_url: str, status: int, headers: dict, html: str, base_domain: str, pages_db_path: str = PAGES_DB_PATH, crawl_db_path: str = CRAWL_DB_PATH, redirect_chain_json: str = None):
+    now = int(time.time())
+    
+    # Extract initial status code and redirect destination from redirect chain
+    initial_status_code, redirect_destination = _parse_redirect_chain(url, status, redirect_chain_json)
     
     # Extract ETag and Last-Modified from headers
     etag = headers.get('etag', '').strip('"') if headers.get('etag') else None
     last_modified = headers.get('last-modified', '').strip() if headers.get('last-modified') else None
     
-    # Store HTML and headers in pages database with maximum compression for smaller file sizes
-    async with aiosqlite.connect(pages_db_path) as db:
-        await db.execute(
-            """
-        INSERT INTO pages(url_id, headers_json, html_compressed)
-        VALUES (?,?,?)
-        ON CONFLICT(url_id) DO UPDATE SET
-          headers_json=excluded.headers_json,
-          html_compressed=excluded.html_compressed
-        """,
-            (url_id, json.dumps(headers, ensure_ascii=False), compress_html(html)),
-        )
-        await db.commit()
+    # zlib/zstd release the GIL, so compression in a worker thread keeps the event loop free
+    html_compressed = await asyncio.get_running_loop().run_in_executor(None, compress_html, html)
     
-    # Store metadata in crawl database
-    async with aiosqlite.connect(crawl_db_path) as db:
-        await db.execute(
-            """
-        INSERT INTO page_metadata(url_id, initial_status_code, final_status_code, final_url_id, redirect_destination_url_id, fetched_at, etag, last_modified)
-        VALUES (?,?,?,?,?,?,?,?)
-        ON CONFLICT(url_id) DO UPDATE SET
-          initial_status_code=excluded.initial_status_code,
-          final_status_code=excluded.final_status_code,
-          final_url_id=excluded.final_url_id,
-          redirect_destination_url_id=excluded.redirect_destination_url_id,
-          fetched_at=excluded.fetched_at,
-          etag=excluded.etag,
-          last_modified=excluded.last_modified
-        """,
+    async with _connection(crawl_db_path) as crawl_db:
+        # Write pages and metadata through one connection and one commit
+        await attach_pages_db(crawl_db, pages_db_path)
+        
+        # Resolve the page, final and redirect destination URLs in one round trip
+        url_ids = await get_or_create_url_ids([url, final_url, redirect_destination], base_domain, crawl_db, now=now)
+        url_id = url_ids[url]
+        final_url_id = url_ids[final_url]
+        redirect_destination_url_id = url_ids.get(redirect_destination) if redirect_destination else None
+        
+        # Store HTML and headers in pages database with maximum compression for smaller file sizes
+        await crawl_db.execute(
+            SQL_UPSERT_ATTACHED_PAGE,
+            (url_id, _json_dumps(headers), html_compressed),
+        )
+        
+        # Store metadata in crawl database
+        await crawl_db.execute(
+            SQL_UPSERT_PAGE_METADATA,
             (url_id, initial_status_code, status, final_url_id, redirect_destination_url_id, now, etag, last_modified),
         )
-        await db.commit()
+        await crawl_db.commit()
 
 async def upsert_url(url: str, kind: str, base_domain: str, discovered_from: Optional[str] = None, is_from_hreflang: bool = False, db_path: str = CRAWL_DB_PATH):
     now = int(time.time())
     
-    # Get discovered_from_id if provided
-    discovered_from_id = None
-    if discovered_from:
-        discovered_from_id = await get_or_create_url_id(discovered_from, base_domain, db_path)
-    
     # Classify the URL
     classification = classify_url(url, base_domain, is_from_hreflang=is_from_hreflang)
     
-    async with aiosqlite.connect(db_path) as db:
-        await db.execute(
-            """
-        INSERT INTO urls(url, kind, classification, discovered_from_id, first_seen, last_seen)
-        VALUES (?,?,?,?,?,?)
-        ON CONFLICT(url) DO UPDATE SET
-          kind=excluded.kind,
-          classification=excluded.classification,
-          discovered_from_id=COALESCE(urls.discovered_from_id, excluded.discovered_from_id),
-          last_seen=excluded.last_seen
-        """,
-            (url, kind, classification, discovered_from_id, now, now),
-        )
+    async with _connection(db_path) as db:
+        # Get discovered_from_id if provided
+        discovered_from_id = None
+        if discovered_from:
+            discovered_from_id = (await get_or_create_url_ids([discovered_from], base_domain, db, now=now)).get(discovered_from)
+        
+        await db.execute(SQL_UPSERT_URL, (url, kind, classification, discovered_from_id, now, now))
         await db.commit()
 
 # ------------------ batch writers ------------------
@@ -1400,89 +1689,73 @@ async def batch_write_pages(pages_data: List[Tuple[str, str, int, dict, str, str
 async def _batch_write_pages_chunk(pages_data: List[Tuple[str, str, int, dict, str, str, str]], pages_db_path: str, crawl_db_path: str):
     """Write a chunk of pages."""
     
-    async with aiosqlite.connect(pages_db_path) as pages_conn, aiosqlite.connect(crawl_db_path) as crawl_conn:
-        await optimize_connection(pages_conn)
-        await optimize_connection(crawl_conn)
-        # Prepare batch data for pages (HTML and headers only)
-        pages_batch_data = []
-        metadata_batch_data = []
+    # Compress the whole chunk in a worker thread; it overlaps with URL ID resolution below
+    compressing = asyncio.get_running_loop().run_in_executor(
+        None, compress_html_many, [page[4] for page in pages_data]
+    )
+    
+    try:
+        async with _connection(crawl_db_path) as crawl_conn:
+            # Pages are written through the attached pages database so the chunk holds one connection
+            await attach_pages_db(crawl_conn, pages_db_path)
         
-        for url, final_url, status, headers, html, base_domain, redirect_chain_json in pages_data:
-            # Get URL IDs
-            url_id = await get_or_create_url_id_with_conn(url, base_domain, crawl_db_path, crawl_conn)
-            final_url_id = await get_or_create_url_id_with_conn(final_url, base_domain, crawl_db_path, crawl_conn) if final_url != url else url_id
-            
-            # Extract initial status code and redirect destination from redirect chain
-            initial_status_code = status  # Default to final status if no redirect chain
-            redirect_destination_url_id = None
-            
-            if redirect_chain_json:
-                try:
-                    redirect_chain = json.loads(redirect_chain_json)
-                    if redirect_chain:
-                        # First step in chain is the initial request
-                        initial_status_code = redirect_chain[0].get('status', status)
-                        
-                        # If there's a redirect (301, 302, etc.), find the destination
-                        if initial_status_code in [301, 302, 303, 307, 308]:
-                            # Look for Location header in the first redirect response
-                            first_response_headers = redirect_chain[0].get('headers', {})
-                            location = first_response_headers.get('location')
-                            if location:
-                                # Normalize the redirect destination URL
-                                from urllib.parse import urljoin
-                                redirect_destination = urljoin(url, location)
-                                redirect_destination_url_id = await get_or_create_url_id_with_conn(redirect_destination, base_domain, crawl_db_path, crawl_conn)
-                except (json.JSONDecodeError, KeyError, IndexError):
-                    # If parsing fails, use defaults
-                    pass
+            # Take the write lock up front: URL inserts, pages and metadata share one transaction
+            await begin_immediate(crawl_conn)
+            # Parse redirect chains first so every URL in the chunk can be resolved up front
+            parsed_rows = []
+            urls_by_domain: Dict[str, List[str]] = {}
+            for url, final_url, status, headers, html, base_domain, redirect_chain_json in pages_data:
+                initial_status_code, redirect_destination = _parse_redirect_chain(url, status, redirect_chain_json)
+                parsed_rows.append((initial_status_code, redirect_destination))
+                urls_by_domain.setdefault(base_domain, []).extend((url, final_url, redirect_destination))
+        
+            # One bulk resolve per base domain (classification depends on it) instead of per-row lookups
+            now = int(time.time())
+            url_ids_by_domain = {
+                base_domain: await get_or_create_url_ids(urls, base_domain, crawl_conn, now=now)
+                for base_domain, urls in urls_by_domain.items()
+            }
+        
+            # Prepare batch data for pages (HTML and headers only)
+            pages_batch_data = []
+            metadata_batch_data = []
+            compressed_htmls = await compressing
+        
+            for (url, final_url, status, headers, html, base_domain, redirect_chain_json), (initial_status_code, redirect_destination), html_compressed in zip(pages_data, parsed_rows, compressed_htmls):
+                url_ids = url_ids_by_domain[base_domain]
+                url_id = url_ids[url]
+                final_url_id = url_ids[final_url]
+                redirect_destination_url_id = url_ids[redirect_destination] if redirect_destination else None
             
-            # Extract ETag and Last-Modified from headers
-            etag = headers.get('etag', '').strip('"') if headers.get('etag') else None
-            last_modified = headers.get('last-modified', '').strip() if headers.get('last-modified') else None
+                # Extract ETag and Last-Modified from headers
+                etag = headers.get('etag', '').strip('"') if headers.get('etag') else None
+                last_modified = headers.get('last-modified', '').strip() if headers.get('last-modified') else None
             
-            # Pages data (HTML and headers only)
-            pages_batch_data.append((
-                url_id, json.dumps(headers, ensure_ascii=False), compress_html(html)
-            ))
+                # Pages data (HTML and headers only)
+                pages_batch_data.append((
+                    url_id, _json_dumps(headers), html_compressed
+                ))
             
-            # Metadata data (status, timestamps, etc.)
-            metadata_batch_data.append((
-                url_id, initial_status_code, status, final_url_id, redirect_destination_url_id, int(time.time()), etag, last_modified
-            ))
+                # Metadata data (status, timestamps, etc.)
+                metadata_batch_data.append((
+                    url_id, initial_status_code, status, final_url_id, redirect_destination_url_id, now, etag, last_modified
+                ))
         
-        # Batch insert pages (HTML and headers) with maximum compression for smaller file sizes
-        await pages_conn.executemany(
-            """
-            INSERT INTO pages(url_id, headers_json, html_compressed)
-            VALUES (?,?,?)
-            ON CONFLICT(url_id) DO UPDATE SET
-              headers_json=excluded.headers_json,
-              html_compressed=excluded.html_compressed
-            """,
-            pages_batch_data
-        )
-        await pages_conn.commit()
+            # Batch insert pages (HTML and headers) with maximum compression for smaller file sizes
+            await crawl_conn.executemany(SQL_UPSERT_ATTACHED_PAGE, pages_batch_data)
         
-        # Batch insert metadata
-        await crawl_conn.executemany(
-            """
-            INSERT INTO page_metadata(url_id, initial_status_code, final_status_code, final_url_id, redirect_destination_url_id, fetched_at, etag, last_modified)
-            VALUES (?,?,?,?,?,?,?,?)
-            ON CONFLICT(url_id) DO UPDATE SET
-              initial_status_code=excluded.initial_status_code,
-              final_status_code=excluded.final_status_code,
-              final_url_id=excluded.final_url_id,
-              redirect_destination_url_id=excluded.redirect_destination_url_id,
-              fetched_at=excluded.fetched_at,
-              etag=excluded.etag,
-              last_modified=excluded.last_modified
-            """,
-            metadata_batch_data
-        )
-        await crawl_conn.commit()
-
-async def batch_upsert_urls(urls_data: List[Tuple], db_path: str = CRAWL_DB_PATH, batch_size: int = 500):
+            # Batch insert metadata
+            await crawl_conn.executemany(SQL_UPSERT_PAGE_METADATA, metadata_batch_data)
+            await crawl_conn.commit()
+            await checkpoint_every(crawl_conn, crawl_db_path)
+    finally:
+        # A failure before `await compressing` must not leave the future unretrieved
+        # (a compression error would only surface as an asyncio GC warning)
+        compressing.cancel()
+        if compressing.done() and not compressing.cancelled():
+            compressing.exception()
+
+async def batch_upsert_urls(urls_data: List[Tuple], db_path: str = CRAWL_DB_PATH, batch_size: int = 2000):
     """Batch upsert multiple URLs for better performance."""
     if not urls_data:
         return
@@ -1494,43 +1767,42 @@ async def batch_upsert_urls(urls_data: List[Tuple], db_path: str = CRAWL_DB_PATH
 
 async def _batch_upsert_urls_chunk(urls_data: List[Tuple], db_path: str):
     """Upsert a chunk of URLs."""
+    # Handle both old (4 params) and new (5 params) formats
+    rows = [url_data if len(url_data) == 5 else (*url_data, False) for url_data in urls_data]
     
-    async with aiosqlite.connect(db_path) as conn:
-        # Prepare batch data
-        batch_data = []
-        now = int(time.time())
+    now = int(time.time())
+    async with _connection(db_path) as conn:
+        # One write transaction covers the ID resolution and the upsert
+        await begin_immediate(conn)
         
-        for url_data in urls_data:
-            # Handle both old (4 params) and new (5 params) formats
-            if len(url_data) == 4:
-                url, kind, base_domain, discovered_from = url_data
-                is_from_sitemap = False
-            else:
-                url, kind, base_domain, discovered_from, is_from_sitemap = url_data
-            # Get discovered_from_id if provided
-            discovered_from_id = None
+        # Resolve every discovered_from URL up front, one bulk call per base domain
+        parents_by_domain: Dict[str, List[str]] = {}
+        urls_by_domain: Dict[str, List[str]] = {}
+        for url, kind, base_domain, discovered_from, is_from_sitemap in rows:
+            urls_by_domain.setdefault(base_domain, []).append(url)
             if discovered_from:
-                discovered_from_id = await get_or_create_url_id_with_conn(discovered_from, base_domain, db_path, conn)
-            
-            # Classify the URL
-            classification = classify_url(url, base_domain, is_from_sitemap)
-            
-            batch_data.append((url, kind, classification, discovered_from_id, now, now))
+                parents_by_domain.setdefault(base_domain, []).append(discovered_from)
+        parent_ids: Dict[str, int] = {}
+        for base_domain, parents in parents_by_domain.items():
+            parent_ids.update(await get_or_create_url_ids(parents, base_domain, conn, now=now))
+        
+        # Classify the chunk in one pass per base domain
+        classifications = {
+            base_domain: dict(zip(urls, classify_urls_bulk(urls, base_domain)))
+            for base_domain, urls in urls_by_domain.items()
+        }
+        
+        # Prepare batch data
+        batch_data = [
+            (url, kind, classifications[base_domain][url],
+             parent_ids[discovered_from] if discovered_from else None, now, now)
+            for url, kind, base_domain, discovered_from, is_from_sitemap in rows
+        ]
         
         # Batch insert
-        await conn.executemany(
-            """
-            INSERT INTO urls(url, kind, classification, discovered_from_id, first_seen, last_seen)
-            VALUES (?,?,?,?,?,?)
-            ON CONFLICT(url) DO UPDATE SET
-              kind=excluded.kind,
-              classification=excluded.classification,
-              discovered_from_id=COALESCE(urls.discovered_from_id, excluded.discovered_from_id),
-              last_seen=excluded.last_seen
-            """,
-            batch_data
-        )
+        await bulk_insert(conn, SQL_UPSERT_URL, batch_data)
         await conn.commit()
+        await checkpoint_every(conn, db_path)
 
 async def batch_enqueue_frontier(children_data: List[Tuple[str, int, Optional[str], str]], db_path: str = CRAWL_DB_PATH, batch_size: int = 1000):
     """Batch enqueue multiple frontier items for better performance."""
@@ -1545,26 +1817,32 @@ async def batch_enqueue_frontier(children_data: List[Tuple[str, int, Optional[st
 async def _batch_enqueue_frontier_chunk(children_data: List[Tuple[str, int, Optional[str], str]], db_path: str):
     """Enqueue a chunk of frontier items."""
     
-    async with aiosqlite.connect(db_path) as conn:
-        # Prepare batch data
-        batch_data = []
-        now = int(time.time())
+    now = int(time.time())
+    async with _connection(db_path) as conn:
+        # One write transaction covers the ID resolution and the insert
+        await begin_immediate(conn)
         
+        # Resolve child and parent IDs in one bulk call per base domain
+        urls_by_domain: Dict[str, List[str]] = {}
         for url, depth, parent_url, base_domain in children_data:
-            url_id = await get_or_create_url_id_with_conn(url, base_domain, db_path, conn)
-            parent_id = await get_or_create_url_id_with_conn(parent_url, base_domain, db_path, conn) if parent_url else None
-            
-            batch_data.append((url_id, depth, parent_id, 'queued', now, now))
+            domain_urls = urls_by_domain.setdefault(base_domain, [])
+            domain_urls.append(url)
+            if parent_url:
+                domain_urls.append(parent_url)
+        ids: Dict[str, int] = {}
+        for base_domain, urls in urls_by_domain.items():
+            ids.update(await get_or_create_url_ids(urls, base_domain, conn, now=now))
+        
+        # Prepare batch data
+        batch_data = [
+            (ids[url], depth, ids[parent_url] if parent_url else None, 'queued', now, now)
+            for url, depth, parent_url, base_domain in children_data
+        ]
         
         # Batch insert
-        await conn.executemany(
-            """
-            INSERT OR IGNORE INTO frontier(url_id, depth, parent_id, status, enqueued_at, updated_at)
-            VALUES (?,?,?,?,?,?)
-            """,
-            batch_data
-        )
+        await bulk_insert(conn, SQL_INSERT_FRONTIER, batch_data)
         await conn.commit()
+        await checkpoint_every(conn, db_path)
 
 async def batch_write_content(content_data: List[Tuple[int, str, str, str, str, str, str, int, bool]], db_path: str = CRAWL_DB_PATH, batch_size: int = 100):
     """Batch write content extraction data for better performance."""
@@ -1579,7 +1857,7 @@ async def batch_write_content(content_data: List[Tuple[int, str, str, str, str,
 async def _batch_write_content_chunk(content_data: List[Tuple[int, str, str, str, str, str, str, int, bool]], db_path: str):
     """Write a chunk of content data."""
     
-    async with aiosqlite.connect(db_path) as conn:
+    async with _connection(db_path) as conn:
         # Batch insert
         await conn.executemany(
             """
@@ -1598,13 +1876,14 @@ async def _batch_write_content_chunk(content_data: List[Tuple[int, str, str, str
             content_data
         )
         await conn.commit()
+        await checkpoint_every(conn, db_path)
 
 async def add_hreflang_urls_to_frontier(crawl_db_path: str, base_domain: str):
     """Add hreflang URLs to the frontier for crawling."""
-    async with aiosqlite.connect(crawl_db_path) as conn:
+    async with _connection(crawl_db_path) as conn:
         # Get all hreflang URLs from both HTML head and sitemap that are not already in the frontier
         cursor = await conn.execute("""
-            SELECT DISTINCT u.url 
+            SELECT DISTINCT u.id, u.url 
             FROM (
                 SELECT href_url_id FROM hreflang_html_head
                 UNION
@@ -1617,267 +1896,318 @@ async def add_hreflang_urls_to_frontier(crawl_db_path: str, base_domain: str):
         
         if hreflang_urls:
             print(f"Adding {len(hreflang_urls)} hreflang URLs to frontier...")
-            for (url,) in hreflang_urls:
-                await frontier_seed(url, base_domain, reset=False, db_path=crawl_db_path, depth=0)
+            # The URLs already exist, so they are enqueued at depth 0 in one statement and one commit
+            now = int(time.time())
+            urls = [url for _, url in hreflang_urls]
+            priority_scores = calculate_priority_scores_batch(urls, [0] * len(urls))
+            await conn.executemany(
+                SQL_INSERT_FRONTIER_SCORED,
+                [
+                    (url_id, 0, None, 'queued', now, now,
+                     priority_score, 0.5, calculate_content_type_score(url))
+                    for (url_id, url), priority_score in zip(hreflang_urls, priority_scores)
+                ]
+            )
+            await conn.commit()
+
+def _prepare_content_rows(content_data: List[Tuple[str, dict, str, int]]) -> List[dict]:
+    """Derive the SQL-free column values for each content record.
+    
+    Pure function (no database or shared-cache access), so it can run in a worker thread.
+    """
+    prepared = []
+    for url, content_info, base_domain, crawl_depth in content_data:
+        html_meta_directives = content_info['html_meta_directives'] or []
+        http_header_directives = content_info['http_header_directives'] or []
+        canonical_url = content_info['canonical_url']
+        prepared.append({
+            'h1_tags': _json_dumps(content_info['h1_tags']),
+            'h2_tags': _json_dumps(content_info['h2_tags']),
+            'simhash_bands': simhash_bands(content_info.get('content_hash_simhash', '')),
+            # Protocol-relative URLs default to https, as for hrefs
+            'canonical_url': _fix_protocol_relative(canonical_url) if canonical_url else None,
+            'hreflang_urls': [
+                (hreflang_data['hreflang'], _fix_protocol_relative(hreflang_data['url']))
+                for hreflang_data in content_info.get('hreflang_urls') or ()
+            ],
+            'html_meta_allows': not any('noindex' in d for d in html_meta_directives),
+            'http_header_allows': not any('noindex' in d for d in http_header_directives),
+            'html_meta_directives': _json_dumps(content_info['html_meta_directives']),
+            'http_header_directives': _json_dumps(content_info['http_header_directives']),
+        })
+    return prepared
 
 async def batch_write_content_with_url_resolution(content_data: List[Tuple[str, dict, str, int]], crawl_db_path: str):
     """Write content data with URL ID resolution and normalized tables."""
     if not content_data:
         return
     
-    # Retry logic for database locks
-    for attempt in range(3):
-        try:
-            async with aiosqlite.connect(crawl_db_path, timeout=30.0) as conn:
-                for url, content_info, base_domain, crawl_depth in content_data:
-                    # Get URL ID
-                    cursor = await conn.execute("SELECT id FROM urls WHERE url = ?", (url,))
-                    row = await cursor.fetchone()
-                    if not row:
-                        continue
-                    
-                    url_id = row[0]
-                    
-                    # Check if this URL has any redirect history (either as source or destination)
-                    # If it does, don't store content hashes - only store on URLs with no redirect history
-                    cursor = await conn.execute("""
-                        SELECT 1 FROM redirects WHERE source_url_id = ? OR target_url_id = ?
-                    """, (url_id, url_id))
-                    has_redirect_history = await cursor.fetchone()
-                    
-                    if has_redirect_history:
-                        # This URL has redirect history, skip content hashing
-                        print(f"  -> URL {url} has redirect history, skipping content hashing")
-                        continue
-                    
-                    # Get or create normalized IDs
-                    meta_description_id = await get_or_create_meta_description_id(content_info['meta_description'], conn)
-                    html_lang_id = await get_or_create_html_language_id(content_info['html_lang'], conn)
-                    
-                    # Insert/update content
-                    await conn.execute(
-                        """
-                        INSERT INTO content(url_id, title, meta_description_id, h1_tags, h2_tags, word_count, html_lang_id, crawl_depth, content_hash_sha256, content_hash_simhash, content_length)
-                        VALUES (?,?,?,?,?,?,?,?,?,?,?)
-                        ON CONFLICT(url_id) DO UPDATE SET
-                          title=excluded.title,
-                          meta_description_id=excluded.meta_description_id,
-                          h1_tags=excluded.h1_tags,
-                          h2_tags=excluded.h2_tags,
-                          word_count=excluded.word_count,
-                          html_lang_id=excluded.html_lang_id,
-                          crawl_depth=excluded.crawl_depth,
-                          content_hash_sha256=excluded.content_hash_sha256,
-                          content_hash_simhash=excluded.content_hash_simhash,
-                          content_length=excluded.content_length
-                        """,
-                        (
-                            url_id,
-                            content_info['title'],
-                            meta_description_id,
-                            json.dumps(content_info['h1_tags'], ensure_ascii=False),
-                            json.dumps(content_info['h2_tags'], ensure_ascii=False),
-                            content_info['word_count'],
-                            html_lang_id,
-                            crawl_depth,  # Use depth from frontier
-                            content_info.get('content_hash_sha256', ''),
-                            content_info.get('content_hash_simhash', ''),
-                            content_info.get('content_length', 0)
-                        )
-                    )
-                    
-                    # Insert robots directives from HTML meta
-                    if content_info['html_meta_directives']:
-                        for directive in content_info['html_meta_directives']:
-                            directive_id = await get_or_create_robots_directive_id(directive, conn)
-                            await conn.execute(
-                                """
-                                INSERT OR IGNORE INTO robots_directives(url_id, source, directive_id)
-                                VALUES (?, 'html_meta', ?)
-                                """,
-                                (url_id, directive_id)
-                            )
-                    
-                    # Insert robots directives from HTTP headers
-                    if content_info['http_header_directives']:
-                        for directive in content_info['http_header_directives']:
-                            directive_id = await get_or_create_robots_directive_id(directive, conn)
-                            await conn.execute(
-                                """
-                                INSERT OR IGNORE INTO robots_directives(url_id, source, directive_id)
-                                VALUES (?, 'http_header', ?)
-                                """,
-                                (url_id, directive_id)
-                            )
-                    
-                    # Insert canonical URL from HTML head
-                    if content_info['canonical_url']:
-                        canonical_url = content_info['canonical_url']
-                        
-                        # Normalize protocol-relative URLs
-                        normalized_canonical_url = canonical_url
-                        if canonical_url.startswith('//'):
-                            # Convert protocol-relative URL to use the same protocol as the base domain
-                            from urllib.parse import urlparse
-                            if base_domain:
-                                # Use the base domain's protocol
-                                base_protocol = 'https'  # Default to https for modern sites
-                                normalized_canonical_url = f"{base_protocol}:{canonical_url}"
-                            else:
-                                # Fallback to https
-                                normalized_canonical_url = f"https:{canonical_url}"
-                        
-                        canonical_url_id = await get_or_create_canonical_url_id(normalized_canonical_url, base_domain, conn)
-                        await conn.execute(
-                            """
-                            INSERT OR IGNORE INTO canonical_urls(url_id, canonical_url_id, source)
-                            VALUES (?, ?, 'html_head')
-                            """,
-                            (url_id, canonical_url_id)
-                        )
-                    
-                    # Process hreflang URLs from HTML head
-                    if content_info.get('hreflang_urls'):
-                        for hreflang_data in content_info['hreflang_urls']:
-                            hreflang_url = hreflang_data['url']
-                            hreflang_lang = hreflang_data['hreflang']
-                            
-                            # Normalize protocol-relative URLs
-                            normalized_hreflang_url = hreflang_url
-                            if hreflang_url.startswith('//'):
-                                # Convert protocol-relative URL to use the same protocol as the base domain
-                                from urllib.parse import urlparse
-                                if base_domain:
-                                    # Use the base domain's protocol
-                                    base_protocol = 'https'  # Default to https for modern sites
-                                    normalized_hreflang_url = f"{base_protocol}:{hreflang_url}"
-                                else:
-                                    # Fallback to https
-                                    normalized_hreflang_url = f"https:{hreflang_url}"
-                            
-                            # Get or create hreflang language ID
-                            hreflang_lang_id = await get_or_create_hreflang_language_id(hreflang_lang, conn)
-                            
-                            # Get or create target URL ID (classify as network since it's from hreflang)
-                            target_url_id = await get_or_create_url_id(normalized_hreflang_url, base_domain, crawl_db_path, conn, is_from_hreflang=True)
-                            
-                            # Insert hreflang HTML head data
-                            await conn.execute(
-                                """
-                                INSERT OR IGNORE INTO hreflang_html_head(url_id, hreflang_id, href_url_id)
-                                VALUES (?, ?, ?)
-                                """,
-                                (url_id, hreflang_lang_id, target_url_id)
-                            )
-                    
-                    # Calculate indexability
-                    html_meta_allows = not any('noindex' in d for d in content_info['html_meta_directives'])
-                    http_header_allows = not any('noindex' in d for d in content_info['http_header_directives'])
-                    
-                    # Check robots.txt for this URL
-                    from urllib.parse import urlparse
-                    from .robots import is_url_crawlable, get_matching_robots_txt_rules
-                    parsed_url = urlparse(url)
-                    domain = parsed_url.netloc
-                    robots_txt_allows = is_url_crawlable(url, "SQLiteCrawler/0.2")
-                    
-                    # Store robots.txt directives if any
-                    robots_txt_directives = []
-                    if not robots_txt_allows:
-                        robots_txt_directives.append('disallow')
-                    
-                    # Store robots.txt directives in robots_directives table
-                    matching_rules = get_matching_robots_txt_rules(url, "SQLiteCrawler/0.2")
-                    for rule_type, rule_path in matching_rules:
-                        directive_id = await get_or_create_robots_directive_id(rule_type, conn)
-                        await conn.execute(
-                            """
-                            INSERT OR IGNORE INTO robots_directives(url_id, source, directive_id, value)
-                            VALUES (?, 'robots_txt', ?, ?)
-                            """,
-                            (url_id, directive_id, rule_path)
-                        )
-                    
-                    # Check if URL is self-canonical
-                    cursor = await conn.execute("SELECT canonical_url_id FROM canonical_urls WHERE url_id = ?", (url_id,))
-                    canonical_row = await cursor.fetchone()
-                    is_self_canonical = canonical_row and canonical_row[0] == url_id
-                    
-                    # Get initial status code from page_metadata table in crawl database
-                    cursor = await conn.execute("SELECT initial_status_code FROM page_metadata WHERE url_id = ?", (url_id,))
-                    page_row = await cursor.fetchone()
-                    initial_status_code = page_row[0] if page_row else None
-                    
-                    # Calculate overall indexability: only true if initial_status=200, self canonical, and no restrictions
-                    overall_indexable = (
-                        initial_status_code == 200 and 
-                        is_self_canonical and 
-                        robots_txt_allows and 
-                        html_meta_allows and 
-                        http_header_allows
-                    )
-                    
-                    # Insert/update indexability summary
-                    await conn.execute(
-                        """
-                        INSERT INTO indexability(url_id, robots_txt_allows, html_meta_allows, http_header_allows, 
-                                               robots_txt_directives, html_meta_directives, http_header_directives, overall_indexable)
-                        VALUES (?,?,?,?,?,?,?,?)
-                        ON CONFLICT(url_id) DO UPDATE SET
-                          robots_txt_allows=excluded.robots_txt_allows,
-                          html_meta_allows=excluded.html_meta_allows,
-                          http_header_allows=excluded.http_header_allows,
-                          robots_txt_directives=excluded.robots_txt_directives,
-                          html_meta_directives=excluded.html_meta_directives,
-                          http_header_directives=excluded.http_header_directives,
-                          overall_indexable=excluded.overall_indexable
-                        """,
-                        (
-                            url_id,
-                            robots_txt_allows,
-                            html_meta_allows,
-                            http_header_allows,
-                            json.dumps(robots_txt_directives, ensure_ascii=False),
-                            json.dumps(content_info['html_meta_directives'], ensure_ascii=False),
-                            json.dumps(content_info['http_header_directives'], ensure_ascii=False),
-                            overall_indexable
-                        )
-                    )
-                    
-                    # Process schema data if present - use new normalized structure
-                    if content_info.get('schema_data'):
-                        # Use the new normalized schema storage with existing connection
-                        await create_page_schema_references_with_conn(url_id, content_info['schema_data'], conn, crawl_db_path)
+    # CPU-bound serialisation and normalisation run in a worker thread before the write lock is taken
+    prepared_rows = await asyncio.get_running_loop().run_in_executor(None, _prepare_content_rows, content_data)
+    
+    async with _connection(crawl_db_path) as conn:
+        # Lock contention is handled on BEGIN alone, so a busy database never replays half a batch
+        await begin_immediate(conn)
+        # One cursor serves every statement in the batch instead of a new one per execute
+        cur = await conn.cursor()
+        now = int(time.time())
+        
+        # Resolve the batch's URL IDs and redirect history up front
+        url_ids = await _lookup_url_ids(list(dict.fromkeys(url for url, _, _, _ in content_data)), conn)
+        stored_ids = json.dumps(list(set(url_ids.values())))
+        await cur.execute("""
+            SELECT source_url_id FROM redirects WHERE source_url_id IN (SELECT value FROM json_each(?))
+            UNION
+            SELECT target_url_id FROM redirects WHERE target_url_id IN (SELECT value FROM json_each(?))
+        """, (stored_ids, stored_ids))
+        redirected_ids = {row[0] for row in await cur.fetchall()}
+        
+        records = []
+        for (url, content_info, base_domain, crawl_depth), prepared in zip(content_data, prepared_rows):
+            url_id = url_ids.get(url)
+            if not url_id:
+                continue
+            
+            # Check if this URL has any redirect history (either as source or destination)
+            # If it does, don't store content hashes - only store on URLs with no redirect history
+            if url_id in redirected_ids:
+                # This URL has redirect history, skip content hashing
+                print(f"  -> URL {url} has redirect history, skipping content hashing")
+                continue
+            
+            records.append((url_id, url, content_info, base_domain, crawl_depth, prepared, robots_decision(url, "SQLiteCrawler/0.2")))
+        
+        # Resolve every lookup-table value in the batch with one bulk call per table
+        desc_ids = await bulk_get_or_create_ids(
+            'meta_descriptions', 'description',
+            (record[2]['meta_description'] or None for record in records), conn
+        )
+        lang_ids = await bulk_get_or_create_ids(
+            'html_languages', 'language_code',
+            (record[2]['html_lang'] or None for record in records), conn
+        )
+        directive_ids = await bulk_get_or_create_ids(
+            'robots_directive_strings', 'directive',
+            [
+                *(directive for record in records for directive in record[2]['html_meta_directives'] or ()),
+                *(directive for record in records for directive in record[2]['http_header_directives'] or ()),
+                *(rule_type for record in records for rule_type, _ in record[6][1]),
+            ],
+            conn
+        )
+        hreflang_ids = await bulk_get_or_create_ids(
+            'hreflang_languages', 'language_code',
+            (hreflang_lang for record in records for hreflang_lang, _ in record[5]['hreflang_urls']), conn
+        )
+        
+        # Side-table rows are buffered and written with one executemany per table
+        robots_rows, canonical_rows, hreflang_rows = [], [], []
+        pending_canonicals: Dict[int, int] = {}
+        
+        for url_id, url, content_info, base_domain, crawl_depth, prepared, (robots_txt_allows, matching_rules) in records:
+            # Get or create normalized IDs
+            meta_description_id = desc_ids.get(content_info['meta_description'] or None)
+            html_lang_id = lang_ids.get(content_info['html_lang'] or None)
+            
+            # Insert/update content
+            await cur.execute(
+                """
+                INSERT INTO content(url_id, title, meta_description_id, h1_tags, h2_tags, word_count, html_lang_id, crawl_depth, content_hash_sha256, content_hash_simhash, content_length,
+                                    simhash_b0, simhash_b1, simhash_b2, simhash_b3)
+                VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+                ON CONFLICT(url_id) DO UPDATE SET
+                  title=excluded.title,
+                  meta_description_id=excluded.meta_description_id,
+                  h1_tags=excluded.h1_tags,
+                  h2_tags=excluded.h2_tags,
+                  word_count=excluded.word_count,
+                  html_lang_id=excluded.html_lang_id,
+                  crawl_depth=excluded.crawl_depth,
+                  content_hash_sha256=excluded.content_hash_sha256,
+                  content_hash_simhash=excluded.content_hash_simhash,
+                  content_length=excluded.content_length,
+                  simhash_b0=excluded.simhash_b0,
+                  simhash_b1=excluded.simhash_b1,
+                  simhash_b2=excluded.simhash_b2,
+                  simhash_b3=excluded.simhash_b3
+                """,
+                (
+                    url_id,
+                    content_info['title'],
+                    meta_description_id,
+                    prepared['h1_tags'],
+                    prepared['h2_tags'],
+                    content_info['word_count'],
+                    html_lang_id,
+                    crawl_depth,  # Use depth from frontier
+                    content_info.get('content_hash_sha256', ''),
+                    content_info.get('content_hash_simhash', ''),
+                    content_info.get('content_length', 0),
+                    *prepared['simhash_bands']
+                )
+            )
+            
+            # Robots directives from HTML meta, HTTP headers and matching robots.txt rules, as one rowset
+            directive_entries = (
+                [('html_meta', directive, None) for directive in content_info['html_meta_directives'] or ()]
+                + [('http_header', directive, None) for directive in content_info['http_header_directives'] or ()]
+                + [('robots_txt', rule_type, rule_path) for rule_type, rule_path in matching_rules]
+            )
+            for source, directive, value in directive_entries:
+                directive_id = directive_ids[directive]
+                robots_rows.append((url_id, source, directive_id, value))
+            
+            # Insert canonical URL from HTML head
+            if prepared['canonical_url']:
+                canonical_url_id = await get_or_create_canonical_url_id(prepared['canonical_url'], base_domain, conn, now=now)
+                canonical_rows.append((url_id, canonical_url_id))
+                pending_canonicals.setdefault(url_id, canonical_url_id)
+            
+            # Process hreflang URLs from HTML head
+            for hreflang_lang, normalized_hreflang_url in prepared['hreflang_urls']:
+                # Get or create hreflang language ID
+                hreflang_lang_id = hreflang_ids[hreflang_lang]
                 
-                await conn.commit()
-                break  # Success, exit retry loop
+                # Get or create target URL ID (classify as network since it's from hreflang)
+                target_url_id = await get_or_create_url_id(normalized_hreflang_url, base_domain, crawl_db_path, conn, is_from_hreflang=True, now=now)
                 
-        except aiosqlite.OperationalError as e:
-            if "database is locked" in str(e) and attempt < 2:
-                import asyncio
-                await asyncio.sleep(0.1 * (attempt + 1))  # Exponential backoff
-                continue
-            raise
+                hreflang_rows.append((url_id, hreflang_lang_id, target_url_id))
+            
+            # Calculate indexability
+            html_meta_allows = prepared['html_meta_allows']
+            http_header_allows = prepared['http_header_allows']
+            
+            # Store robots.txt directives if any
+            robots_txt_directives = []
+            if not robots_txt_allows:
+                robots_txt_directives.append('disallow')
+            
+            # Check if URL is self-canonical (an earlier stored canonical wins over this batch's)
+            await cur.execute("SELECT canonical_url_id FROM canonical_urls WHERE url_id = ?", (url_id,))
+            canonical_row = await cur.fetchone()
+            if not canonical_row and url_id in pending_canonicals:
+                canonical_row = (pending_canonicals[url_id],)
+            is_self_canonical = canonical_row and canonical_row[0] == url_id
+            
+            # Get initial status code from page_metadata table in crawl database
+            await cur.execute("SELECT initial_status_code FROM page_metadata WHERE url_id = ?", (url_id,))
+            page_row = await cur.fetchone()
+            initial_status_code = page_row[0] if page_row else None
+            
+            # Calculate overall indexability: only true if initial_status=200, self canonical, and no restrictions
+            overall_indexable = (
+                initial_status_code == 200 and 
+                is_self_canonical and 
+                robots_txt_allows and 
+                html_meta_allows and 
+                http_header_allows
+            )
+            
+            # Insert/update indexability summary
+            await cur.execute(
+                """
+                INSERT INTO indexability(url_id, robots_txt_allows, html_meta_allows, http_header_allows, 
+                                       robots_txt_directives, html_meta_directives, http_header_directives, overall_indexable)
+                VALUES (?,?,?,?,?,?,?,?)
+                ON CONFLICT(url_id) DO UPDATE SET
+                  robots_txt_allows=excluded.robots_txt_allows,
+                  html_meta_allows=excluded.html_meta_allows,
+                  http_header_allows=excluded.http_header_allows,
+                  robots_txt_directives=excluded.robots_txt_directives,
+                  html_meta_directives=excluded.html_meta_directives,
+                  http_header_directives=excluded.http_header_directives,
+                  overall_indexable=excluded.overall_indexable
+                """,
+                (
+                    url_id,
+                    robots_txt_allows,
+                    html_meta_allows,
+                    http_header_allows,
+                    _json_dumps(robots_txt_directives),
+                    prepared['html_meta_directives'],
+                    prepared['http_header_directives'],
+                    overall_indexable
+                )
+            )
+            
+            # Process schema data if present - use new normalized structure
+            if content_info.get('schema_data'):
+                # Use the new normalized schema storage with existing connection
+                await create_page_schema_references_with_conn(url_id, content_info['schema_data'], conn, crawl_db_path, now=now)
+        
+        await cur.executemany(
+            """
+            INSERT OR IGNORE INTO robots_directives(url_id, source, directive_id, value)
+            VALUES (?, ?, ?, ?)
+            """,
+            robots_rows
+        )
+        await cur.executemany(
+            """
+            INSERT OR IGNORE INTO canonical_urls(url_id, canonical_url_id, source)
+            VALUES (?, ?, 'html_head')
+            """,
+            canonical_rows
+        )
+        await cur.executemany(
+            """
+            INSERT OR IGNORE INTO hreflang_html_head(url_id, hreflang_id, href_url_id)
+            VALUES (?, ?, ?)
+            """,
+            hreflang_rows
+        )
+        await cur.close()
+        await conn.commit()
+        await checkpoint_every(conn, crawl_db_path)
 
 async def batch_write_internal_links(links_data: List[Tuple[str, list, str]], crawl_db_path: str):
-    """Write internal links data with normalized references and URL components."""
+    """Write internal links data with normalized references and URL components.
+    
+    Raw link text is staged into a TEMP table per batch and resolved to anchor, xpath,
+    fragment and target IDs with set-based statements instead of per-link lookups.
+    """
     if not links_data:
         return
     
     # Retry logic for database locks
     for attempt in range(3):
         try:
-            async with aiosqlite.connect(crawl_db_path, timeout=30.0) as conn:
+            async with _connection(crawl_db_path) as conn:
+                await conn.execute(SQL_CREATE_STAGE_LINKS)
+                await conn.execute("DELETE FROM stage_links")
+                now = int(time.time())
+                
+                # Look up every source page in one pass; pages that were never stored are skipped
+                source_url_ids = await _lookup_url_ids(list(dict.fromkeys(source_url for source_url, _, _ in links_data)), conn)
+                
+                # Resolve every href URL in the batch with one bulk call per base domain
+                hrefs_by_domain: Dict[str, List[str]] = {}
+                for source_url, detailed_links, base_domain in links_data:
+                    if source_url in source_url_ids:
+                        hrefs_by_domain.setdefault(base_domain, []).extend(
+                            _fix_protocol_relative(link_info['url']) for link_info in detailed_links
+                        )
+                href_url_ids: Dict[str, int] = {}
+                for base_domain, hrefs in hrefs_by_domain.items():
+                    href_url_ids.update(await get_or_create_url_ids(hrefs, base_domain, conn, now=now))
+                
+                # Classify every link target once per base domain for the link counts
+                targets_by_domain: Dict[str, List[str]] = {}
                 for source_url, detailed_links, base_domain in links_data:
-                    # Get source URL ID
-                    cursor = await conn.execute("SELECT id FROM urls WHERE url = ?", (source_url,))
-                    row = await cursor.fetchone()
-                    if not row:
+                    if source_url in source_url_ids:
+                        targets_by_domain.setdefault(base_domain, []).extend(link_info['url'] for link_info in detailed_links)
+                classifications_by_domain = {
+                    base_domain: dict(zip(targets, classify_urls_bulk(targets, base_domain)))
+                    for base_domain, targets in targets_by_domain.items()
+                }
+                
+                stage_rows = []
+                link_count_rows = []
+                for source_url, detailed_links, base_domain in links_data:
+                    source_url_id = source_url_ids.get(source_url)
+                    if not source_url_id:
                         continue
                     
-                    source_url_id = row[0]
-                    now = int(time.time())
-                    
                     # Count internal vs external links
                     internal_count = 0
                     external_count = 0
@@ -1896,67 +2226,25 @@ async def batch_write_internal_links(links_data: List[Tuple[str, list, str]], cr
                         # Parse URL components from original href
                         url_components = parse_url_components(href_original, source_url)
                         
-                        # Get or create normalized IDs
-                        anchor_text_id = await get_or_create_anchor_text_id(link_info['anchor_text'], conn)
-                        xpath_id = await get_or_create_xpath_id(link_info['xpath'], conn)
-                        
-                        # Extract fragment from original href
-                        from urllib.parse import urlparse
-                        parsed_original = urlparse(original_href)
-                        fragment_id = await get_or_create_fragment_id(parsed_original.fragment, conn)
-                        
-                        # Store NORMALIZED href URL (without fragment) for crawling
-                        href_url_id = await get_or_create_href_url_id(target_url, base_domain, conn)
-                        
-                        # Try to get NORMALIZED target URL ID (for crawling)
-                        target_url_id = None
-                        if target_url:
-                            cursor = await conn.execute("SELECT id FROM urls WHERE url = ?", (target_url,))
-                            row = await cursor.fetchone()
-                            if row:
-                                target_url_id = row[0]
-                        
-                        # Create a unique key for this link to prevent duplicates within this batch
+                        # Text columns map one-to-one onto the IDs resolved later, so they key duplicates too
                         link_key = (
                             source_url_id,
-                            target_url_id,
-                            anchor_text_id,
-                            xpath_id,
-                            href_url_id,
-                            fragment_id,
-                            link_info.get('parameters', url_components['url_parameters'])
+                            target_url or None,  # Normalized URL for crawling, resolved to an ID in SQL
+                            link_info['anchor_text'],
+                            link_info['xpath'],
+                            href_url_ids[_fix_protocol_relative(target_url)],  # Normalized href URL (without fragment)
+                            urlparse(original_href).fragment or None,
+                            link_info.get('parameters', url_components['url_parameters'])  # Use new parameters if available
                         )
                         
                         # Skip if we've already seen this exact link in this batch
                         if link_key in seen_links:
                             continue
                         seen_links.add(link_key)
+                        stage_rows.append(link_key + (now,))
                         
                         # Classify the link using normalized URL
-                        classification = classify_url(target_url, base_domain)
-                        
-                        # Store ALL links from internal pages in internal_links table
-                        # This allows us to see all links from internal pages, including those with image alt text
-                        # that point to external URLs
-                        await conn.execute(
-                            """
-                            INSERT OR IGNORE INTO internal_links(
-                                source_url_id, target_url_id, anchor_text_id, xpath_id, href_url_id,
-                                fragment_id, url_parameters, discovered_at
-                            )
-                            VALUES (?,?,?,?,?,?,?,?)
-                            """,
-                            (
-                                source_url_id,
-                                target_url_id,  # Normalized URL ID for crawling
-                                anchor_text_id,
-                                xpath_id,
-                                href_url_id,    # Original href URL ID for analysis
-                                fragment_id,    # Fragment ID reference
-                                link_info.get('parameters', url_components['url_parameters']),  # Use new parameters if available
-                                now
-                            )
-                        )
+                        classification = classifications_by_domain[base_domain][target_url]
                         
                         # Count internal vs external for statistics (use normalized URLs)
                         if classification == 'internal':
@@ -1966,162 +2254,120 @@ async def batch_write_internal_links(links_data: List[Tuple[str, list, str]], cr
                             external_count += 1
                             external_unique.add(target_url)
                     
-                    # Update content table with link counts
-                    await conn.execute(
-                        """
-                        UPDATE content 
-                        SET internal_links_count = ?, 
-                            external_links_count = ?,
-                            internal_links_unique_count = ?,
-                            external_links_unique_count = ?
-                        WHERE url_id = ?
-                        """,
-                        (
-                            internal_count,
-                            external_count,
-                            len(internal_unique),
-                            len(external_unique),
-                            source_url_id
-                        )
-                    )
-        
+                    link_count_rows.append((
+                        internal_count,
+                        external_count,
+                        len(internal_unique),
+                        len(external_unique),
+                        source_url_id
+                    ))
+                
+                # ALL links from internal pages are stored, including those pointing to external URLs
+                await conn.executemany(SQL_STAGE_LINK, stage_rows)
+                
+                # Update content table with link counts
+                await conn.executemany(
+                    """
+                    UPDATE content 
+                    SET internal_links_count = ?, 
+                        external_links_count = ?,
+                        internal_links_unique_count = ?,
+                        external_links_unique_count = ?
+                    WHERE url_id = ?
+                    """,
+                    link_count_rows
+                )
+                
+                # Create the lookup rows the staged links need, then insert the links in one pass
+                for sql in SQL_RESOLVE_STAGED_LINKS:
+                    await conn.execute(sql)
+                await conn.execute("DELETE FROM stage_links")
                 await conn.commit()
+                await checkpoint_every(conn, crawl_db_path)
                 break  # Success, exit retry loop
                 
         except aiosqlite.OperationalError as e:
             if "database is locked" in str(e) and attempt < 2:
-                import asyncio
                 await asyncio.sleep(0.1 * (attempt + 1))  # Exponential backoff
                 continue
             raise
 
+@dataclass
+class LookupCache:
+    """Per-batch value -> ID caches for the normalised lookup tables.
+    
+    Each table's dict is an LRU bounded by max_entries, so one instance can be threaded
+    through a whole batch without growing with it.
+    """
+    max_entries: int = 10_000
+    anchor: Dict[str, int] = field(default_factory=dict)
+    xpath: Dict[str, int] = field(default_factory=dict)
+    fragment: Dict[Optional[str], Optional[int]] = field(default_factory=dict)
+    hreflang: Dict[str, int] = field(default_factory=dict)
+    html_lang: Dict[str, int] = field(default_factory=dict)
+    meta_desc: Dict[str, int] = field(default_factory=dict)
+    robots: Dict[str, int] = field(default_factory=dict)
+    
+    async def get(self, kind: str, value, get_or_create, *args):
+        """Return the ID for value from the kind cache, calling get_or_create(value, *args) on a miss."""
+        cache = getattr(self, kind)
+        if value in cache:
+            # Move to the most recently used end
+            cache[value] = cache.pop(value)
+            return cache[value]
+        value_id = await get_or_create(value, *args)
+        if len(cache) >= self.max_entries:
+            del cache[next(iter(cache))]
+        cache[value] = value_id
+        return value_id
+
 async def get_or_create_anchor_text_id(anchor_text: str, conn: aiosqlite.Connection) -> int:
     """Get or create anchor text ID."""
-    cursor = await conn.execute("SELECT id FROM anchor_texts WHERE text = ?", (anchor_text,))
-    row = await cursor.fetchone()
-    if row:
-        return row[0]
-    
-    cursor = await conn.execute("INSERT INTO anchor_texts (text) VALUES (?)", (anchor_text,))
-    return cursor.lastrowid
+    cursor = await conn.execute(SQL_GET_OR_CREATE_LOOKUP['anchor_texts'], (anchor_text,))
+    return (await cursor.fetchone())[0]
 
 async def get_or_create_fragment_id(fragment: str, conn: aiosqlite.Connection) -> int:
     """Get or create fragment ID in the fragments table."""
     if not fragment:
         return None
     
-    cursor = await conn.execute("SELECT id FROM fragments WHERE fragment = ?", (fragment,))
-    row = await cursor.fetchone()
-    if row:
-        return row[0]
-    
-    cursor = await conn.execute("INSERT INTO fragments (fragment) VALUES (?)", (fragment,))
-    return cursor.lastrowid
+    cursor = await conn.execute(SQL_GET_OR_CREATE_LOOKUP['fragments'], (fragment,))
+    return (await cursor.fetchone())[0]
 
 async def get_or_create_xpath_id(xpath: str, conn: aiosqlite.Connection) -> int:
     """Get or create xpath ID."""
-    cursor = await conn.execute("SELECT id FROM xpaths WHERE xpath = ?", (xpath,))
-    row = await cursor.fetchone()
-    if row:
-        return row[0]
-    
-    cursor = await conn.execute("INSERT INTO xpaths (xpath) VALUES (?)", (xpath,))
-    return cursor.lastrowid
+    cursor = await conn.execute(SQL_GET_OR_CREATE_LOOKUP['xpaths'], (xpath,))
+    return (await cursor.fetchone())[0]
 
-async def get_or_create_href_url_id(href: str, base_domain: str, conn: aiosqlite.Connection) -> int:
+async def get_or_create_href_url_id(href: str, base_domain: str, conn: aiosqlite.Connection, now: Optional[int] = None) -> int:
     """Get or create href URL ID in the urls table."""
-    import time
-    
     # Normalize protocol-relative URLs
-    normalized_href = href
-    if href.startswith('//'):
-        # Convert protocol-relative URL to use the same protocol as the base domain
-        from urllib.parse import urlparse
-        if base_domain:
-            # Use the base domain's protocol
-            base_protocol = 'https'  # Default to https for modern sites
-            normalized_href = f"{base_protocol}:{href}"
-        else:
-            # Fallback to https
-            normalized_href = f"https:{href}"
-    
-    # First try to get existing URL ID
-    cursor = await conn.execute("SELECT id FROM urls WHERE url = ?", (normalized_href,))
-    row = await cursor.fetchone()
-    if row:
-        return row[0]
-    
-    # If not found, create new URL entry
-    classification = classify_url(normalized_href, base_domain)
-    now = int(time.time())
-    cursor = await conn.execute(
-        "INSERT INTO urls (url, classification, first_seen, last_seen) VALUES (?, ?, ?, ?)",
-        (normalized_href, classification, now, now)
-    )
-    return cursor.lastrowid
+    normalized_url = _fix_protocol_relative(href)
+    return await _get_or_create_url_row(conn, normalized_url, base_domain, now=now)
 
-async def get_or_create_canonical_url_id(canonical_url: str, base_domain: str, conn: aiosqlite.Connection) -> int:
+async def get_or_create_canonical_url_id(canonical_url: str, base_domain: str, conn: aiosqlite.Connection, now: Optional[int] = None) -> int:
     """Get or create canonical URL ID in the urls table."""
-    import time
-    
     # Normalize protocol-relative URLs
-    normalized_canonical_url = canonical_url
-    if canonical_url.startswith('//'):
-        # Convert protocol-relative URL to use the same protocol as the base domain
-        from urllib.parse import urlparse
-        if base_domain:
-            # Use the base domain's protocol
-            base_protocol = 'https'  # Default to https for modern sites
-            normalized_canonical_url = f"{base_protocol}:{canonical_url}"
-        else:
-            # Fallback to https
-            normalized_canonical_url = f"https:{canonical_url}"
-    
-    # First try to get existing URL ID
-    cursor = await conn.execute("SELECT id FROM urls WHERE url = ?", (normalized_canonical_url,))
-    row = await cursor.fetchone()
-    if row:
-        return row[0]
-    
-    # If not found, create new URL entry
-    classification = classify_url(normalized_canonical_url, base_domain)
-    now = int(time.time())
-    cursor = await conn.execute(
-        "INSERT INTO urls (url, classification, first_seen, last_seen) VALUES (?, ?, ?, ?)",
-        (normalized_canonical_url, classification, now, now)
-    )
-    return cursor.lastrowid
+    normalized_url = _fix_protocol_relative(canonical_url)
+    return await _get_or_create_url_row(conn, normalized_url, base_domain, now=now)
 
 async def get_or_create_robots_directive_id(directive: str, conn: aiosqlite.Connection) -> int:
     """Get or create robots directive ID."""
-    cursor = await conn.execute("SELECT id FROM robots_directive_strings WHERE directive = ?", (directive,))
-    row = await cursor.fetchone()
-    if row:
-        return row[0]
-    
-    cursor = await conn.execute("INSERT INTO robots_directive_strings (directive) VALUES (?)", (directive,))
-    return cursor.lastrowid
+    cursor = await conn.execute(SQL_GET_OR_CREATE_LOOKUP['robots_directive_strings'], (directive,))
+    return (await cursor.fetchone())[0]
 
-def parse_url_components(href: str, base_url: str) -> dict:
-    """Parse URL into components: href (without fragment/params), fragment, parameters."""
-    from urllib.parse import urlparse, urljoin, parse_qs, urlunparse
+@lru_cache(maxsize=65536)
+def _split_href(href: str) -> Tuple[str, bool, Optional[str], Optional[str]]:
+    """Split an href into (href without fragment/params, is_absolute, fragment, parameters).
     
-    # Parse the original href
+    Cached because the same navigation hrefs repeat on nearly every page of a site.
+    """
     parsed_href = urlparse(href)
-    is_absolute = bool(parsed_href.netloc)
     
     # Create href without fragment and parameters
     clean_href = urlunparse((parsed_href.scheme, parsed_href.netloc, parsed_href.path, 
                            parsed_href.params, '', ''))
     
-    # If relative, try to resolve to absolute
-    if not is_absolute:
-        try:
-            resolved = urljoin(base_url, clean_href)
-            clean_href = resolved
-        except:
-            pass  # Keep original if resolution fails
-    
     # Extract fragment and parameters (only if present)
     url_fragment = parsed_href.fragment if parsed_href.fragment else None
     url_parameters = None
@@ -2130,6 +2376,20 @@ def parse_url_components(href: str, base_url: str) -> dict:
         params = parse_qs(parsed_href.query)
         url_parameters = "&".join([f"{k}={v[0]}" for k, v in params.items()])
     
+    return clean_href, bool(parsed_href.netloc), url_fragment, url_parameters
+
+def parse_url_components(href: str, base_url: str) -> dict:
+    """Parse URL into components: href (without fragment/params), fragment, parameters."""
+    clean_href, is_absolute, url_fragment, url_parameters = _split_href(href)
+    
+    # If relative, try to resolve to absolute
+    if not is_absolute:
+        try:
+            resolved = urljoin(base_url, clean_href)
+            clean_href = resolved
+        except:
+            pass  # Keep original if resolution fails
+    
     return {
         'href': clean_href,
         'url_fragment': url_fragment,
@@ -2142,101 +2402,124 @@ async def get_or_create_meta_description_id(description: str, conn: aiosqlite.Co
     if not description:
         return None
     
-    cursor = await conn.execute("SELECT id FROM meta_descriptions WHERE description = ?", (description,))
-    row = await cursor.fetchone()
-    if row:
-        return row[0]
-    
-    # Create new meta description
-    cursor = await conn.execute("INSERT INTO meta_descriptions(description) VALUES (?)", (description,))
-    return cursor.lastrowid
+    cursor = await conn.execute(SQL_GET_OR_CREATE_LOOKUP['meta_descriptions'], (description,))
+    return (await cursor.fetchone())[0]
 
 async def get_or_create_html_language_id(language_code: str, conn: aiosqlite.Connection) -> int:
     """Get or create HTML language ID."""
     if not language_code:
         return None
     
-    cursor = await conn.execute("SELECT id FROM html_languages WHERE language_code = ?", (language_code,))
-    row = await cursor.fetchone()
-    if row:
-        return row[0]
-    
-    # Create new language code
-    cursor = await conn.execute("INSERT INTO html_languages(language_code) VALUES (?)", (language_code,))
-    return cursor.lastrowid
+    cursor = await conn.execute(SQL_GET_OR_CREATE_LOOKUP['html_languages'], (language_code,))
+    return (await cursor.fetchone())[0]
 
 async def get_or_create_hreflang_language_id(language_code: str, conn: aiosqlite.Connection) -> int:
     """Get or create hreflang language ID."""
-    cursor = await conn.execute("SELECT id FROM hreflang_languages WHERE language_code = ?", (language_code,))
-    row = await cursor.fetchone()
-    if row:
-        return row[0]
-    
-    # Create new language code
-    cursor = await conn.execute("INSERT INTO hreflang_languages(language_code) VALUES (?)", (language_code,))
-    return cursor.lastrowid
+    cursor = await conn.execute(SQL_GET_OR_CREATE_LOOKUP['hreflang_languages'], (language_code,))
+    return (await cursor.fetchone())[0]
+
+# Status codes worth retrying:
+_RETRY_STATUS_CODES = frozenset([
+    0,  # Connection/timeout errors
+    *range(500, 600),  # Server errors (500, 502, 503, 504, 507, 508, etc.)
+    # Temporary client issues worth retrying:
+    408,  # Request Timeout (server might be slow)
+    423,  # Locked (resource temporarily locked)
+    429,  # Too Many Requests (rate limited)
+    420,  # Enhance Your Calm (Twitter rate limiting)
+    451,  # Unavailable For Legal Reasons (might be temporary geo-blocking)
+])
 
 def should_retry_status_code(status_code: int) -> bool:
     """Determine if a status code should be retried."""
-    # Status codes worth retrying:
-    # 0 = connection/timeout errors
-    # 5xx = server errors (500, 502, 503, 504, 507, 508, etc.)
-    # Some 4xx codes that might be temporary
-    
-    if status_code == 0:
-        return True  # Connection/timeout errors
-    elif 500 <= status_code < 600:
-        return True  # Server errors (500, 502, 503, 504, 507, 508, etc.)
-    elif status_code in [408, 423, 429, 451, 420]:
-        # Temporary client issues worth retrying:
-        # 408 = Request Timeout (server might be slow)
-        # 423 = Locked (resource temporarily locked)
-        # 429 = Too Many Requests (rate limited)
-        # 420 = Enhance Your Calm (Twitter rate limiting)
-        # 451 = Unavailable For Legal Reasons (might be temporary geo-blocking)
-        return True
-    else:
-        return False  # Don't retry other 4xx client errors, 3xx redirects, 2xx success
+    # Don't retry other 4xx client errors, 3xx redirects, 2xx success
+    return status_code in _RETRY_STATUS_CODES
+
+SQL_UPSERT_FAILED_URL = """
+INSERT INTO failed_urls (url_id, status_code, failure_reason, retry_count, last_retry_at, next_retry_at, created_at)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(url_id) DO UPDATE SET
+  status_code = excluded.status_code,
+  failure_reason = excluded.failure_reason,
+  retry_count = excluded.retry_count,
+  last_retry_at = excluded.last_retry_at,
+  next_retry_at = excluded.next_retry_at
+"""
 
-async def record_failed_url(url_id: int, status_code: int, failure_reason: str, conn: aiosqlite.Connection, retry_delay: float = 1.0, backoff_factor: float = 2.0):
-    """Record a failed URL for potential retry."""
-    import time
-    
-    now = int(time.time())
+async def record_failed_urls(failures: List[Tuple[int, int, str]], conn: aiosqlite.Connection, retry_delay: float = 1.0, backoff_factor: float = 2.0, now: Optional[int] = None):
+    """Record many (url_id, status_code, failure_reason) failures for retry in one statement batch (caller commits)."""
+    if not failures:
+        return
     
-    # Check if this URL is already in failed_urls
-    cursor = await conn.execute("SELECT retry_count FROM failed_urls WHERE url_id = ?", (url_id,))
-    row = await cursor.fetchone()
+    if now is None:
+        now = int(time.time())
     
-    if row:
-        # Update existing failed URL
-        retry_count = row[0] + 1
-        next_retry_delay = retry_delay * (backoff_factor ** retry_count)
-        next_retry_at = now + int(next_retry_delay)
-        
-        await conn.execute(
-            """
-            UPDATE failed_urls 
-            SET status_code = ?, failure_reason = ?, retry_count = ?, 
-                last_retry_at = ?, next_retry_at = ?
-            WHERE url_id = ?
-            """,
-            (status_code, failure_reason, retry_count, now, next_retry_at, url_id)
+    # Current retry counts for URLs that have failed before
+    url_ids = list(dict.fromkeys(url_id for url_id, _, _ in failures))
+    retry_counts = {}
+    for chunk in _power_of_two_chunks(url_ids, 256):
+        cursor = await conn.execute(
+            f"SELECT url_id, retry_count FROM failed_urls WHERE url_id IN ({','.join('?' * len(chunk))})", chunk
         )
-    else:
-        # Insert new failed URL
-        next_retry_at = now + int(retry_delay)
-        await conn.execute(
-            """
-            INSERT INTO failed_urls (url_id, status_code, failure_reason, retry_count, last_retry_at, next_retry_at, created_at)
-            VALUES (?, ?, ?, 0, ?, ?, ?)
-            """,
-            (url_id, status_code, failure_reason, now, next_retry_at, now)
+        retry_counts.update(await cursor.fetchall())
+    
+    # Apply the failures in order so a URL failing twice in one batch counts twice
+    rows = {}
+    for url_id, status_code, failure_reason in failures:
+        if url_id in retry_counts:
+            retry_count = retry_counts[url_id] + 1
+            next_retry_at = now + int(retry_delay * (backoff_factor ** retry_count))
+        else:
+            retry_count = 0
+            next_retry_at = now + int(retry_delay)
+        retry_counts[url_id] = retry_count
+        rows[url_id] = (url_id, status_code, failure_reason, retry_count, now, next_retry_at, now)
+    
+    await conn.executemany(SQL_UPSERT_FAILED_URL, list(rows.values()))
+
+async def record_failed_url(url_id: int, status_code: int, failure_reason: str, conn: aiosqlite.Connection, retry_delay: float = 1.0, backoff_factor: float = 2.0):
+    """Record a failed URL for potential retry."""
+    await record_failed_urls([(url_id, status_code, failure_reason)], conn, retry_delay, backoff_factor)
+
+@dataclass
+class FailureBuffer:
+    """Failed fetches held back so they reach failed_urls in one flush.
+    
+    Call flush() once due() says the buffer is full or its oldest failure is
+    older than max_age seconds, and once more when the crawl ends.
+    """
+    retry_delay: float = 1.0
+    backoff_factor: float = 2.0
+    max_pending: int = 100
+    max_age: float = 5.0
+    pending: List[Tuple[int, int, str]] = field(default_factory=list)
+    first_added: float = 0.0
+    
+    def add(self, url_id: int, status_code: int, failure_reason: str):
+        if not self.pending:
+            self.first_added = time.monotonic()
+        self.pending.append((url_id, status_code, failure_reason))
+    
+    def due(self) -> bool:
+        return bool(self.pending) and (
+            len(self.pending) >= self.max_pending or time.monotonic() - self.first_added >= self.max_age
         )
+    
+    async def flush(self, conn: aiosqlite.Connection):
+        """Write and commit the buffered failures on conn; if either fails they stay buffered."""
+        pending, first_added = self.pending, self.first_added
+        self.pending = []
+        try:
+            await record_failed_urls(pending, conn, self.retry_delay, self.backoff_factor)
+            await conn.commit()
+        except BaseException:
+            # Put the batch back ahead of anything added while it was being written
+            self.pending = pending + self.pending
+            self.first_added = first_added
+            raise
 
 async def get_urls_ready_for_retry(conn: aiosqlite.Connection, max_retries: int = 3) -> list[tuple[int, str]]:
     """Get URLs that are ready for retry (next_retry_at <= now and retry_count < max_retries)."""
-    import time
     
     now = int(time.time())
     cursor = await conn.execute(
@@ -2255,39 +2538,57 @@ async def remove_failed_url(url_id: int, conn: aiosqlite.Connection):
     """Remove a URL from the failed_urls table (when it succeeds)."""
     await conn.execute("DELETE FROM failed_urls WHERE url_id = ?", (url_id,))
 
+# Totals (kind 0), counts by status code (1) and by retry count (2) in one round trip
+SQL_RETRY_STATISTICS = """
+SELECT 0, NULL, COUNT(*), COALESCE(SUM(next_retry_at <= ?), 0) FROM failed_urls
+UNION ALL
+SELECT 1, status_code, COUNT(*), NULL FROM failed_urls GROUP BY status_code
+UNION ALL
+SELECT 2, retry_count, COUNT(*), NULL FROM failed_urls GROUP BY retry_count
+ORDER BY 1, 2
+"""
+
+def _retry_statistics_from_rows(rows) -> dict:
+    """Build the get_retry_statistics dict from SQL_RETRY_STATISTICS-shaped rows."""
+    stats = {'total_failed': 0, 'by_status': {}, 'by_retry_count': {}, 'ready_for_retry': 0}
+    for kind, value, count, ready in rows:
+        if kind == 0:
+            stats['total_failed'] = count
+            stats['ready_for_retry'] = ready
+        elif kind == 1:
+            stats['by_status'][value] = count
+        else:
+            stats['by_retry_count'][value] = count
+    return stats
+
 async def get_retry_statistics(conn: aiosqlite.Connection) -> dict:
     """Get comprehensive retry statistics."""
-    import time
-    stats = {}
-    
-    # Total failed URLs
-    cursor = await conn.execute("SELECT COUNT(*) FROM failed_urls")
-    stats['total_failed'] = (await cursor.fetchone())[0]
-    
-    # Failed URLs by status code
-    cursor = await conn.execute("SELECT status_code, COUNT(*) FROM failed_urls GROUP BY status_code ORDER BY status_code")
-    stats['by_status'] = dict(await cursor.fetchall())
-    
-    # Failed URLs by retry count
-    cursor = await conn.execute("SELECT retry_count, COUNT(*) FROM failed_urls GROUP BY retry_count ORDER BY retry_count")
-    stats['by_retry_count'] = dict(await cursor.fetchall())
-    
-    # URLs ready for retry
-    cursor = await conn.execute("SELECT COUNT(*) FROM failed_urls WHERE next_retry_at <= ?", (int(time.time()),))
-    stats['ready_for_retry'] = (await cursor.fetchone())[0]
-    
-    return stats
+    cursor = await conn.execute(SQL_RETRY_STATISTICS, (int(time.time()),))
+    return _retry_statistics_from_rows(await cursor.fetchall())
+
+def expand_duplicate_pairs(url_ids: Iterable[int]):
+    """Yield (url1_id, url2_id) pairs with url1_id < url2_id for one duplicate group."""
+    ordered = sorted(url_ids)
+    for i, first in enumerate(ordered):
+        for second in ordered[i + 1:]:
+            yield first, second
+
+async def iter_exact_duplicate_pairs(crawl_db_path: str = CRAWL_DB_PATH):
+    """Yield (content_hash_sha256, url1_id, url2_id) from view_exact_duplicate_groups, one group at a time."""
+    async with _connection(crawl_db_path) as db:
+        async with db.execute("SELECT content_hash_sha256, dup_ids FROM view_exact_duplicate_groups") as cursor:
+            async for content_hash, dup_ids in cursor:
+                for url1_id, url2_id in expand_duplicate_pairs(json.loads(dup_ids)):
+                    yield content_hash, url1_id, url2_id
 
 async def get_crawl_status(crawl_db_path: str) -> dict:
     """Get comprehensive crawl status information."""
-    async with aiosqlite.connect(crawl_db_path) as db:
-        cursor = await db.execute("SELECT * FROM crawl_status LIMIT 1")
+    async with _read_connection(crawl_db_path) as db:
+        cursor = await db.execute("SELECT * FROM view_crawl_summary")
+        # Named rows on this cursor only; the connection may be shared through DBPool
+        cursor.row_factory = aiosqlite.Row
         result = await cursor.fetchone()
-        
-        if result:
-            columns = [description[0] for description in cursor.description]
-            return dict(zip(columns, result))
-        return {}
+        return dict(result) if result else {}
 
 async def print_crawl_status(crawl_db_path: str):
     """Print a formatted crawl status report."""
@@ -2340,216 +2641,204 @@ async def print_crawl_status(crawl_db_path: str):
     
     print("="*80)
 
+SQL_INSERT_OTHER_URL = """
+INSERT OR IGNORE INTO urls(url, kind, classification, first_seen, last_seen)
+VALUES (?, 'other', ?, ?, ?)
+"""
+
+async def _get_or_create_other_url_ids(urls: Iterable[str], classify, conn: aiosqlite.Connection, now: int) -> Dict[str, int]:
+    """Map URLs to IDs, inserting the missing ones as kind 'other' classified by classify(url)."""
+    unique_urls = list(dict.fromkeys(urls))
+    url_ids = await _lookup_url_ids(unique_urls, conn)
+    missing = [url for url in unique_urls if url not in url_ids]
+    if missing:
+        await conn.executemany(SQL_INSERT_OTHER_URL, [(url, classify(url), now, now) for url in missing])
+        url_ids.update(await _lookup_url_ids(missing, conn))
+    return url_ids
+
 async def batch_write_hreflang_sitemap_data(hreflang_data: List[Tuple[str, str, str]], crawl_db_path: str, base_domain: str = None):
     """Write hreflang data from sitemaps to the normalized database structure."""
     if not hreflang_data:
         return
     
-    async with aiosqlite.connect(crawl_db_path) as conn:
-        for url, hreflang, href_url in hreflang_data:
-            # Normalize protocol-relative URLs
-            normalized_href_url = href_url
-            if href_url.startswith('//'):
-                # Convert protocol-relative URL to use the same protocol as the base domain
-                from urllib.parse import urlparse
-                if base_domain:
-                    # Use the base domain's protocol
-                    base_protocol = 'https'  # Default to https for modern sites
-                    normalized_href_url = f"{base_protocol}:{href_url}"
-                else:
-                    # Fallback to https
-                    normalized_href_url = f"https:{href_url}"
-            
-            # Get source URL ID
-            cursor = await conn.execute("SELECT id FROM urls WHERE url = ?", (url,))
-            source_row = await cursor.fetchone()
-            if not source_row:
-                continue
-            
-            source_url_id = source_row[0]
-            
-            # Get target URL ID (create if doesn't exist)
-            cursor = await conn.execute("SELECT id FROM urls WHERE url = ?", (normalized_href_url,))
-            target_row = await cursor.fetchone()
-            if not target_row:
-                # Create the target URL if it doesn't exist
-                from urllib.parse import urlparse
-                parsed = urlparse(normalized_href_url)
-                href_domain = parsed.netloc
-                # Use the original crawl domain for classification, not the hreflang URL's domain
-                crawl_domain = base_domain or href_domain
-                # Classify as network since it's from sitemap hreflang data
-                classification = classify_url(normalized_href_url, crawl_domain, is_from_hreflang=True)
-                await conn.execute(
-                    """
-                    INSERT INTO urls(url, kind, classification, first_seen, last_seen)
-                    VALUES (?, 'other', ?, ?, ?)
-                    """,
-                    (normalized_href_url, classification, int(__import__('time').time()), int(__import__('time').time()))
-                )
-                await conn.commit()
-                
-                # Get the newly created URL ID
-                cursor = await conn.execute("SELECT id FROM urls WHERE url = ?", (normalized_href_url,))
-                target_row = await cursor.fetchone()
-                if not target_row:
-                    continue
-            
-            target_url_id = target_row[0]
-            
-            # Get or create hreflang language ID
-            hreflang_id = await get_or_create_hreflang_language_id(hreflang, conn)
-            
-            # Insert hreflang sitemap data
-            await conn.execute(
-                """
-                INSERT OR IGNORE INTO hreflang_sitemap(url_id, hreflang_id, href_url_id)
-                VALUES (?,?,?)
-                """,
-                (source_url_id, hreflang_id, target_url_id)
-            )
+    def classify_hreflang_target(href_url: str) -> str:
+        # Use the original crawl domain for classification, not the hreflang URL's domain,
+        # and classify as network since it's from sitemap hreflang data
+        crawl_domain = base_domain or urlparse(href_url).netloc
+        return classify_url(href_url, crawl_domain, is_from_hreflang=True)
+    
+    async with _connection(crawl_db_path) as conn:
+        now = int(time.time())
+        
+        # Normalize protocol-relative URLs
+        rows = [(url, hreflang, _fix_protocol_relative(href_url)) for url, hreflang, href_url in hreflang_data]
+        
+        # Resolve sources, targets (created if missing) and language codes once for the batch
+        source_ids = await _lookup_url_ids(list(dict.fromkeys(url for url, _, _ in rows)), conn)
+        target_ids = await _get_or_create_other_url_ids(
+            (href_url for url, _, href_url in rows if url in source_ids), classify_hreflang_target, conn, now
+        )
+        hreflang_ids = await bulk_get_or_create_ids(
+            'hreflang_languages', 'language_code', (hreflang for url, hreflang, _ in rows if url in source_ids), conn
+        )
+        
+        # Insert hreflang sitemap data
+        await conn.executemany(
+            """
+            INSERT OR IGNORE INTO hreflang_sitemap(url_id, hreflang_id, href_url_id)
+            VALUES (?,?,?)
+            """,
+            [
+                (source_ids[url], hreflang_ids[hreflang], target_ids[href_url])
+                for url, hreflang, href_url in rows
+                if url in source_ids and href_url in target_ids
+            ]
+        )
         
         await conn.commit()
+        await checkpoint_every(conn, crawl_db_path)
+
+SQL_UPSERT_SITEMAP = """
+INSERT INTO sitemaps (sitemap_url, discovered_at, last_crawled_at, total_urls_found) VALUES (?, ?, ?, ?)
+ON CONFLICT(sitemap_url) DO UPDATE SET
+  total_urls_found = excluded.total_urls_found,
+  last_crawled_at = excluded.last_crawled_at
+RETURNING id
+"""
 
 async def batch_write_sitemaps_and_urls(sitemap_data: List[Tuple[str, List[Tuple[str, int]]]], crawl_db_path: str):
     """Write sitemap records and URL-sitemap relationships."""
     if not sitemap_data:
         return
     
-    async with aiosqlite.connect(crawl_db_path) as conn:
+    async with _connection(crawl_db_path) as conn:
         now = int(time.time())
         
-        for sitemap_url, url_positions in sitemap_data:
-            # Insert or get sitemap ID
-            cursor = await conn.execute(
-                "INSERT OR IGNORE INTO sitemaps (sitemap_url, discovered_at, last_crawled_at, total_urls_found) VALUES (?, ?, ?, ?)",
-                (sitemap_url, now, now, len(url_positions))
-            )
-            
-            # Get sitemap ID
-            cursor = await conn.execute("SELECT id FROM sitemaps WHERE sitemap_url = ?", (sitemap_url,))
-            sitemap_row = await cursor.fetchone()
-            if not sitemap_row:
-                continue
-            sitemap_id = sitemap_row[0]
-            
-            # Update total URLs found
-            await conn.execute(
-                "UPDATE sitemaps SET total_urls_found = ?, last_crawled_at = ? WHERE id = ?",
-                (len(url_positions), now, sitemap_id)
-            )
-            
-            # Insert URL-sitemap relationships
-            for url, position in url_positions:
-                # Get URL ID
-                cursor = await conn.execute("SELECT id FROM urls WHERE url = ?", (url,))
-                url_row = await cursor.fetchone()
-                if not url_row:
-                    continue
-                
-                url_id = url_row[0]
-                
-                # Insert URL-sitemap relationship
-                await conn.execute(
-                    """
-                    INSERT OR IGNORE INTO url_sitemaps(url_id, sitemap_id, position, discovered_at)
-                    VALUES (?,?,?,?)
-                    """,
-                    (url_id, sitemap_id, position, now)
-                )
+        # Resolve every listed URL once for the batch
+        url_ids = await _lookup_url_ids(
+            list(dict.fromkeys(url for _, url_positions in sitemap_data for url, _ in url_positions)), conn
+        )
+        
+        # A sitemap listed more than once is written once, with its last URL count
+        url_counts = {sitemap_url: len(url_positions) for sitemap_url, url_positions in sitemap_data}
+        sitemap_ids = {}
+        for sitemap_url, url_count in url_counts.items():
+            # Insert the sitemap, or refresh its URL count and crawl time, and get its ID
+            cursor = await conn.execute(SQL_UPSERT_SITEMAP, (sitemap_url, now, now, url_count))
+            sitemap_ids[sitemap_url] = (await cursor.fetchone())[0]
+        
+        # URL-sitemap relationships for URLs already stored
+        url_sitemap_rows = [
+            (url_ids[url], sitemap_ids[sitemap_url], position, now)
+            for sitemap_url, url_positions in sitemap_data
+            for url, position in url_positions
+            if url in url_ids
+        ]
+        
+        # Insert URL-sitemap relationships
+        await conn.executemany(
+            """
+            INSERT OR IGNORE INTO url_sitemaps(url_id, sitemap_id, position, discovered_at)
+            VALUES (?,?,?,?)
+            """,
+            url_sitemap_rows
+        )
         
         await conn.commit()
+        await checkpoint_every(conn, crawl_db_path)
 
 async def batch_write_redirects(redirect_data: List[Tuple[str, str, str, int, int]], crawl_db_path: str):
     """Write redirect chain data to the database."""
     if not redirect_data:
         return
     
-    async with aiosqlite.connect(crawl_db_path) as conn:
+    async with _connection(crawl_db_path) as conn:
         now = int(time.time())
-        for source_url, target_url, redirect_chain_json, chain_length, final_status in redirect_data:
-            # Get source URL ID
-            cursor = await conn.execute("SELECT id FROM urls WHERE url = ?", (source_url,))
-            source_row = await cursor.fetchone()
-            if not source_row:
-                continue
-            
-            source_url_id = source_row[0]
-            
-            # Get target URL ID (create if doesn't exist)
-            cursor = await conn.execute("SELECT id FROM urls WHERE url = ?", (target_url,))
-            target_row = await cursor.fetchone()
-            if not target_row:
-                # Create the target URL if it doesn't exist
-                from urllib.parse import urlparse
-                parsed = urlparse(target_url)
-                base_domain = parsed.netloc
-                classification = classify_url(target_url, base_domain)
-                await conn.execute(
-                    """
-                    INSERT INTO urls(url, kind, classification, first_seen, last_seen)
-                    VALUES (?, 'other', ?, ?, ?)
-                    """,
-                    (target_url, classification, now, now)
-                )
-                await conn.commit()
-                
-                # Get the newly created URL ID
-                cursor = await conn.execute("SELECT id FROM urls WHERE url = ?", (target_url,))
-                target_row = await cursor.fetchone()
-                if not target_row:
-                    continue
-            
-            target_url_id = target_row[0]
-            
-            # Insert redirect record
-            await conn.execute(
-                """
-                INSERT OR REPLACE INTO redirects(source_url_id, target_url_id, redirect_chain, chain_length, final_status, discovered_at)
-                VALUES (?,?,?,?,?,?)
-                """,
-                (source_url_id, target_url_id, redirect_chain_json, chain_length, final_status, now)
-            )
+        
+        # Resolve sources, and targets (created if missing, classified against their own host), once for the batch
+        source_ids = await _lookup_url_ids(list(dict.fromkeys(row[0] for row in redirect_data)), conn)
+        target_ids = await _get_or_create_other_url_ids(
+            (target_url for source_url, target_url, _, _, _ in redirect_data if source_url in source_ids),
+            lambda target_url: classify_url(target_url, urlparse(target_url).netloc),
+            conn, now
+        )
+        
+        # Insert redirect records
+        await conn.executemany(
+            """
+            INSERT OR REPLACE INTO redirects(source_url_id, target_url_id, redirect_chain, chain_length, final_status, discovered_at)
+            VALUES (?,?,?,?,?,?)
+            """,
+            [
+                (source_ids[source_url], target_ids[target_url], redirect_chain_json, chain_length, final_status, now)
+                for source_url, target_url, redirect_chain_json, chain_length, final_status in redirect_data
+                if source_url in source_ids and target_url in target_ids
+            ]
+        )
         
         await conn.commit()
+        await checkpoint_every(conn, crawl_db_path)
 
 # Helper function for get_or_create_url_id with connection
-async def get_or_create_url_id_with_conn(url: str, base_domain: str, db_path: str, conn: aiosqlite.Connection, discovered_from: str = None, is_from_hreflang: bool = False) -> int:
+SQL_UPSERT_DISCOVERED_URL = """
+INSERT INTO urls (url, classification, discovered_from_id, first_seen, last_seen) 
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(url) DO UPDATE SET
+  classification=excluded.classification,
+  discovered_from_id=COALESCE(urls.discovered_from_id, excluded.discovered_from_id),
+  last_seen=excluded.last_seen
+RETURNING id
+"""
+
+async def get_or_create_url_id_with_conn(url: str, base_domain: str, db_path: str, conn: aiosqlite.Connection, discovered_from: str = None, is_from_hreflang: bool = False, now: Optional[int] = None) -> int:
     """Get URL ID, creating the URL record if it doesn't exist (with existing connection)."""
     # Try to get existing URL ID
-    cursor = await conn.execute("SELECT id FROM urls WHERE url = ?", (url,))
+    cursor = await conn.execute(SQL_LOOKUP_URL_ID, (url,))
     row = await cursor.fetchone()
     if row:
         return row[0]
     
-    # Get discovered_from_id if provided
+    if now is None:
+        now = int(time.time())
+    
+    # Get discovered_from_id if provided (the parent is stored without a parent of its own)
     discovered_from_id = None
     if discovered_from:
-        discovered_from_id = await get_or_create_url_id_with_conn(discovered_from, base_domain, db_path, conn)
+        discovered_from_id = (await get_or_create_url_ids([discovered_from], base_domain, conn, now=now))[discovered_from]
     
-    # Classify the URL
-    classification = classify_url(url, base_domain, is_from_hreflang=is_from_hreflang)
-    
-    # Create new URL record
+    # Create the URL record and get its ID (either newly created or existing)
     cursor = await conn.execute(
-        """
-        INSERT INTO urls (url, classification, discovered_from_id, first_seen, last_seen) 
-        VALUES (?, ?, ?, ?, ?)
-        ON CONFLICT(url) DO UPDATE SET
-          classification=excluded.classification,
-          discovered_from_id=COALESCE(urls.discovered_from_id, excluded.discovered_from_id),
-          last_seen=excluded.last_seen
-        """,
-        (url, classification, discovered_from_id, int(time.time()), int(time.time()))
+        SQL_UPSERT_DISCOVERED_URL,
+        (url, classify_url(url, base_domain, is_from_hreflang=is_from_hreflang), discovered_from_id, now, now)
     )
-    
-    # Get the URL ID (either newly created or existing)
-    cursor = await conn.execute("SELECT id FROM urls WHERE url = ?", (url,))
-    row = await cursor.fetchone()
-    return row[0]
+    return (await cursor.fetchone())[0]
 
 # ------------------ frontier scoring ------------------
 
+# URL hints by content type
+_HTML_HINTS = ('/home', '/index', '/main', '/')  # Important page types
+_PRODUCT_HINTS = ('/product', '/item', '/game', '/article', '/news')
+_LISTING_HINTS = ('/category', '/section', '/page')
+_SEARCH_HINTS = ('/search', '/filter', '/sort')
+_API_HINTS = ('/api', '/ajax', '/json')
+_IMAGE_HINTS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg')
+_ASSET_HINTS = ('.css', '.js', '.pdf', '.doc', '.zip')
+
+def _hints_regex(hints: Tuple[str, ...]) -> re.Pattern:
+    """Compile URL hints into one alternation that matches if any hint is a substring."""
+    return re.compile("|".join(map(re.escape, hints)))
+
+# Checked in priority order; the first category that matches sets the score
+_CONTENT_TYPE_URL_SCORES = (
+    (_hints_regex(_HTML_HINTS), 1.0),
+    (_hints_regex(_PRODUCT_HINTS), 0.9),
+    (_hints_regex(_LISTING_HINTS), 0.8),
+    (_hints_regex(_SEARCH_HINTS), 0.6),
+    (_hints_regex(_API_HINTS), 0.3),
+    (_hints_regex(_IMAGE_HINTS), 0.2),
+    (_hints_regex(_ASSET_HINTS), 0.1),
+)
+
 def calculate_content_type_score(url: str, content_type: str = None) -> float:
     """Calculate content type priority score for URL."""
     # Higher scores = higher priority
@@ -2558,26 +2847,12 @@ def calculate_content_type_score(url: str, content_type: str = None) -> float:
     if content_type and 'html' in content_type.lower():
         return 1.0
     
-    # Check URL patterns for content type hints
+    # Check URL patterns for content type hints; the first matching category wins
     url_lower = url.lower()
-    
-    # Important page types
-    if any(pattern in url_lower for pattern in ['/home', '/index', '/main', '/']):
-        return 1.0
-    elif any(pattern in url_lower for pattern in ['/product', '/item', '/game', '/article', '/news']):
-        return 0.9
-    elif any(pattern in url_lower for pattern in ['/category', '/section', '/page']):
-        return 0.8
-    elif any(pattern in url_lower for pattern in ['/search', '/filter', '/sort']):
-        return 0.6
-    elif any(pattern in url_lower for pattern in ['/api', '/ajax', '/json']):
-        return 0.3
-    elif any(pattern in url_lower for pattern in ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg']):
-        return 0.2
-    elif any(pattern in url_lower for pattern in ['.css', '.js', '.pdf', '.doc', '.zip']):
-        return 0.1
-    else:
-        return 0.7  # Default for unknown content types
+    for pattern, score in _CONTENT_TYPE_URL_SCORES:
+        if pattern.search(url_lower):
+            return score
+    return 0.7  # Default for unknown content types
 
 def calculate_depth_score(depth: int) -> float:
     """Calculate depth-based priority score."""
@@ -2625,40 +2900,74 @@ def calculate_priority_score(url: str, depth: int, sitemap_priority: float = Non
     
     return depth_score + sitemap_score + inlinks_score + content_score
 
+def calculate_priority_scores_batch(urls: List[str], depths: List[int], sitemap_priorities: List[Optional[float]] = None,
+                                    inlinks_counts: List[int] = None, content_types: List[Optional[str]] = None,
+                                    content_type_scores: List[float] = None) -> List[float]:
+    """Calculate calculate_priority_score for many URLs at once (vectorized with NumPy when available).
+    
+    Callers that already hold calculate_content_type_score results can pass them as content_type_scores.
+    """
+    n = len(urls)
+    sitemap_priorities = sitemap_priorities or [None] * n
+    inlinks_counts = inlinks_counts or [0] * n
+    content_types = content_types or [None] * n
+    if not NUMPY_AVAILABLE:
+        return [
+            calculate_priority_score(url, depth, sitemap_priority, inlinks_count, content_type)
+            for url, depth, sitemap_priority, inlinks_count, content_type
+            in zip(urls, depths, sitemap_priorities, inlinks_counts, content_types)
+        ]
+    
+    d = np.asarray(depths, dtype=np.int64)
+    depth_scores = np.select([d == 0, d == 1, d == 2, d == 3, d <= 5], [1.0, 0.9, 0.8, 0.7, 0.6], default=0.5)
+    sitemap_scores = np.clip(
+        np.array([0.5 if p is None else p for p in sitemap_priorities], dtype=np.float64), 0.1, 1.0
+    )
+    c = np.asarray(inlinks_counts, dtype=np.int64)
+    inlinks_scores = np.select([c == 0, c <= 5, c <= 20, c <= 100], [0.5, 0.6, 0.8, 0.9], default=1.0)
+    if content_type_scores is not None:
+        content_scores = np.asarray(content_type_scores, dtype=np.float64)
+    else:
+        # URL hints are regex scans, which NumPy cannot speed up
+        content_scores = np.fromiter(
+            (calculate_content_type_score(url, content_type) for url, content_type in zip(urls, content_types)),
+            dtype=np.float64, count=n
+        )
+    # Same weights and summation order as calculate_priority_score, so results match it exactly
+    return (depth_scores * 0.3 + sitemap_scores * 0.3 + inlinks_scores * 0.2 + content_scores * 0.2).tolist()
+
 # ------------------ frontier (pause/resume) ------------------
 
 async def frontier_seed(start: str, base_domain: str, reset: bool = False, db_path: str = CRAWL_DB_PATH, 
                        sitemap_priority: float = None, depth: int = 0):
-    now = int(time.time())
-    
-    # Get URL ID for start URL
-    start_url_id = await get_or_create_url_id(start, base_domain, db_path)
-    
     # Calculate priority score
     priority_score = calculate_priority_score(start, depth, sitemap_priority)
     content_type_score = calculate_content_type_score(start)
     
-    async with aiosqlite.connect(db_path) as db:
+    async with _connection(db_path) as db:
+        await begin_immediate(db)
+        now = int(time.time())
+        
+        # Get URL ID for start URL in the same transaction as the frontier write
+        start_url_id = await get_or_create_url_id(start, base_domain, db_path, conn=db, now=now)
+        
         if reset:
             await db.execute("DELETE FROM frontier")
             # After reset, always add the start URL
             await db.execute(
-                """INSERT OR IGNORE INTO frontier(url_id, depth, parent_id, status, enqueued_at, updated_at, 
-                   priority_score, sitemap_priority, content_type_score) VALUES (?,?,?,?,?,?,?,?,?)""",
+                SQL_INSERT_FRONTIER_SCORED,
                 (start_url_id, depth, None, 'queued', now, now, priority_score, sitemap_priority or 0.5, content_type_score),
             )
         else:
             # For non-reset calls (like sitemap URLs), always try to add
             await db.execute(
-                """INSERT OR IGNORE INTO frontier(url_id, depth, parent_id, status, enqueued_at, updated_at, 
-                   priority_score, sitemap_priority, content_type_score) VALUES (?,?,?,?,?,?,?,?,?)""",
+                SQL_INSERT_FRONTIER_SCORED,
                 (start_url_id, depth, None, 'queued', now, now, priority_score, sitemap_priority or 0.5, content_type_score),
             )
         await db.commit()
 
 async def frontier_next_batch(limit: int, db_path: str = CRAWL_DB_PATH) -> List[Tuple[str, int, Optional[str]]]:
-    async with aiosqlite.connect(db_path) as db:
-        await optimize_connection(db)
+    async with _read_connection(db_path) as db:
         cur = await db.execute(
             """
             SELECT f.url_id, f.depth, f.parent_id, u.url, p.url as parent_url, f.priority_score
@@ -2674,80 +2983,69 @@ async def frontier_next_batch(limit: int, db_path: str = CRAWL_DB_PATH) -> List[
         rows = await cur.fetchall()
         return [(r[3], r[1], r[4]) for r in rows]  # (url, depth, parent_url)
 
+async def _write_crawl_batch(db_path: str, write_rows) -> None:
+    """Run write_rows(conn) in one BEGIN IMMEDIATE transaction and commit it."""
+    async with _connection(db_path) as db:
+        await begin_immediate(db)
+        await write_rows(db)
+        await db.commit()
+        await checkpoint_every(db, db_path)
+
 async def frontier_mark_done(urls: Iterable[str], base_domain: str, db_path: str = CRAWL_DB_PATH):
-    now = int(time.time())
+    """Mark URLs done, resolving their IDs and updating the frontier in one transaction."""
+    urls = list(urls)
     
-    # Get URL IDs for the URLs to mark done
-    url_ids = []
-    for url in urls:
-        url_id = await get_or_create_url_id(url, base_domain, db_path)
-        url_ids.append(url_id)
-    
-    async with aiosqlite.connect(db_path) as db:
+    async def write_rows(db: aiosqlite.Connection):
+        now = int(time.time())
+        url_ids = await get_or_create_url_ids(urls, base_domain, db, now=now)
         await db.executemany(
-            "UPDATE frontier SET status='done', updated_at=? WHERE url_id=?",
-            [(now, url_id) for url_id in url_ids],
+            SQL_MARK_FRONTIER_DONE,
+            [(now, url_id) for url_id in url_ids.values()],
         )
-        await db.commit()
+    
+    await _write_crawl_batch(db_path, write_rows)
 
 async def frontier_enqueue_many(children: Iterable[Tuple[str, int, Optional[str]]], base_domain: str, db_path: str = CRAWL_DB_PATH):
-    now = int(time.time())
+    children = list(children)
+    if not children:
+        return
     
-    # Convert URLs to IDs and calculate priority scores
-    children_with_scores = []
-    for (url, depth, parent_url) in children:
-        url_id = await get_or_create_url_id(url, base_domain, db_path)
-        parent_id = await get_or_create_url_id(parent_url, base_domain, db_path) if parent_url else None
-        
-        # Calculate priority score for this URL
-        priority_score = calculate_priority_score(url, depth)
-        content_type_score = calculate_content_type_score(url)
-        
-        children_with_scores.append((url_id, depth, parent_id, priority_score, content_type_score))
+    # Score the whole batch in one pass
+    urls = [url for (url, _, _) in children]
+    depths = [depth for (_, depth, _) in children]
+    content_type_scores = [calculate_content_type_score(url) for url in urls]
+    priority_scores = calculate_priority_scores_batch(urls, depths, content_type_scores=content_type_scores)
     
-    async with aiosqlite.connect(db_path) as db:
-        await db.executemany(
-            """
-        INSERT OR IGNORE INTO frontier(url_id, depth, parent_id, status, enqueued_at, updated_at, 
-                                      priority_score, sitemap_priority, content_type_score)
-        VALUES (?,?,?,?,?,?,?,?,?)
-        """,
-            [(url_id, d, p_id, 'queued', now, now, priority_score, 0.5, content_type_score) 
-             for (url_id, d, p_id, priority_score, content_type_score) in children_with_scores],
+    async def write_rows(db: aiosqlite.Connection):
+        now = int(time.time())
+        # Resolve every child and parent URL in one set-based pass
+        url_ids = await get_or_create_url_ids(
+            urls + [parent_url for (_, _, parent_url) in children if parent_url],
+            base_domain, db, now=now,
         )
-        await db.commit()
+        await multi_insert(
+            db,
+            SQL_INSERT_FRONTIER_SCORED,
+            [(url_ids[url], depth, url_ids.get(parent_url) if parent_url else None, 'queued', now, now,
+              priority_score, 0.5, content_type_score)
+             for (url, depth, parent_url), priority_score, content_type_score
+             in zip(children, priority_scores, content_type_scores)],
+        )
+    
+    await _write_crawl_batch(db_path, write_rows)
 
 async def frontier_update_priority_scores(db_path: str = CRAWL_DB_PATH):
     """Update priority scores for all queued URLs based on current inlinks count."""
-    async with aiosqlite.connect(db_path) as db:
-        # Get inlinks count for each URL
-        cur = await db.execute("""
-            SELECT f.url_id, f.depth, f.sitemap_priority, f.content_type_score, u.url,
-                   COALESCE(COUNT(il.target_url_id), 0) as inlinks_count
-            FROM frontier f
-            JOIN urls u ON f.url_id = u.id
-            LEFT JOIN internal_links il ON f.url_id = il.target_url_id
-            WHERE f.status = 'queued'
-            GROUP BY f.url_id, f.depth, f.sitemap_priority, f.content_type_score, u.url
-        """)
-        rows = await cur.fetchall()
-        
-        # Update priority scores
-        for row in rows:
-            url_id, depth, sitemap_priority, content_type_score, url, inlinks_count = row
-            priority_score = calculate_priority_score(url, depth, sitemap_priority, inlinks_count)
-            
-            await db.execute("""
-                UPDATE frontier 
-                SET priority_score = ?, inlinks_count = ?
-                WHERE url_id = ?
-            """, (priority_score, inlinks_count, url_id))
-        
+    async with _connection(db_path) as db:
+        await begin_immediate(db)
+        # Score inside SQLite so the queued rows never round-trip through Python
+        await db.create_function("priority_score", 4, calculate_priority_score, deterministic=True)
+        await db.execute(SQL_UPDATE_FRONTIER_PRIORITY)
         await db.commit()
 
 async def frontier_scoring_stats(db_path: str = CRAWL_DB_PATH) -> Dict:
     """Return frontier scoring statistics."""
-    async with aiosqlite.connect(db_path) as db:
+    async with _read_connection(db_path) as db:
         cur = await db.execute("""
             SELECT 
                 AVG(priority_score) as avg_priority,
@@ -2771,213 +3069,99 @@ async def frontier_scoring_stats(db_path: str = CRAWL_DB_PATH) -> Dict:
 
 async def frontier_stats(db_path: str = CRAWL_DB_PATH) -> Tuple[int, int]:
     """Return (#queued, #done)."""
-    async with aiosqlite.connect(db_path) as db:
-        cur = await db.execute("SELECT SUM(status='queued'), SUM(status='done') FROM frontier")
-        row = await cur.fetchone()
-        return (int(row[0] or 0), int(row[1] or 0))
+    async with _read_connection(db_path) as db:
+        # Counted from idx_frontier_status instead of scanning the table
+        cur = await db.execute(SQL_FRONTIER_STATUS_COUNTS)
+        counts = dict(await cur.fetchall())
+        return (counts.get('queued', 0), counts.get('done', 0))
 
 
 # ------------------ Schema.org functions ------------------
 
-async def get_or_create_schema_instance(schema_data: Dict[str, Any], conn: aiosqlite.Connection, db_path: str = CRAWL_DB_PATH) -> int:
+async def get_or_create_schema_instance(schema_data: Dict[str, Any], conn: aiosqlite.Connection, db_path: str = CRAWL_DB_PATH, now: Optional[int] = None) -> int:
     """Get or create a schema instance and return its ID."""
     content_hash = schema_data.get('content_hash', '')
     if not content_hash:
         # If no hash provided, create one
-        from .schema import create_schema_content_hash
         parsed_data_str = schema_data.get('parsed_data', '{}')
         if parsed_data_str is None:
             parsed_data_str = '{}'
         parsed_data = json.loads(parsed_data_str)
         content_hash = create_schema_content_hash(parsed_data)
     
-    if conn:
-        # Use existing connection
-        cur = await conn.execute(
-            "SELECT id FROM schema_instances WHERE content_hash = ?",
-            (content_hash,)
-        )
-        existing = await cur.fetchone()
-        
-        if existing:
-            return existing[0]
-        
-        # Create new instance
-        schema_type_id = await get_or_create_schema_type_id(db_path, schema_data['type'], conn)
-        
-        # Default format if not specified
-        format_type = schema_data.get('format', 'json-ld')
-        if format_type not in ['json-ld', 'microdata', 'rdfa']:
-            format_type = 'json-ld'  # Default to json-ld
-        
-        await conn.execute("""
-            INSERT INTO schema_instances 
-            (content_hash, schema_type_id, format, raw_data, parsed_data, is_valid, validation_errors, severity, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            content_hash,
-            schema_type_id,
-            format_type,
-            schema_data.get('raw_data', ''),
-            schema_data.get('parsed_data'),
-            schema_data.get('is_valid', True),
-            json.dumps(schema_data.get('validation_errors', [])),
-            schema_data.get('severity', 'info'),
-            int(time.time())
-        ))
-        
-        # Get the new instance ID
-        cur = await conn.execute(
-            "SELECT id FROM schema_instances WHERE content_hash = ?",
-            (content_hash,)
-        )
-        result = await cur.fetchone()
-        return result[0]
-    else:
+    if not conn:
         # Create new connection
-        async with aiosqlite.connect(db_path) as db:
-            # Check if instance already exists
-            cur = await db.execute(
-                "SELECT id FROM schema_instances WHERE content_hash = ?",
-                (content_hash,)
-            )
-            existing = await cur.fetchone()
-            
-            if existing:
-                return existing[0]
-            
-            # Create new instance
-            schema_type_id = await get_or_create_schema_type_id(db_path, schema_data['type'], db)
-            
-            await db.execute("""
-                INSERT INTO schema_instances 
-                (content_hash, schema_type_id, format, raw_data, parsed_data, is_valid, validation_errors, severity, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                content_hash,
-                schema_type_id,
-                schema_data['format'],
-                schema_data['raw_data'],
-                schema_data.get('parsed_data'),
-                schema_data.get('is_valid', True),
-                json.dumps(schema_data.get('validation_errors', [])),
-                schema_data.get('severity', 'info'),
-                int(time.time())
-            ))
-            
+        async with _connection(db_path) as db:
+            await begin_immediate(db)
+            instance_id = await get_or_create_schema_instance(schema_data, db, db_path, now=now)
             await db.commit()
-            
-            # Get the new instance ID
-            cur = await db.execute(
-                "SELECT id FROM schema_instances WHERE content_hash = ?",
-                (content_hash,)
-            )
-            result = await cur.fetchone()
-            return result[0]
-
-
-async def create_page_schema_references_with_conn(url_id: int, schema_items: List[Dict[str, Any]], conn: aiosqlite.Connection, crawl_db_path: str) -> None:
+            return instance_id
+    
+    # Most hashes repeat across pages, and a plain lookup leaves their rows untouched
+    cur = await conn.execute(SQL_LOOKUP_SCHEMA_INSTANCE, (content_hash,))
+    existing = await cur.fetchone()
+    if existing:
+        return existing[0]
+    
+    # Create new instance
+    schema_type_id = await get_or_create_schema_type_id(db_path, schema_data['type'], conn)
+    
+    # Default format if not specified
+    format_type = schema_data.get('format', 'json-ld')
+    if format_type not in ['json-ld', 'microdata', 'rdfa']:
+        format_type = 'json-ld'  # Default to json-ld
+    
+    cur = await conn.execute(SQL_UPSERT_SCHEMA_INSTANCE, (
+        content_hash,
+        schema_type_id,
+        format_type,
+        schema_data.get('raw_data', ''),
+        schema_data.get('parsed_data'),
+        schema_data.get('is_valid', True),
+        _json_dumps(schema_data.get('validation_errors', [])),
+        schema_data.get('severity', 'info'),
+        now if now is not None else int(time.time())
+    ))
+    return (await cur.fetchone())[0]
+
+
+async def create_page_schema_references_with_conn(url_id: int, schema_items: List[Dict[str, Any]], conn: aiosqlite.Connection, crawl_db_path: str, now: Optional[int] = None) -> None:
     """Create page schema references with hierarchical relationships using existing connection."""
-    from .schema import identify_schema_relationships
-    
     # Identify relationships
     relationships = identify_schema_relationships(schema_items)
     main_entity = relationships['main_entity']
     properties = relationships['properties']
     related_entities = relationships['related_entities']
     
-    now = int(time.time())
+    if now is None:
+        now = int(time.time())
     
     # Create reference for main entity
     if main_entity:
-        main_instance_id = await get_or_create_schema_instance(main_entity, conn, crawl_db_path)
-        await conn.execute("""
-            INSERT INTO page_schema_references 
-            (url_id, schema_instance_id, position, is_main_entity, discovered_at)
-            VALUES (?, ?, ?, ?, ?)
-        """, (url_id, main_instance_id, main_entity.get('position', 0), True, now))
-        
-        # Get the last inserted row ID
-        cursor = await conn.execute("SELECT last_insert_rowid()")
+        main_instance_id = await get_or_create_schema_instance(main_entity, conn, crawl_db_path, now=now)
+        cursor = await conn.execute(SQL_INSERT_PAGE_SCHEMA_MAIN_REFERENCE, (url_id, main_instance_id, main_entity.get('position', 0), True, now))
         main_ref_id = (await cursor.fetchone())[0]
         
         # Create references for properties (linked to main entity)
+        prop_rows = []
         for prop in properties:
-            prop_instance_id = await get_or_create_schema_instance(prop, conn, crawl_db_path)
-            await conn.execute("""
-                INSERT INTO page_schema_references 
-                (url_id, schema_instance_id, position, property_name, is_main_entity, parent_entity_id, discovered_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
-                url_id, 
-                prop_instance_id, 
-                prop.get('position', 0), 
-                prop.get('type', '').lower(), 
-                False, 
-                main_ref_id, 
-                now
-            ))
+            prop_instance_id = await get_or_create_schema_instance(prop, conn, crawl_db_path, now=now)
+            prop_rows.append((url_id, prop_instance_id, prop.get('position', 0), prop.get('type', '').lower(), False, main_ref_id, now))
+        await multi_insert(conn, SQL_INSERT_PAGE_SCHEMA_PROPERTY_REFERENCE, prop_rows)
     
     # Create references for related entities (standalone)
+    entity_rows = []
     for entity in related_entities:
-        entity_instance_id = await get_or_create_schema_instance(entity, conn, crawl_db_path)
-        await conn.execute("""
-            INSERT INTO page_schema_references 
-            (url_id, schema_instance_id, position, is_main_entity, discovered_at)
-            VALUES (?, ?, ?, ?, ?)
-        """, (url_id, entity_instance_id, entity.get('position', 0), False, now))
+        entity_instance_id = await get_or_create_schema_instance(entity, conn, crawl_db_path, now=now)
+        entity_rows.append((url_id, entity_instance_id, entity.get('position', 0), False, now))
+    await multi_insert(conn, SQL_INSERT_PAGE_SCHEMA_REFERENCE, entity_rows)
 
 
-async def create_page_schema_references(url_id: int, schema_items: List[Dict[str, Any]], db_path: str = CRAWL_DB_PATH) -> None:
+async def create_page_schema_references(url_id: int, schema_items: List[Dict[str, Any]], db_path: str = CRAWL_DB_PATH, now: Optional[int] = None) -> None:
     """Create page schema references with hierarchical relationships."""
-    from .schema import identify_schema_relationships
-    
-    # Identify relationships
-    relationships = identify_schema_relationships(schema_items)
-    main_entity = relationships['main_entity']
-    properties = relationships['properties']
-    related_entities = relationships['related_entities']
-    
-    async with aiosqlite.connect(db_path) as db:
-        now = int(time.time())
-        
-        # Create reference for main entity
-        if main_entity:
-            main_instance_id = await get_or_create_schema_instance(main_entity, db_path, db)
-            await db.execute("""
-                INSERT INTO page_schema_references 
-                (url_id, schema_instance_id, position, is_main_entity, discovered_at)
-                VALUES (?, ?, ?, ?, ?)
-            """, (url_id, main_instance_id, main_entity.get('position', 0), True, now))
-            
-            main_ref_id = db.lastrowid
-            
-            # Create references for properties (linked to main entity)
-            for prop in properties:
-                prop_instance_id = await get_or_create_schema_instance(prop, db_path, db)
-                await db.execute("""
-                    INSERT INTO page_schema_references 
-                    (url_id, schema_instance_id, position, property_name, is_main_entity, parent_entity_id, discovered_at)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    url_id, 
-                    prop_instance_id, 
-                    prop.get('position', 0), 
-                    prop.get('type', '').lower(), 
-                    False, 
-                    main_ref_id, 
-                    now
-                ))
-        
-        # Create references for related entities (standalone)
-        for entity in related_entities:
-            entity_instance_id = await get_or_create_schema_instance(entity, db_path, db)
-            await db.execute("""
-                INSERT INTO page_schema_references 
-                (url_id, schema_instance_id, position, is_main_entity, discovered_at)
-                VALUES (?, ?, ?, ?, ?)
-            """, (url_id, entity_instance_id, entity.get('position', 0), False, now))
-        
+    async with _connection(db_path) as db:
+        await begin_immediate(db)
+        await create_page_schema_references_with_conn(url_id, schema_items, db, db_path, now=now)
         await db.commit()
 
 
@@ -2985,41 +3169,36 @@ async def get_or_create_schema_type_id(crawl_db_path: str, type_name: str, conn:
     """Get or create a schema type ID."""
     if conn:
         # Use existing connection
-        cursor = await conn.execute("SELECT id FROM schema_types WHERE type_name = ?", (type_name,))
-        result = await cursor.fetchone()
-        
-        if result:
-            return result[0]
-        
-        # Create new schema type
-        cursor = await conn.execute("INSERT INTO schema_types (type_name) VALUES (?)", (type_name,))
-        return cursor.lastrowid
-    else:
-        # Create new connection with timeout and retry
-        for attempt in range(3):
-            try:
-                async with aiosqlite.connect(crawl_db_path, timeout=30.0) as db:
-                    # Try to get existing ID
-                    cursor = await db.execute("SELECT id FROM schema_types WHERE type_name = ?", (type_name,))
-                    result = await cursor.fetchone()
-                    
-                    if result:
-                        return result[0]
-                    
-                    # Create new schema type
-                    cursor = await db.execute("INSERT INTO schema_types (type_name) VALUES (?)", (type_name,))
-                    await db.commit()
-                    return cursor.lastrowid
-            except aiosqlite.OperationalError as e:
-                if "database is locked" in str(e) and attempt < 2:
-                    import asyncio
-                    await asyncio.sleep(0.1 * (attempt + 1))  # Exponential backoff
-                    continue
-                raise
-
-
-async def batch_write_schema_data(schema_data_list: List[Dict[str, Any]], crawl_db_path: str):
-    """Write schema data to database in batch using normalized structure."""
+        cursor = await conn.execute(SQL_GET_OR_CREATE_LOOKUP['schema_types'], (type_name,))
+        return (await cursor.fetchone())[0]
+    
+    # A single upsert takes the write lock up front, so busy_timeout covers contention
+    async with _connection(crawl_db_path) as db:
+        cursor = await db.execute(SQL_GET_OR_CREATE_LOOKUP['schema_types'], (type_name,))
+        type_id = (await cursor.fetchone())[0]
+        await db.commit()
+        return type_id
+
+
+# Non-unique schema indexes that batch_write_schema_data drops in bulk mode and rebuilds
+# in one sorted pass afterwards, inside the same write transaction; UNIQUE constraints stay,
+# the upserts resolve through them
+SCHEMA_BULK_INDEXES = {
+    'idx_schema_instances_type': "CREATE INDEX IF NOT EXISTS idx_schema_instances_type ON schema_instances(schema_type_id)",
+    'idx_schema_instances_format': "CREATE INDEX IF NOT EXISTS idx_schema_instances_format ON schema_instances(format)",
+    'idx_schema_instances_valid': "CREATE INDEX IF NOT EXISTS idx_schema_instances_valid ON schema_instances(is_valid)",
+    'idx_page_schema_refs_url_id': "CREATE INDEX IF NOT EXISTS idx_page_schema_refs_url_id ON page_schema_references(url_id)",
+    'idx_page_schema_refs_instance_id': "CREATE INDEX IF NOT EXISTS idx_page_schema_refs_instance_id ON page_schema_references(schema_instance_id)",
+    'idx_page_schema_refs_main_entity': "CREATE INDEX IF NOT EXISTS idx_page_schema_refs_main_entity ON page_schema_references(is_main_entity)",
+    'idx_page_schema_refs_parent': "CREATE INDEX IF NOT EXISTS idx_page_schema_refs_parent ON page_schema_references(parent_entity_id)",
+}
+
+async def batch_write_schema_data(schema_data_list: List[Dict[str, Any]], crawl_db_path: str, bulk_mode: bool = False):
+    """Write schema data to database in batch using normalized structure.
+    
+    bulk_mode (for one-off imports) drops SCHEMA_BULK_INDEXES before the write and rebuilds
+    them after it, all in the write transaction, so a failure or kill leaves them in place.
+    """
     if not schema_data_list:
         return
     
@@ -3031,13 +3210,25 @@ async def batch_write_schema_data(schema_data_list: List[Dict[str, Any]], crawl_
             url_schemas[url] = []
         url_schemas[url].append(item)
     
-    # Process each URL's schema data
-    for url, schema_items in url_schemas.items():
-        # Get URL ID
-        async with aiosqlite.connect(crawl_db_path) as db:
-            cursor = await db.execute("SELECT id FROM urls WHERE url = ?", (url,))
-            result = await cursor.fetchone()
-            if result:
-                url_id = result[0]
-                # Use the new normalized schema storage
-                await create_page_schema_references(url_id, schema_items, crawl_db_path)
\ No newline at end of file
+    # Get URL IDs (released before writing, since a pooled connection is not re-entrant)
+    async with _read_connection(crawl_db_path) as db:
+        url_ids = await _cached_url_ids(list(url_schemas), db, crawl_db_path)
+    
+    async def write_rows(db: aiosqlite.Connection):
+        if bulk_mode:
+            for index_name in SCHEMA_BULK_INDEXES:
+                await db.execute(f"DROP INDEX IF EXISTS {index_name}")
+        
+        # Process each URL's schema data under one batch timestamp
+        now = int(time.time())
+        for url, schema_items in url_schemas.items():
+            url_id = url_ids.get(url)
+            if url_id:
+                await create_page_schema_references_with_conn(url_id, schema_items, db, crawl_db_path, now=now)
+        
+        if bulk_mode:
+            for create_sql in SCHEMA_BULK_INDEXES.values():
+                await db.execute(create_sql)
+    
+    # Use the new normalized schema storage, in one transaction for the whole batch
+    await _write_crawl_batch(crawl_db_path, write_rows)
@@ -63,10 +63,18 @@ CREATE TABLE IF NOT EXISTS content (
   content_hash_sha256 TEXT,
   content_hash_simhash TEXT,
   content_length INTEGER,
+  simhash_b0 INTEGER,
+  simhash_b1 INTEGER,
+  simhash_b2 INTEGER,
+  simhash_b3 INTEGER,
   FOREIGN KEY (url_id) REFERENCES urls (id),
   FOREIGN KEY (meta_description_id) REFERENCES meta_descriptions (id),
   FOREIGN KEY (html_lang_id) REFERENCES html_languages (id)
 );
+CREATE INDEX IF NOT EXISTS idx_content_simhash_b0 ON content(simhash_b0);
+CREATE INDEX IF NOT EXISTS idx_content_simhash_b1 ON content(simhash_b1);
+CREATE INDEX IF NOT EXISTS idx_content_simhash_b2 ON content(simhash_b2);
+CREATE INDEX IF NOT EXISTS idx_content_simhash_b3 ON content(simhash_b3);
 
 CREATE TABLE IF NOT EXISTS anchor_texts (
   id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -230,6 +238,8 @@ CREATE TABLE IF NOT EXISTS frontier (
   FOREIGN KEY (parent_id) REFERENCES urls (id),
   UNIQUE(url_id)
 );
+CREATE INDEX IF NOT EXISTS idx_frontier_status ON frontier(status);
+CREATE INDEX IF NOT EXISTS idx_frontier_queue ON frontier(priority_score DESC, enqueued_at ASC) WHERE status = 'queued';
 
 CREATE TABLE IF NOT EXISTS sitemaps (
   id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -258,11 +268,13 @@ CREATE TABLE IF NOT EXISTS failed_urls (
   status_code INTEGER NOT NULL,
   failure_reason TEXT,
   retry_count INTEGER DEFAULT 0,
+  last_retry_at INTEGER,
   next_retry_at INTEGER,
   created_at INTEGER DEFAULT (strftime('%s', 'now')),
   updated_at INTEGER DEFAULT (strftime('%s', 'now')),
   FOREIGN KEY (url_id) REFERENCES urls (id)
 );
+CREATE INDEX IF NOT EXISTS idx_failed_urls_retry ON failed_urls(next_retry_at, retry_count, url_id);
 
 CREATE TABLE IF NOT EXISTS schema_types (
   id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -371,15 +383,16 @@ async def init_pages_db(config: DatabaseConfig, pages_db_path: str = None):
             set_global_config(pages_config)
             
             async with create_connection() as conn:
-                # Apply SQLite optimizations
-                if hasattr(conn, '_optimize_connection'):
-                    await conn._optimize_connection()
-                
-                # Execute pages schema
-                for stmt in SQLITE_PAGES_SCHEMA.split(";\n"):
-                    if stmt.strip():
-                        await conn.execute(stmt)
-                await conn.commit()
+                # Execute pages schema in one transaction, so it costs one commit
+                await conn.execute("BEGIN")
+                try:
+                    for stmt in SQLITE_PAGES_SCHEMA.split(";\n"):
+                        if stmt.strip():
+                            await conn.execute(stmt)
+                    await conn.commit()
+                except Exception:
+                    await conn.execute("ROLLBACK")
+                    raise
             
             # Restore the original config
             set_global_config(config)
@@ -510,34 +523,47 @@ async def init_crawl_db(config: DatabaseConfig, crawl_db_path: str = None):
             )
             set_global_config(crawl_config)
         
+        # A new database at this path must not see IDs cached from an older one
+        from .db import clear_url_id_cache
+        clear_url_id_cache(crawl_db_path or config.sqlite_path)
+        
         async with create_connection() as conn:
-            # Apply SQLite optimizations
-            if hasattr(conn, '_optimize_connection'):
-                await conn._optimize_connection()
-            
-            # Execute crawl schema
+            # Execute crawl schema, migrations and views in one transaction, so init costs one
+            # commit instead of one per statement (sqlite3 autocommits bare DDL)
             import re
             schema_clean = re.sub(r'--.*$', '', SQLITE_CRAWL_SCHEMA, flags=re.MULTILINE)
             statements = [stmt.strip() for stmt in schema_clean.split(';') if stmt.strip()]
             
-            for stmt in statements:
-                if stmt:
-                    await conn.execute(stmt)
-            
-            # Add reset_count column if it doesn't exist (migration)
+            await conn.execute("BEGIN")
             try:
-                await conn.execute("ALTER TABLE frontier ADD COLUMN reset_count INTEGER DEFAULT 0")
-            except Exception:
-                # Column already exists, that's fine
-                pass
+                # Columns the schema's indexes rely on must exist before the statements run
+                from .db import migrate_simhash_bands, migrate_failed_urls_unique
+                await migrate_simhash_bands(conn.conn)
+                
+                for stmt in statements:
+                    if stmt:
+                        await conn.execute(stmt)
             
-            # Create database views
-            view_statements = get_sqlite_views()
-            for view_stmt in view_statements:
-                if view_stmt:
-                    await conn.execute(view_stmt)
+                # Add reset_count column if it doesn't exist (migration)
+                try:
+                    await conn.execute("ALTER TABLE frontier ADD COLUMN reset_count INTEGER DEFAULT 0")
+                except Exception:
+                    # Column already exists, that's fine
+                    pass
             
-            await conn.commit()
+                # Failed URLs are upserted on url_id (migration: add last_retry_at, keep the newest row per URL)
+                await migrate_failed_urls_unique(conn.conn)
+            
+                # Create database views
+                view_statements = get_sqlite_views()
+                for view_stmt in view_statements:
+                    if view_stmt:
+                        await conn.execute(view_stmt)
+            
+                await conn.commit()
+            except Exception:
+                await conn.execute("ROLLBACK")
+                raise
         
         # Restore the original config
         if crawl_db_path:
@@ -729,37 +755,35 @@ async def batch_get_or_create_url_ids(urls: List[str], base_domain: str, config:
             if missing_urls:
                 if len(missing_urls) > 100:
                     print(f"  Resolving {len(missing_urls)} new URLs...")
-                # Batch insert missing URLs - use executemany but optimize with chunking
-                # asyncpg's executemany uses prepared statements which is reasonably efficient
                 from .db import classify_url
                 
-                # Prepare batch data
-                insert_data = []
-                for url in missing_urls:
-                    classification = classify_url(url, base_domain)
-                    insert_data.append((url, "other", classification))
-                
-                # Use executemany with chunking for better performance
-                # Chunk size of 500 is a good balance between query size and round trips
-                chunk_size = 500
+                # One set-based insert fed by parallel arrays; DO NOTHING skips the dummy UPDATE
+                # and RETURNING hands back the new IDs without a second SELECT. Sorted so
+                # concurrent writers take the unique-index locks in the same order.
+                missing_urls = sorted(set(missing_urls))
                 insert_query = """
                     INSERT INTO urls (url, kind, classification)
-                    VALUES ($1, $2, $3)
-                    ON CONFLICT (url) DO UPDATE SET url = EXCLUDED.url
-                """
-                
-                # Process in chunks to avoid memory issues and improve throughput
-                for i in range(0, len(insert_data), chunk_size):
-                    chunk = insert_data[i:i + chunk_size]
-                    await conn.executemany(insert_query, chunk)
-                
-                # Now fetch all the IDs we just inserted/updated
-                fetch_query = """
-                    SELECT url, id FROM urls WHERE url = ANY($1::text[])
+                    SELECT * FROM unnest($1::text[], $2::text[], $3::text[])
+                    ON CONFLICT (url) DO NOTHING
+                    RETURNING id, url
                 """
-                fetch_result = await conn.fetchall(fetch_query, missing_urls)
-                for row in fetch_result:
-                    url_to_id[row[0]] = row[1]
+                inserted = await conn.fetchall(
+                    insert_query,
+                    missing_urls,
+                    ["other"] * len(missing_urls),
+                    [classify_url(url, base_domain) for url in missing_urls],
+                )
+                for row in inserted:
+                    url_to_id[row[1]] = row[0]
+                
+                # Rows inserted concurrently by another writer are not returned; fetch those
+                raced_urls = [url for url in missing_urls if url not in url_to_id]
+                if raced_urls:
+                    fetch_result = await conn.fetchall(
+                        "SELECT url, id FROM urls WHERE url = ANY($1::text[])", raced_urls
+                    )
+                    for row in fetch_result:
+                        url_to_id[row[0]] = row[1]
             
             return url_to_id
         finally:
@@ -774,26 +798,31 @@ async def batch_get_or_create_url_ids(urls: List[str], base_domain: str, config:
             conn = await conn_wrapper.__aenter__()
         
         try:
-            url_to_id = {}
             from .db import classify_url
             
-            for url in urls:
-                # Try to get existing ID
-                result = await conn.fetchone("SELECT id FROM urls WHERE url = ?", url)
-                if result:
-                    url_to_id[url] = result[0]
-                else:
-                    # Insert new URL
-                    await conn.execute(
-                        "INSERT OR IGNORE INTO urls (url, kind, classification) VALUES (?, ?, ?)",
-                        url, "other", classify_url(url, base_domain)
-                    )
-                    await conn.commit()
-                    
-                    # Get the ID
-                    result = await conn.fetchone("SELECT id FROM urls WHERE url = ?", url)
-                    if result:
-                        url_to_id[url] = result[0]
+            # Set-based: chunked IN lookups, one executemany for the missing URLs, one commit
+            unique_urls = list(dict.fromkeys(urls))
+            chunk_size = 500
+            
+            async def _lookup(batch: List[str]) -> Dict[str, int]:
+                found = {}
+                for i in range(0, len(batch), chunk_size):
+                    chunk = batch[i:i + chunk_size]
+                    placeholders = ",".join("?" * len(chunk))
+                    rows = await conn.fetchall(f"SELECT url, id FROM urls WHERE url IN ({placeholders})", *chunk)
+                    found.update((row[0], row[1]) for row in rows)
+                return found
+            
+            url_to_id = await _lookup(unique_urls)
+            missing_urls = [url for url in unique_urls if url not in url_to_id]
+            
+            if missing_urls:
+                await conn.executemany(
+                    "INSERT OR IGNORE INTO urls (url, kind, classification) VALUES (?, ?, ?)",
+                    [(url, "other", classify_url(url, base_domain)) for url in missing_urls]
+                )
+                await conn.commit()
+                url_to_id.update(await _lookup(missing_urls))
             
             return url_to_id
         finally:
@@ -1393,24 +1422,17 @@ async def frontier_stats(config: DatabaseConfig = None) -> Tuple[int, int]:
     if config is None:
         config = get_database_config()
     
-    if config.backend == "postgresql":
-        query = """
-        SELECT 
-            COUNT(*) FILTER (WHERE status = 'queued') as queued,
-            COUNT(*) FILTER (WHERE status = 'done') as done
-        FROM frontier
-        """
-    else:
-        query = """
-        SELECT 
-            SUM(CASE WHEN status = 'queued' THEN 1 ELSE 0 END) as queued,
-            SUM(CASE WHEN status = 'done' THEN 1 ELSE 0 END) as done
-        FROM frontier
-        """
+    # Counted from idx_frontier_status on both backends instead of scanning the table
+    query = """
+    SELECT status, COUNT(*)
+    FROM frontier
+    WHERE status IN ('queued', 'done')
+    GROUP BY status
+    """
     
     async with create_connection() as conn:
-        result = await conn.fetchone(query)
-        return (result[0] or 0, result[1] or 0) if result else (0, 0)
+        counts = {row[0]: row[1] for row in await conn.fetchall(query)}
+        return (counts.get('queued', 0), counts.get('done', 0))
 
 
 # Additional database operations can be added here following the same pattern
@@ -1602,7 +1624,7 @@ async def batch_write_pages(pages_data: List[Tuple], pages_db_path: str = None,
                     continue  # Skip - content extraction will update it with proper data
                 
                 try:
-                    from .robots import is_url_crawlable
+                    from .robots import robots_decision
                     import json
                     
                     # Extract directives from headers (already normalized to lowercase)
@@ -1619,13 +1641,11 @@ async def batch_write_pages(pages_data: List[Tuple], pages_db_path: str = None,
                     
                     http_header_allows = not any('noindex' in d for d in http_header_directives) if http_header_directives else True
                     
-                    robots_txt_allows = is_url_crawlable(final_norm, "SQLiteCrawler/0.2")
+                    robots_txt_allows, matching_rules = robots_decision(final_norm, "SQLiteCrawler/0.2")
                     robots_txt_directives = ['disallow'] if not robots_txt_allows else []
                     robots_txt_directives_str = json.dumps(robots_txt_directives, ensure_ascii=False)
                     
                     # Store robots.txt directives in robots_directives table
-                    from .robots import get_matching_robots_txt_rules
-                    matching_rules = get_matching_robots_txt_rules(final_norm, "SQLiteCrawler/0.2")
                     for rule_type, rule_path in matching_rules:
                         try:
                             # Get or create directive ID for the rule type
@@ -2099,6 +2119,10 @@ async def batch_write_content_with_url_resolution(content_data: List[Dict], craw
                 )
                 return insert_row[0] if insert_row else None
             
+            # Directives and hreflang codes repeat across a site's pages
+            from .db import LookupCache
+            lookups = LookupCache()
+            
             for content_tuple in content_data:
                 # content_tuple format: (final_norm, content_item, base_domain, depth)
                 final_norm, content_item, base_domain, crawl_depth = content_tuple
@@ -2174,7 +2198,7 @@ async def batch_write_content_with_url_resolution(content_data: List[Dict], craw
                 if content_item.get('html_meta_directives'):
                     for directive in content_item['html_meta_directives']:
                         try:
-                            dir_id = await get_or_create_robots_directive_id_pg(directive)
+                            dir_id = await lookups.get('robots', directive, get_or_create_robots_directive_id_pg)
                             await conn.execute(
                                 """
                                 INSERT INTO robots_directives (url_id, source, directive_id)
@@ -2193,7 +2217,7 @@ async def batch_write_content_with_url_resolution(content_data: List[Dict], craw
                 if content_item.get('http_header_directives'):
                     for directive in content_item['http_header_directives']:
                         try:
-                            dir_id = await get_or_create_robots_directive_id_pg(directive)
+                            dir_id = await lookups.get('robots', directive, get_or_create_robots_directive_id_pg)
                             await conn.execute(
                                 """
                                 INSERT INTO robots_directives (url_id, source, directive_id)
@@ -2215,23 +2239,13 @@ async def batch_write_content_with_url_resolution(content_data: List[Dict], craw
                 # ---- Canonical URL insertion (PostgreSQL) ----
                 if content_item.get('canonical_url'):
                     try:
-                        from .db import classify_url
-                        from urllib.parse import urlparse
+                        from .db import classify_url, _fix_protocol_relative
                         import time
                         
                         canonical_url = content_item['canonical_url']
                         
                         # Normalize protocol-relative URLs
-                        normalized_canonical_url = canonical_url
-                        if canonical_url.startswith('//'):
-                            # Convert protocol-relative URL to use the same protocol as the base domain
-                            if base_domain:
-                                # Use the base domain's protocol (default to https)
-                                base_protocol = 'https'
-                                normalized_canonical_url = f"{base_protocol}:{canonical_url}"
-                            else:
-                                # Fallback to https
-                                normalized_canonical_url = f"https:{canonical_url}"
+                        normalized_canonical_url = _fix_protocol_relative(canonical_url)
                         
                         # Get or create canonical URL ID
                         canonical_url_row = await conn.fetchone(
@@ -2276,8 +2290,7 @@ async def batch_write_content_with_url_resolution(content_data: List[Dict], craw
                 # ---- Hreflang HTML head (PostgreSQL) ----
                 if content_item.get('hreflang_urls'):
                     import time
-                    from urllib.parse import urlparse
-                    from .db import classify_url
+                    from .db import classify_url, _fix_protocol_relative
                     
                     for hreflang_data in content_item['hreflang_urls']:
                         hreflang_url = hreflang_data.get('url')
@@ -2285,15 +2298,9 @@ async def batch_write_content_with_url_resolution(content_data: List[Dict], craw
                         if not hreflang_url or not hreflang_lang:
                             continue
                         
-                        normalized_hreflang_url = hreflang_url
-                        if hreflang_url.startswith('//'):
-                            if base_domain:
-                                base_protocol = 'https'
-                                normalized_hreflang_url = f"{base_protocol}:{hreflang_url}"
-                            else:
-                                normalized_hreflang_url = f"https:{hreflang_url}"
+                        normalized_hreflang_url = _fix_protocol_relative(hreflang_url)
                         
-                        hreflang_id = await get_or_create_hreflang_language_id_pg(hreflang_lang)
+                        hreflang_id = await lookups.get('hreflang', hreflang_lang, get_or_create_hreflang_language_id_pg)
                         if hreflang_id is None:
                             continue
                         
@@ -2339,7 +2346,7 @@ async def batch_write_content_with_url_resolution(content_data: List[Dict], craw
 
                 # ---- Indexability (PostgreSQL) ----
                 try:
-                    from .robots import is_url_crawlable
+                    from .robots import robots_decision
 
                     html_meta_directives = content_item.get('html_meta_directives', [])
                     http_header_directives = content_item.get('http_header_directives', [])
@@ -2347,18 +2354,16 @@ async def batch_write_content_with_url_resolution(content_data: List[Dict], craw
                     html_meta_allows = not any('noindex' in d.lower() for d in html_meta_directives)
                     http_header_allows = not any('noindex' in d.lower() for d in http_header_directives)
 
-                    robots_txt_allows = is_url_crawlable(final_norm, "SQLiteCrawler/0.2")
+                    robots_txt_allows, matching_rules = robots_decision(final_norm, "SQLiteCrawler/0.2")
                     robots_txt_directives = []
                     if not robots_txt_allows:
                         robots_txt_directives.append('disallow')
                     
                     # Store robots.txt directives in robots_directives table
-                    from .robots import get_matching_robots_txt_rules
-                    matching_rules = get_matching_robots_txt_rules(final_norm, "SQLiteCrawler/0.2")
                     for rule_type, rule_path in matching_rules:
                         try:
                             # Store the rule type (disallow/allow) as the directive
-                            dir_id = await get_or_create_robots_directive_id_pg(rule_type)
+                            dir_id = await lookups.get('robots', rule_type, get_or_create_robots_directive_id_pg)
                             await conn.execute(
                                 """
                                 INSERT INTO robots_directives (url_id, source, directive_id, value)
@@ -2658,9 +2663,24 @@ async def batch_write_internal_links(links_data: List[Dict], crawl_db_path: str
             current_time = int(time.time())
             # Track link counts per source_url_id: {source_url_id: {'internal': count, 'external': count, 'internal_unique': set, 'external_unique': set}}
             link_counts = {}
-            
             from .db import classify_url
             
+            # Resolve every anchor text, xpath and fragment in the batch up front on this connection
+            anchor_keys = {}
+            xpaths = set()
+            fragments = set()
+            for _, detailed_links, _ in links_data:
+                for link_item in detailed_links:
+                    if link_item.get('anchor_text') and link_item['anchor_text'] not in anchor_keys:
+                        anchor_keys[link_item['anchor_text']] = _truncate_anchor_text(link_item['anchor_text'])
+                    if link_item.get('xpath'):
+                        xpaths.add(link_item['xpath'])
+                    if link_item.get('fragment'):
+                        fragments.add(link_item['fragment'])
+            anchor_text_ids = await _pg_bulk_get_or_create_ids(conn, 'anchor_texts', 'text', set(anchor_keys.values()))
+            xpath_ids = await _pg_bulk_get_or_create_ids(conn, 'xpaths', 'xpath', xpaths)
+            fragment_ids = await _pg_bulk_get_or_create_ids(conn, 'fragments', 'fragment', fragments)
+            
             for link_tuple in links_data:
                 # link_tuple format: (original_norm, detailed_links, base_domain)
                 original_norm, detailed_links, base_domain = link_tuple
@@ -2690,20 +2710,14 @@ async def batch_write_internal_links(links_data: List[Dict], crawl_db_path: str
                     if not href_url_id:
                         continue  # Skip if essential IDs not found
                     
-                    # Get or create anchor text ID if provided (still individual, but less frequent)
+                    # Anchor text, xpath and fragment IDs from the batch maps
                     anchor_text_id = None
                     if link_item.get('anchor_text'):
-                        anchor_text_id = await get_or_create_anchor_text_id(link_item['anchor_text'], config)
+                        anchor_text_id = anchor_text_ids.get(anchor_keys[link_item['anchor_text']])
                     
-                    # Get or create xpath ID if provided (still individual, but less frequent)
-                    xpath_id = None
-                    if link_item.get('xpath'):
-                        xpath_id = await get_or_create_xpath_id(link_item['xpath'], config)
+                    xpath_id = xpath_ids.get(link_item['xpath']) if link_item.get('xpath') else None
                     
-                    # Get or create fragment ID if provided (still individual, but less frequent)
-                    fragment_id = None
-                    if link_item.get('fragment'):
-                        fragment_id = await get_or_create_fragment_id(link_item['fragment'], config)
+                    fragment_id = fragment_ids.get(link_item['fragment']) if link_item.get('fragment') else None
                     
                     # Create a unique key for this link to prevent duplicates within this batch
                     link_key = (
@@ -2755,22 +2769,26 @@ async def batch_write_internal_links(links_data: List[Dict], crawl_db_path: str
             
             # Update content table with link counts
             if link_counts:
-                for source_url_id, counts in link_counts.items():
-                    await conn.execute(
-                        """
-                        UPDATE content 
-                        SET internal_links_count = $1, 
-                            external_links_count = $2,
-                            internal_links_unique_count = $3,
-                            external_links_unique_count = $4
-                        WHERE url_id = $5
-                        """,
-                        counts['internal'],
-                        counts['external'],
-                        len(counts['internal_unique']),
-                        len(counts['external_unique']),
-                        source_url_id
-                    )
+                await conn.executemany(
+                    """
+                    UPDATE content 
+                    SET internal_links_count = $1, 
+                        external_links_count = $2,
+                        internal_links_unique_count = $3,
+                        external_links_unique_count = $4
+                    WHERE url_id = $5
+                    """,
+                    [
+                        (
+                            counts['internal'],
+                            counts['external'],
+                            len(counts['internal_unique']),
+                            len(counts['external_unique']),
+                            source_url_id
+                        )
+                        for source_url_id, counts in link_counts.items()
+                    ]
+                )
     else:
         # For SQLite, use the original implementation with the correct database path
         from .db import batch_write_internal_links as sqlite_batch_write_internal_links
@@ -2781,6 +2799,47 @@ async def batch_write_internal_links(links_data: List[Dict], crawl_db_path: str
             await sqlite_batch_write_internal_links(links_data)
 
 
+# Truncate anchor texts that are too long (PostgreSQL btree index limit is 2704 bytes)
+# Use 2000 bytes to leave headroom for encoding overhead
+MAX_ANCHOR_TEXT_BYTES = 2000
+
+def _truncate_anchor_text(anchor_text: str) -> str:
+    """Cut anchor_text to at most MAX_ANCHOR_TEXT_BYTES of UTF-8 without splitting a character."""
+    if len(anchor_text.encode('utf-8')) > MAX_ANCHOR_TEXT_BYTES:
+        # Truncate to fit within byte limit, preserving UTF-8 encoding
+        encoded = anchor_text.encode('utf-8')
+        truncated = encoded[:MAX_ANCHOR_TEXT_BYTES]
+        # Decode back, handling potential incomplete UTF-8 sequences at the end
+        anchor_text = truncated.decode('utf-8', errors='ignore')
+        # Remove any trailing incomplete characters
+        anchor_text = anchor_text.rstrip('\ufffd')
+    return anchor_text
+
+async def _pg_bulk_get_or_create_ids(conn, table: str, column: str, values: Iterable[str]) -> Dict[str, int]:
+    """Map values of a PostgreSQL lookup table's UNIQUE column to IDs, inserting the missing ones."""
+    unique_values = list(values)
+    if not unique_values:
+        return {}
+    
+    # Fetch existing IDs
+    existing_result = await conn.fetchall(f"SELECT id, {column} FROM {table} WHERE {column} = ANY($1::text[])", unique_values)
+    value_to_id = {row[1]: row[0] for row in existing_result}
+    
+    # Insert missing ones using batch insert
+    missing_values = [value for value in unique_values if value not in value_to_id]
+    if missing_values:
+        insert_data = [(value,) for value in missing_values]
+        insert_query = f"INSERT INTO {table} ({column}) VALUES ($1) ON CONFLICT ({column}) DO NOTHING"
+        chunk_size = 500
+        for i in range(0, len(insert_data), chunk_size):
+            await conn.executemany(insert_query, insert_data[i:i + chunk_size])
+        
+        # Fetch all IDs (including ones that already existed due to race conditions)
+        fetch_result = await conn.fetchall(f"SELECT id, {column} FROM {table} WHERE {column} = ANY($1::text[])", missing_values)
+        for row in fetch_result:
+            value_to_id[row[1]] = row[0]
+    return value_to_id
+
 async def get_or_create_anchor_text_id(anchor_text: str, config: DatabaseConfig = None) -> int:
     """Get or create anchor text ID.
     
@@ -2790,17 +2849,7 @@ async def get_or_create_anchor_text_id(anchor_text: str, config: DatabaseConfig
     if config is None:
         config = get_database_config()
     
-    # Truncate anchor text if it's too long (PostgreSQL btree index limit is 2704 bytes)
-    # Use 2000 bytes to leave headroom for encoding overhead
-    MAX_ANCHOR_TEXT_BYTES = 2000
-    if len(anchor_text.encode('utf-8')) > MAX_ANCHOR_TEXT_BYTES:
-        # Truncate to fit within byte limit, preserving UTF-8 encoding
-        encoded = anchor_text.encode('utf-8')
-        truncated = encoded[:MAX_ANCHOR_TEXT_BYTES]
-        # Decode back, handling potential incomplete UTF-8 sequences at the end
-        anchor_text = truncated.decode('utf-8', errors='ignore')
-        # Remove any trailing incomplete characters
-        anchor_text = anchor_text.rstrip('\ufffd')
+    anchor_text = _truncate_anchor_text(anchor_text)
     
     async with create_connection() as conn:
         # Try to get existing ID
@@ -3048,7 +3097,7 @@ async def batch_write_hreflang_sitemap_data(hreflang_data: List[Tuple[str, str,
         return
     
     if config.backend == "postgresql":
-        from .db import classify_url
+        from .db import classify_url, _fix_protocol_relative
         
         async with create_connection() as conn:
             normalized_rows = []
@@ -3061,13 +3110,7 @@ async def batch_write_hreflang_sitemap_data(hreflang_data: List[Tuple[str, str,
                     continue
                 
                 # Normalize protocol-relative URLs
-                normalized_href_url = href_url
-                if href_url.startswith('//'):
-                    if base_domain:
-                        base_protocol = 'https'
-                        normalized_href_url = f"{base_protocol}:{href_url}"
-                    else:
-                        normalized_href_url = f"https:{href_url}"
+                normalized_href_url = _fix_protocol_relative(href_url)
                 
                 normalized_rows.append((url, hreflang, normalized_href_url))
                 source_urls.append(url)
@@ -3399,36 +3442,24 @@ async def get_retry_statistics(config: DatabaseConfig = None) -> dict:
         config = get_database_config()
     
     if config.backend == "postgresql":
-        # PostgreSQL implementation
+        # PostgreSQL implementation: totals and both breakdowns in one query
         import time
-        stats = {}
+        from .db import _retry_statistics_from_rows
         
         async with create_connection() as conn:
-            # Total failed URLs
-            result = await conn.fetchone("SELECT COUNT(*) FROM failed_urls")
-            stats['total_failed'] = result[0] if result else 0
-            
-            # Failed URLs by status code
-            result = await conn.fetchall(
-                "SELECT status_code, COUNT(*) FROM failed_urls GROUP BY status_code ORDER BY status_code"
-            )
-            stats['by_status'] = {row[0]: row[1] for row in result} if result else {}
-            
-            # Failed URLs by retry count
-            result = await conn.fetchall(
-                "SELECT retry_count, COUNT(*) FROM failed_urls GROUP BY retry_count ORDER BY retry_count"
-            )
-            stats['by_retry_count'] = {row[0]: row[1] for row in result} if result else {}
-            
-            # URLs ready for retry
             now = int(time.time())
-            result = await conn.fetchone(
-                "SELECT COUNT(*) FROM failed_urls WHERE next_retry_at <= to_timestamp($1)",
+            result = await conn.fetchall(
+                """
+                SELECT 0, NULL::integer, COUNT(*), COUNT(*) FILTER (WHERE next_retry_at <= to_timestamp($1)) FROM failed_urls
+                UNION ALL
+                SELECT 1, status_code, COUNT(*), NULL FROM failed_urls GROUP BY status_code
+                UNION ALL
+                SELECT 2, retry_count, COUNT(*), NULL FROM failed_urls GROUP BY retry_count
+                ORDER BY 1, 2
+                """,
                 now
             )
-            stats['ready_for_retry'] = result[0] if result else 0
-            
-            return stats
+            return _retry_statistics_from_rows(result or [])
     else:
         # SQLite implementation - use the original function
         from .db import get_retry_statistics as sqlite_get_retry_statistics
@@ -3457,30 +3488,22 @@ async def frontier_update_priority_scores(config: DatabaseConfig = None):
     
     if config.backend == "postgresql":
         async with create_connection() as conn:
-            # Get inlinks count for each URL
+            # Get inlinks count for each URL, one url_id-ordered page at a time so
+            # memory stays bounded by chunk_size however large the queue is
             query = """
                 SELECT f.url_id, f.depth, f.sitemap_priority, f.content_type_score, u.url,
                        COALESCE(COUNT(il.target_url_id), 0) as inlinks_count
                 FROM frontier f
                 JOIN urls u ON f.url_id = u.id
                 LEFT JOIN internal_links il ON f.url_id = il.target_url_id
-                WHERE f.status = 'queued'
+                WHERE f.status = 'queued' AND f.url_id > $1
                 GROUP BY f.url_id, f.depth, f.sitemap_priority, f.content_type_score, u.url
+                ORDER BY f.url_id
+                LIMIT $2
             """
-            rows = await conn.fetchall(query)
-            
-            if not rows:
-                return
-            
-            # Import calculate_priority_score function
-            from .db import calculate_priority_score
             
-            # Prepare batch updates
-            update_data = []
-            for row in rows:
-                url_id, depth, sitemap_priority, content_type_score, url, inlinks_count = row
-                priority_score = calculate_priority_score(url, depth, sitemap_priority, inlinks_count)
-                update_data.append((priority_score, inlinks_count, url_id))
+            # Import the batch scorer (same results as calculate_priority_score)
+            from .db import calculate_priority_scores_batch
             
             # Batch update priority scores
             update_query = """
@@ -3489,11 +3512,20 @@ async def frontier_update_priority_scores(config: DatabaseConfig = None):
                 WHERE url_id = $3
             """
             
-            # Use executemany for batch updates
-            chunk_size = 500
-            for i in range(0, len(update_data), chunk_size):
-                chunk = update_data[i:i + chunk_size]
-                await conn.executemany(update_query, chunk)
+            chunk_size = 4096
+            last_url_id = 0
+            while True:
+                rows = await conn.fetchall(query, last_url_id, chunk_size)
+                if not rows:
+                    return
+                
+                priority_scores = calculate_priority_scores_batch(
+                    [row[4] for row in rows], [row[1] for row in rows], [row[2] for row in rows], [row[5] for row in rows]
+                )
+                await conn.executemany(update_query, [
+                    (priority_score, row[5], row[0]) for row, priority_score in zip(rows, priority_scores)
+                ])
+                last_url_id = rows[-1][0]
     elif config.backend == "sqlite":
         # SQLite implementation - only use if backend is explicitly SQLite
         from .db import frontier_update_priority_scores as sqlite_frontier_update_priority_scores
@@ -8,16 +8,20 @@ from bs4 import BeautifulSoup
 from simhash import Simhash
 
 
-def clean_content_for_hashing(html: str) -> str:
+def clean_content_for_hashing(html: str, soup: Optional[BeautifulSoup] = None) -> str:
     """
     Clean HTML content for consistent hashing by removing dynamic elements
     and normalizing structure.
+
+    An already-parsed ``soup`` of ``html`` may be passed to skip re-parsing;
+    it is modified in place.
     """
     if not html:
         return ""
     
     try:
-        soup = BeautifulSoup(html, 'html.parser')
+        if soup is None:
+            soup = BeautifulSoup(html, 'html.parser')
         
         # Remove dynamic elements that change frequently
         for tag in soup.find_all(['script', 'style', 'noscript', 'iframe']):
@@ -56,12 +60,13 @@ def clean_content_for_hashing(html: str) -> str:
         return html
 
 
-def generate_content_hashes(html_content: str) -> Dict[str, str]:
+def generate_content_hashes(html_content: str, soup: Optional[BeautifulSoup] = None) -> Dict[str, str]:
     """
     Generate SHA256 and SimHash for content analysis.
     
     Args:
         html_content: Raw HTML content
+        soup: Optional 'html.parser' soup of html_content, consumed by cleaning
         
     Returns:
         Dictionary with 'content_hash_sha256', 'content_hash_simhash', and 'content_length'
@@ -74,7 +79,7 @@ def generate_content_hashes(html_content: str) -> Dict[str, str]:
         }
     
     # Clean content for consistent hashing
-    cleaned_content = clean_content_for_hashing(html_content)
+    cleaned_content = clean_content_for_hashing(html_content, soup)
     
     if not cleaned_content:
         return {
@@ -133,6 +138,28 @@ def calculate_similarity_score(hash1: str, hash2: str) -> float:
         return 0.0
 
 
+def simhash_bands(simhash_str: str) -> tuple:
+    """
+    Split a 64-bit SimHash into four 16-bit bands for LSH bucketing.
+    
+    Two hashes within Hamming distance 3 always share at least one band.
+    
+    Args:
+        simhash_str: SimHash value as string
+        
+    Returns:
+        Tuple of four band integers (low bits first), or four Nones if there is no hash
+    """
+    if not simhash_str:
+        return (None, None, None, None)
+    
+    try:
+        value = int(simhash_str)
+    except ValueError:
+        return (None, None, None, None)
+    return tuple((value >> (16 * band)) & 0xFFFF for band in range(4))
+
+
 def is_exact_duplicate(hash1: str, hash2: str) -> bool:
     """
     Check if two SHA256 hashes represent exact duplicates.
@@ -326,6 +326,7 @@ CREATE INDEX IF NOT EXISTS idx_frontier_status ON frontier(status);
 CREATE INDEX IF NOT EXISTS idx_frontier_depth ON frontier(depth);
 CREATE INDEX IF NOT EXISTS idx_frontier_priority ON frontier(priority_score DESC);
 CREATE INDEX IF NOT EXISTS idx_frontier_enqueued_at ON frontier(enqueued_at);
+CREATE INDEX IF NOT EXISTS idx_frontier_queue ON frontier(priority_score DESC, enqueued_at ASC) WHERE status = 'queued';
 
 -- Sitemaps table - stores discovered sitemaps
 CREATE TABLE IF NOT EXISTS sitemaps (
@@ -375,7 +376,8 @@ CREATE TABLE IF NOT EXISTS failed_urls (
 -- Create indexes for failed URLs
 CREATE INDEX IF NOT EXISTS idx_failed_urls_url ON failed_urls(url_id);
 CREATE INDEX IF NOT EXISTS idx_failed_urls_status ON failed_urls(status_code);
-CREATE INDEX IF NOT EXISTS idx_failed_urls_next_retry ON failed_urls(next_retry_at);
+-- Covers get_urls_ready_for_retry: range scan on next_retry_at, retry_count/url_id read from the index
+CREATE INDEX IF NOT EXISTS idx_failed_urls_retry ON failed_urls(next_retry_at, retry_count, url_id);
 CREATE INDEX IF NOT EXISTS idx_failed_urls_retry_count ON failed_urls(retry_count);
 
 -- Schema types normalization table
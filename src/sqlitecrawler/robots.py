@@ -84,6 +84,7 @@ class RobotsCache:
         # Check if cache entry has expired
         if current_time - cached_time > server_ttl:
             del self._cache[domain]
+            _robots_decisions.pop(domain, None)
             return None
         
         return parser
@@ -102,6 +103,7 @@ class RobotsCache:
         # Check if cache entry has expired
         if current_time - cached_time > server_ttl:
             del self._cache[domain]
+            _robots_decisions.pop(domain, None)
             return None
         
         # Return crawl delay for specific user agent or wildcard
@@ -111,6 +113,7 @@ class RobotsCache:
         """Cache robots parser for domain with TTL."""
         current_time = time.time()
         self._cache[domain] = (parser, current_time, crawl_delays or {}, headers or {})
+        _robots_decisions.pop(domain, None)
     
     def mark_failed(self, domain: str):
         """Mark domain as failed to fetch robots.txt."""
@@ -132,6 +135,7 @@ class RobotsCache:
         
         for domain in expired_domains:
             del self._cache[domain]
+            _robots_decisions.pop(domain, None)
 
 
 class SitemapCache:
@@ -337,60 +341,73 @@ def get_crawl_delay(domain: str, user_agent: str = "SQLiteCrawler/0.2") -> Optio
         return None
     return robots_cache.get_crawl_delay(domain, user_agent)
 
-def is_url_crawlable(url: str, user_agent: str = "SQLiteCrawler/0.2") -> bool:
-    """Check if a URL is crawlable according to robots.txt."""
-    from urllib.parse import urlparse
-    
+def _rule_matches(rule_path: str, path: str) -> bool:
+    """Check whether a single allow/disallow rule path matches a URL path."""
+    if rule_path == '/':
+        return True
+    if rule_path.endswith('*'):
+        # Wildcard pattern
+        return path.startswith(rule_path[:-1])
+    # Exact match
+    return path.startswith(rule_path)
+
+
+# Memoised robots decisions per domain: (parser, parser._entries, {(user_agent, path): decision}).
+# The parser and its rules are held by identity, so a refreshed or re-parsed robots.txt starts a
+# fresh memo without hashing the rules; RobotsCache also drops a domain's memo when it refreshes.
+_robots_decisions: Dict[str, Tuple[urllib.robotparser.RobotFileParser, dict, Dict[Tuple[str, str], Tuple[bool, Tuple[Tuple[str, str], ...]]]]] = {}
+ROBOTS_DECISIONS_MAX_PER_DOMAIN = 8192
+
+
+def _robots_decision(entries: List[Tuple[str, str]], path: str) -> Tuple[bool, Tuple[Tuple[str, str], ...]]:
+    """Evaluate robots.txt rules against a path."""
+    # The first matching rule decides; allow rules override later disallow rules
+    allows = True
+    for rule_type, rule_path in entries:
+        if rule_type in ('disallow', 'allow') and _rule_matches(rule_path, path):
+            allows = rule_type == 'allow'
+            break
+    
+    matching_rules = tuple(
+        (rule_type, rule_path) for rule_type, rule_path in entries
+        if rule_type in ('disallow', 'allow') and _rule_matches(rule_path, path)
+    )
+    return allows, matching_rules
+
+
+def robots_decision(url: str, user_agent: str = "SQLiteCrawler/0.2") -> Tuple[bool, Tuple[Tuple[str, str], ...]]:
+    """Return (crawlable, matching_rules) for a URL according to robots.txt, memoised per (domain, parser, path)."""
     parsed = urlparse(url)
     domain = parsed.netloc
-    path = parsed.path
     
     # Check cache first
-    if robots_cache.is_failed(domain):
-        return True  # Assume crawlable if robots.txt failed
+    if robots_cache is None or robots_cache.is_failed(domain):
+        return True, ()  # Assume crawlable if robots.txt failed
     
     parser = robots_cache.get_robots_parser(domain)
     if parser is None:
-        return True  # Assume crawlable if no robots.txt
-    
-    # Check if we have entries for this user agent or wildcard
-    entries = parser._entries.get(user_agent, []) + parser._entries.get('*', [])
-    
-    # If no entries, allow crawling
-    if not entries:
-        return True
-    
-    # Check each rule
-    for rule_type, rule_path in entries:
-        if rule_type == 'disallow':
-            # Check if the path matches the disallow pattern
-            if rule_path == '/':
-                return False  # Disallow everything
-            elif rule_path.endswith('*'):
-                # Wildcard pattern
-                pattern = rule_path[:-1]  # Remove the *
-                if path.startswith(pattern):
-                    return False
-            else:
-                # Exact match
-                if path.startswith(rule_path):
-                    return False
-        elif rule_type == 'allow':
-            # Allow rules override disallow rules
-            if rule_path == '/':
-                return True  # Allow everything
-            elif rule_path.endswith('*'):
-                # Wildcard pattern
-                pattern = rule_path[:-1]  # Remove the *
-                if path.startswith(pattern):
-                    return True
-            else:
-                # Exact match
-                if path.startswith(rule_path):
-                    return True
-    
-    # If no rules matched, allow by default
-    return True
+        return True, ()  # Assume crawlable if no robots.txt
+    
+    memo = _robots_decisions.get(domain)
+    if memo is None or memo[0] is not parser or memo[1] is not parser._entries:
+        memo = (parser, parser._entries, {})
+        _robots_decisions[domain] = memo
+    decisions = memo[2]
+    
+    key = (user_agent, parsed.path)
+    decision = decisions.get(key)
+    if decision is None:
+        if len(decisions) >= ROBOTS_DECISIONS_MAX_PER_DOMAIN:
+            decisions.clear()
+        # Check if we have entries for this user agent or wildcard
+        entries = parser._entries.get(user_agent, []) + parser._entries.get('*', [])
+        decision = decisions[key] = _robots_decision(entries, parsed.path)
+    return decision
+
+
+def is_url_crawlable(url: str, user_agent: str = "SQLiteCrawler/0.2") -> bool:
+    """Check if a URL is crawlable according to robots.txt."""
+    return robots_decision(url, user_agent)[0]
 
 
 def get_matching_robots_txt_rules(url: str, user_agent: str = "SQLiteCrawler/0.2") -> List[Tuple[str, str]]:
@@ -401,64 +418,7 @@ def get_matching_robots_txt_rules(url: str, user_agent: str = "SQLiteCrawler/0.2
     
     Returns empty list if no robots.txt or no matching rules.
     """
-    from urllib.parse import urlparse
-    
-    parsed = urlparse(url)
-    domain = parsed.netloc
-    path = parsed.path
-    
-    # Check cache first
-    if robots_cache.is_failed(domain):
-        return []  # No rules if robots.txt failed
-    
-    parser = robots_cache.get_robots_parser(domain)
-    if parser is None:
-        return []  # No rules if no robots.txt
-    
-    # Check if we have entries for this user agent or wildcard
-    entries = parser._entries.get(user_agent, []) + parser._entries.get('*', [])
-    
-    # If no entries, no rules
-    if not entries:
-        return []
-    
-    matching_rules = []
-    
-    # Check each rule to see if it matches
-    for rule_type, rule_path in entries:
-        matches = False
-        
-        if rule_type == 'disallow':
-            # Check if the path matches the disallow pattern
-            if rule_path == '/':
-                matches = True  # Disallow everything
-            elif rule_path.endswith('*'):
-                # Wildcard pattern
-                pattern = rule_path[:-1]  # Remove the *
-                if path.startswith(pattern):
-                    matches = True
-            else:
-                # Exact match
-                if path.startswith(rule_path):
-                    matches = True
-        elif rule_type == 'allow':
-            # Check if the path matches the allow pattern
-            if rule_path == '/':
-                matches = True  # Allow everything
-            elif rule_path.endswith('*'):
-                # Wildcard pattern
-                pattern = rule_path[:-1]  # Remove the *
-                if path.startswith(pattern):
-                    matches = True
-            else:
-                # Exact match
-                if path.startswith(rule_path):
-                    matches = True
-        
-        if matches:
-            matching_rules.append((rule_type, rule_path))
-    
-    return matching_rules
+    return list(robots_decision(url, user_agent)[1])
 
 
 async def fetch_sitemap(url: str, user_agent: str = "SQLiteCrawler/0.2", verbose: bool = False, http_config=None) -> Optional[BeautifulSoup]:
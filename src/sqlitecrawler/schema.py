@@ -62,12 +62,14 @@ def normalize_for_hashing(data: Dict[str, Any]) -> Dict[str, Any]:
     return normalized
 
 
-def extract_schema_data(html: str, base_url: str) -> List[Dict[str, Any]]:
+def extract_schema_data(html: str, base_url: str, soup: Optional[BeautifulSoup] = None) -> List[Dict[str, Any]]:
     """
     Extract all structured data from HTML.
     Returns a list of schema data dictionaries.
+    An already-parsed ``soup`` of ``html`` may be passed to skip re-parsing.
     """
-    soup = BeautifulSoup(html, 'html.parser')
+    if soup is None:
+        soup = BeautifulSoup(html, 'html.parser')
     schema_data = []
     
     # Extract JSON-LD
@@ -0,0 +1,393 @@
+import asyncio
+import gc
+import random
+import sqlite3
+import pytest
+import pytest_asyncio
+from src.sqlitecrawler import db, db_operations, hashing, schema
+from src.sqlitecrawler.database import DatabaseConfig
+from src.sqlitecrawler.hashing import simhash_bands
+
+@pytest_asyncio.fixture
+async def crawl_db(tmp_path):
+    crawl_db_path = str(tmp_path / "crawl.db")
+    pages_db_path = str(tmp_path / "pages.db")
+    await db.init_crawl_db(crawl_db_path)
+    await db.init_pages_db(pages_db_path)
+    return crawl_db_path, pages_db_path
+
+def count_urls(crawl_db_path, where="1"):
+    conn = sqlite3.connect(crawl_db_path)
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM urls WHERE {where}").fetchone()[0]
+    finally:
+        conn.close()
+
+class TestUrlIds:
+    @pytest.mark.asyncio
+    async def test_get_or_create_url_ids(self, crawl_db):
+        crawl_db_path, _ = crawl_db
+        async with db._connection(crawl_db_path) as conn:
+            first = await db.get_or_create_url_ids(
+                ["https://example.com/a", "https://example.com/b", "https://example.com/a", None],
+                "example.com", conn, now=100
+            )
+            await conn.commit()
+            # Existing URLs keep their IDs and timestamps; only the new one is inserted
+            second = await db.get_or_create_url_ids(
+                ["https://example.com/b", "https://other.com/c"], "example.com", conn, now=200
+            )
+            await conn.commit()
+
+        assert set(first) == {"https://example.com/a", "https://example.com/b"}
+        assert second["https://example.com/b"] == first["https://example.com/b"]
+        assert count_urls(crawl_db_path) == 3
+        assert count_urls(crawl_db_path, "last_seen = 200") == 1
+
+        # The single-URL helper agrees with the bulk one and does not touch stored rows
+        url_id = await db.get_or_create_url_id("https://example.com/a", "example.com", crawl_db_path, now=300)
+        assert url_id == first["https://example.com/a"]
+        assert count_urls(crawl_db_path, "last_seen = 300") == 0
+
+    @pytest.mark.asyncio
+    async def test_url_id_cache_cleared_on_init(self, crawl_db):
+        crawl_db_path, _ = crawl_db
+        async with db._connection(crawl_db_path) as conn:
+            ids = await db.get_or_create_url_ids(["https://example.com/a"], "example.com", conn)
+            await conn.commit()
+            cached = await db._cached_url_ids(["https://example.com/a", "https://example.com/missing"], conn, crawl_db_path)
+        assert cached == ids
+        assert db._url_id_cache[(crawl_db_path, "https://example.com/a")] == ids["https://example.com/a"]
+
+        await db.init_crawl_db(crawl_db_path)
+        assert (crawl_db_path, "https://example.com/a") not in db._url_id_cache
+
+    def test_classify_urls_bulk_matches_classify_url(self):
+        urls = [
+            "https://example.com/", "https://www.example.com/page", "https://blog.example.com/post",
+            "https://other.com/", "https://twitter.com/example", "https://m.facebook.com/example",
+            "https://example.co.uk/", "//example.com/relative", "https://EXAMPLE.com/upper",
+        ]
+        for base_domain in ("example.com", "www.example.com"):
+            for is_from_hreflang in (False, True):
+                assert db.classify_urls_bulk(urls, base_domain, is_from_hreflang=is_from_hreflang) == [
+                    db.classify_url(url, base_domain, is_from_hreflang=is_from_hreflang) for url in urls
+                ]
+
+class TestConnections:
+    @pytest.mark.asyncio
+    async def test_pooled_connection_rolls_back_on_error(self, crawl_db):
+        crawl_db_path, pages_db_path = crawl_db
+        async with db.DBPool(crawl_db_path, pages_db_path):
+            with pytest.raises(RuntimeError):
+                async with db._connection(crawl_db_path) as conn:
+                    await db.begin_immediate(conn)
+                    await conn.execute("INSERT INTO urls (url) VALUES ('https://example.com/lost')")
+                    raise RuntimeError("write failed")
+
+            # The next borrower gets the same connection with no half-written transaction
+            async with db._connection(crawl_db_path) as conn:
+                assert not conn.in_transaction
+                await db.get_or_create_url_ids(["https://example.com/kept"], "example.com", conn)
+                await conn.commit()
+
+        assert db.DBPool.active is None
+        assert count_urls(crawl_db_path, "url = 'https://example.com/lost'") == 0
+        assert count_urls(crawl_db_path, "url = 'https://example.com/kept'") == 1
+
+    @pytest.mark.asyncio
+    async def test_pooled_connection_discards_uncommitted_work(self, crawl_db):
+        crawl_db_path, pages_db_path = crawl_db
+        async with db.DBPool(crawl_db_path, pages_db_path):
+            async with db._connection(crawl_db_path) as conn:
+                await conn.execute("INSERT INTO urls (url) VALUES ('https://example.com/uncommitted')")
+            # Like a fresh connection being closed, the pool does not carry the write over
+            async with db._connection(crawl_db_path) as conn:
+                assert not conn.in_transaction
+
+        assert count_urls(crawl_db_path, "url = 'https://example.com/uncommitted'") == 0
+
+class TestPageWrites:
+    @pytest.mark.asyncio
+    async def test_compression_error_retrieved_when_chunk_fails(self, crawl_db, monkeypatch):
+        crawl_db_path, pages_db_path = crawl_db
+        compressed = asyncio.Event()
+        loop = asyncio.get_running_loop()
+
+        def failing_compress(htmls):
+            loop.call_soon_threadsafe(compressed.set)
+            raise ValueError("compression failed")
+
+        async def failing_resolve(*args, **kwargs):
+            await compressed.wait()
+            await asyncio.sleep(0.01)
+            raise RuntimeError("resolution failed")
+
+        monkeypatch.setattr(db, "compress_html_many", failing_compress)
+        monkeypatch.setattr(db, "get_or_create_url_ids", failing_resolve)
+        unhandled = []
+        loop.set_exception_handler(lambda loop, context: unhandled.append(context))
+        try:
+            page = ("https://example.com/", "https://example.com/", 200, {}, "<p>x</p>", "example.com", None)
+            with pytest.raises(RuntimeError):
+                await db._batch_write_pages_chunk([page], pages_db_path, crawl_db_path)
+            gc.collect()
+            await asyncio.sleep(0)
+        finally:
+            loop.set_exception_handler(None)
+        assert unhandled == []
+
+class TestFailureBuffer:
+    def test_due(self):
+        buffer = db.FailureBuffer(max_pending=2, max_age=60)
+        assert buffer.due() is False
+        buffer.add(1, 500, "error")
+        assert buffer.due() is False
+        buffer.add(2, 503, "error")
+        assert buffer.due() is True
+
+    @pytest.mark.asyncio
+    async def test_flush_records_and_counts_retries(self, crawl_db):
+        crawl_db_path, _ = crawl_db
+        buffer = db.FailureBuffer()
+        buffer.add(1, 500, "first")
+        buffer.add(1, 502, "second")
+        buffer.add(2, 503, "other")
+        async with db._connection(crawl_db_path) as conn:
+            await db.begin_immediate(conn)
+            await buffer.flush(conn)
+
+        assert buffer.pending == []
+        conn = sqlite3.connect(crawl_db_path)
+        rows = conn.execute("SELECT url_id, status_code, retry_count FROM failed_urls ORDER BY url_id").fetchall()
+        conn.close()
+        # A URL failing twice in one flush keeps one row and counts both failures
+        assert rows == [(1, 502, 1), (2, 503, 0)]
+
+    @pytest.mark.asyncio
+    async def test_flush_keeps_failures_on_error(self):
+        class LockedConnection:
+            async def execute(self, *args):
+                raise sqlite3.OperationalError("database is locked")
+
+        buffer = db.FailureBuffer()
+        buffer.add(1, 500, "error")
+        with pytest.raises(sqlite3.OperationalError):
+            await buffer.flush(LockedConnection())
+        assert buffer.pending == [(1, 500, "error")]
+
+    @pytest.mark.asyncio
+    async def test_init_dedupes_legacy_table_without_indexes(self, tmp_path):
+        crawl_db_path = str(tmp_path / "crawl.db")
+        # failed_urls as the old db_operations schema created it: no indexes, no last_retry_at
+        conn = sqlite3.connect(crawl_db_path)
+        conn.execute("""CREATE TABLE failed_urls (
+          id INTEGER PRIMARY KEY AUTOINCREMENT,
+          url_id INTEGER NOT NULL,
+          status_code INTEGER NOT NULL,
+          failure_reason TEXT,
+          retry_count INTEGER DEFAULT 0,
+          next_retry_at INTEGER,
+          created_at INTEGER DEFAULT (strftime('%s', 'now')),
+          updated_at INTEGER DEFAULT (strftime('%s', 'now'))
+        )""")
+        conn.executemany(
+            "INSERT INTO failed_urls (url_id, status_code, failure_reason) VALUES (?, ?, ?)",
+            [(1, 500, "old"), (1, 502, "new"), (2, 503, "other")]
+        )
+        conn.commit()
+        conn.close()
+
+        await db.init_crawl_db(crawl_db_path)
+        buffer = db.FailureBuffer()
+        buffer.add(2, 504, "again")
+        async with db._connection(crawl_db_path) as conn:
+            await db.begin_immediate(conn)
+            await buffer.flush(conn)
+
+        conn = sqlite3.connect(crawl_db_path)
+        rows = conn.execute("SELECT url_id, status_code, failure_reason, retry_count FROM failed_urls ORDER BY url_id").fetchall()
+        conn.close()
+        assert rows == [(1, 502, "new", 0), (2, 504, "again", 1)]
+
+class TestPriorityScores:
+    def test_batch_matches_scalar(self, monkeypatch):
+        random.seed(7)
+        paths = ["/", "/products/shoe", "/category/list", "/search?q=x", "/api/v1", "/img/a.jpg", "/static/app.js", "/about"]
+        urls = [f"https://example.com{random.choice(paths)}" for _ in range(200)]
+        depths = [random.randrange(8) for _ in urls]
+        sitemap_priorities = [random.choice([None, 0.0, 0.3, 0.8, 1.5]) for _ in urls]
+        inlinks_counts = [random.choice([0, 3, 15, 80, 500]) for _ in urls]
+        content_types = [random.choice([None, "text/html", "image/png"]) for _ in urls]
+        expected = [
+            db.calculate_priority_score(*args)
+            for args in zip(urls, depths, sitemap_priorities, inlinks_counts, content_types)
+        ]
+
+        assert db.calculate_priority_scores_batch(urls, depths, sitemap_priorities, inlinks_counts, content_types) == expected
+        content_type_scores = [db.calculate_content_type_score(url, ct) for url, ct in zip(urls, content_types)]
+        assert db.calculate_priority_scores_batch(
+            urls, depths, sitemap_priorities, inlinks_counts, content_type_scores=content_type_scores
+        ) == expected
+
+        monkeypatch.setattr(db, "NUMPY_AVAILABLE", False)
+        assert db.calculate_priority_scores_batch(urls, depths, sitemap_priorities, inlinks_counts, content_types) == expected
+
+class TestNearDuplicates:
+    @pytest.mark.asyncio
+    async def test_view_matches_pairwise_hamming(self, crawl_db):
+        crawl_db_path, _ = crawl_db
+        random.seed(5)
+        simhashes = []
+        for i in range(120):
+            if i % 3 == 0 and simhashes:
+                # Flip up to four bits of an earlier hash
+                value = random.choice(simhashes)
+                for _ in range(random.randrange(5)):
+                    value ^= 1 << random.randrange(64)
+            else:
+                value = random.getrandbits(64)
+            simhashes.append(value)
+
+        conn = sqlite3.connect(crawl_db_path)
+        for i, value in enumerate(simhashes):
+            url_id = conn.execute("INSERT INTO urls (url) VALUES (?)", (f"https://example.com/{i}",)).lastrowid
+            conn.execute(
+                "INSERT INTO content (url_id, content_hash_sha256, content_hash_simhash, simhash_b0, simhash_b1, simhash_b2, simhash_b3) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url_id, f"sha{i % 100}", str(value), *simhash_bands(str(value)))
+            )
+        conn.commit()
+        found = sorted(conn.execute("SELECT url1_id, url2_id, hamming_distance FROM view_near_duplicates"))
+        conn.close()
+
+        expected = []
+        for i in range(len(simhashes)):
+            for j in range(i + 1, len(simhashes)):
+                distance = bin(simhashes[i] ^ simhashes[j]).count("1")
+                if distance <= 3 and i % 100 != j % 100:
+                    expected.append((i + 1, j + 1, distance))
+        assert expected
+        assert found == expected
+
+class TestContentExtraction:
+    PAGES = [
+        """<!DOCTYPE html><html lang="en-GB"><head><title> Shoes | Shop </title>
+        <meta name="description" content=" Great shoes. "><meta name="robots" content="index, follow">
+        <link rel="canonical" href="https://example.com/shoes">
+        <link rel="alternate" hreflang="de" href="https://example.com/de/shoes">
+        <script>var hidden = "not counted";</script><style>.a { color: red }</style></head>
+        <body><h1>Shoes</h1><h1> </h1><h2>Running</h2><h2>Walking <b>fast</b></h2>
+        <p>Five words of body text.</p></body></html>""",
+        """<html><head lang="fr"><title>Bonjour</title></head><body><p>Un deux trois</p></body></html>""",
+        """<html><body><h2>No head at all</h2></body></html>""",
+    ]
+
+    @pytest.mark.parametrize("html", PAGES)
+    def test_lxml_matches_bs4(self, html):
+        headers = {"Content-Type": "text/html"}
+        assert db._parse_html_lxml(html, headers, "https://example.com/") == db._parse_html_bs4(html, headers, "https://example.com/")
+
+    def test_bs4_fallback_parses_once(self, monkeypatch):
+        parses = []
+        make_soup = db.BeautifulSoup
+        def counting_soup(*args, **kwargs):
+            parses.append(args)
+            return make_soup(*args, **kwargs)
+        for module in (db, schema, hashing):
+            monkeypatch.setattr(module, "BeautifulSoup", counting_soup)
+
+        html = self.PAGES[0].replace(
+            "</head>", '<script type="application/ld+json">{"@context": "https://schema.org", "@type": "Product", "name": "Shoe"}</script></head>'
+        )
+        content = db._parse_html_bs4(html, {}, "https://example.com/shoes")
+        assert len(parses) == 1
+        # Schema extraction still sees the JSON-LD script the word count skips
+        assert [item["type"] for item in content["schema_data"]] == ["Product"]
+        assert content == db._parse_html_lxml(html, {}, "https://example.com/shoes")
+
+    @pytest.mark.asyncio
+    async def test_extract_content_from_html(self):
+        content = await db.extract_content_from_html(self.PAGES[0], {}, "https://example.com/shoes")
+        assert content["title"] == "Shoes | Shop"
+        assert content["meta_description"] == "Great shoes."
+        assert content["h1_tags"] == ["Shoes"]
+        assert content["h2_tags"] == ["Running", "Walking fast"]
+        assert content["html_lang"] == "en-GB"
+        assert content["hreflang_urls"] == [{"url": "https://example.com/de/shoes", "hreflang": "de"}]
+        assert "not counted" not in str(content)
+
+class TestDbOperationsInit:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("legacy_content", [False, True])
+    async def test_content_write_after_db_operations_init(self, tmp_path, legacy_content):
+        crawl_db_path = str(tmp_path / "crawl.db")
+        config = DatabaseConfig(backend="sqlite", sqlite_path=crawl_db_path)
+        await db_operations.init_crawl_db(config, crawl_db_path)
+        if legacy_content:
+            # Turn content back into a table from before the SimHash band columns
+            conn = sqlite3.connect(crawl_db_path)
+            conn.execute("DROP VIEW view_near_duplicates")
+            for band in range(4):
+                conn.execute(f"DROP INDEX idx_content_simhash_b{band}")
+                conn.execute(f"ALTER TABLE content DROP COLUMN simhash_b{band}")
+            conn.execute("INSERT INTO content (url_id, content_hash_simhash) VALUES (99, '12345')")
+            conn.commit()
+            conn.close()
+            await db_operations.init_crawl_db(config, crawl_db_path)
+
+        url = "https://example.com/shoes"
+        async with db._connection(crawl_db_path) as conn:
+            await db.get_or_create_url_ids([url], "example.com", conn)
+            await conn.commit()
+        content = await db.extract_content_from_html(TestContentExtraction.PAGES[0], {}, url)
+        await db.batch_write_content_with_url_resolution([(url, content, "example.com", 0)], crawl_db_path)
+
+        conn = sqlite3.connect(crawl_db_path)
+        rows = conn.execute("SELECT content_hash_simhash, simhash_b0, simhash_b1, simhash_b2, simhash_b3 FROM content ORDER BY url_id").fetchall()
+        conn.close()
+        simhash = content["content_hash_simhash"]
+        expected = [(simhash, *simhash_bands(simhash))]
+        if legacy_content:
+            expected.append(("12345", *simhash_bands("12345")))
+        assert rows == expected
+
+    @pytest.mark.asyncio
+    async def test_url_id_cache_cleared_on_init(self, tmp_path):
+        crawl_db_path = str(tmp_path / "crawl.db")
+        config = DatabaseConfig(backend="sqlite", sqlite_path=crawl_db_path)
+        await db_operations.init_crawl_db(config, crawl_db_path)
+        async with db._connection(crawl_db_path) as conn:
+            await db.get_or_create_url_ids(["https://example.com/a"], "example.com", conn)
+            await conn.commit()
+            await db._cached_url_ids(["https://example.com/a"], conn, crawl_db_path)
+        assert (crawl_db_path, "https://example.com/a") in db._url_id_cache
+
+        # Recreate the database at the same path
+        (tmp_path / "crawl.db").unlink()
+        await db_operations.init_crawl_db(config, crawl_db_path)
+        assert (crawl_db_path, "https://example.com/a") not in db._url_id_cache
+
+    @pytest.mark.asyncio
+    async def test_views_match_db_init(self, tmp_path, crawl_db):
+        crawl_db_path = str(tmp_path / "ops_crawl.db")
+        await db_operations.init_crawl_db(DatabaseConfig(backend="sqlite", sqlite_path=crawl_db_path), crawl_db_path)
+
+        conn = sqlite3.connect(crawl_db_path)
+        url_ids = [conn.execute("INSERT INTO urls (url) VALUES (?)", (f"https://example.com/{i}",)).lastrowid for i in range(3)]
+        conn.executemany("INSERT INTO content (url_id, content_hash_sha256) VALUES (?, 'same')", [(url_id,) for url_id in url_ids])
+        conn.commit()
+        views = {}
+        for path in (crawl_db_path, crawl_db[0]):
+            other = sqlite3.connect(path)
+            views[path] = {name for name, in other.execute("SELECT name FROM sqlite_master WHERE type = 'view'")}
+            # Every view resolves against the schema it was created with
+            for name in views[path]:
+                other.execute(f"SELECT * FROM {name} LIMIT 1").fetchall()
+            other.close()
+        conn.close()
+
+        assert views[crawl_db_path] == views[crawl_db[0]]
+        assert {"view_links", "view_exact_duplicate_groups"} <= views[crawl_db_path]
+        pairs = [pair async for pair in db.iter_exact_duplicate_pairs(crawl_db_path)]
+        assert sorted(pairs) == [("same", 1, 2), ("same", 1, 3), ("same", 2, 3)]
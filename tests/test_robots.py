@@ -1,7 +1,8 @@
 import pytest
 import time
 from unittest.mock import MagicMock, patch
-from src.sqlitecrawler.robots import RobotsCache, calculate_cache_ttl, is_url_crawlable
+from src.sqlitecrawler import robots
+from src.sqlitecrawler.robots import RobotsCache, calculate_cache_ttl, is_url_crawlable, get_matching_robots_txt_rules
 
 class TestRobotsCache:
     def test_calculate_cache_ttl(self):
@@ -52,3 +53,21 @@ async def test_is_url_crawlable():
         # Case 3: Parser available, disallowed
         mock_parser._entries = {'*': [('disallow', '/')]}
         assert is_url_crawlable("https://example.com/page") is False
+
+def test_robots_decision_memo_invalidated_on_refresh():
+    cache = RobotsCache(default_ttl=3600)
+    parser = MagicMock()
+    parser._entries = {'*': [('disallow', '/private'), ('allow', '/')]}
+    cache.set_robots_parser("example.com", parser, {}, {})
+    
+    with patch('src.sqlitecrawler.robots.robots_cache', cache):
+        assert is_url_crawlable("https://example.com/private/a") is False
+        assert get_matching_robots_txt_rules("https://example.com/private/a") == [('disallow', '/private'), ('allow', '/')]
+        assert ('SQLiteCrawler/0.2', '/private/a') in robots._robots_decisions["example.com"][2]
+        
+        # A refreshed robots.txt drops the domain's memo and serves the new rules
+        new_parser = MagicMock()
+        new_parser._entries = {'*': [('allow', '/')]}
+        cache.set_robots_parser("example.com", new_parser, {}, {})
+        assert "example.com" not in robots._robots_decisions
+        assert is_url_crawlable("https://example.com/private/a") is True